@@ -0,0 +1,204 @@
+import asyncio
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from backend import content_diff, crud, database, metrics, screenshots
+
+logger = logging.getLogger(__name__)
+
+# Max number of queued writes applied in one transaction
+WRITE_BATCH_SIZE = int(os.environ.get("TRACKER_DB_WRITE_BATCH", "100"))
+
+WriteOp = Callable[[Session], Any]
+
+
+class DBWriter:
+    """
+    Dedicated thread that owns all writes of the run path. Operations queued
+    from the event loop are applied in batches, one transaction per batch, so
+    coroutines never block on SQLite and many status updates share a commit.
+    """
+
+    def __init__(self, session_factory=database.WriteSessionLocal, batch_size: int = WRITE_BATCH_SIZE):
+        self.session_factory = session_factory
+        self.batch_size = max(1, batch_size)
+        self._queue: "queue.Queue[Optional[Tuple[WriteOp, Future]]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.writes = 0
+
+    def start(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._loop, name="db-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 10):
+        """Flushes pending writes and stops the thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread:
+            self._queue.put(None)
+            thread.join(timeout)
+
+    def submit(self, op: WriteOp) -> Future:
+        self.start()
+        future: Future = Future()
+        self._queue.put((op, future))
+        return future
+
+    async def write(self, op: WriteOp) -> Any:
+        return await asyncio.wrap_future(self.submit(op))
+
+    def _loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            stop = False
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            self._apply(batch)
+            if stop:
+                return
+
+    def _apply(self, batch: List[Tuple[WriteOp, Future]]):
+        started = time.perf_counter()
+        db = self.session_factory()
+        results = []
+        try:
+            for op, future in batch:
+                # A savepoint per op so one bad write doesn't roll back the batch
+                savepoint = db.begin_nested()
+                try:
+                    results.append((future, op(db), None))
+                    savepoint.commit()
+                except Exception as e:
+                    savepoint.rollback()
+                    results.append((future, None, e))
+            db.commit()
+        except Exception as e:
+            logger.error(f"DB write batch of {len(batch)} failed: {e}")
+            db.rollback()
+            for _, future in batch:
+                _resolve(future, None, e)
+            return
+        finally:
+            db.close()
+
+        self.batches += 1
+        self.writes += len(batch)
+        metrics.DB_WRITE_SECONDS.observe(time.perf_counter() - started)
+        metrics.DB_WRITES.inc(amount=len(batch))
+        for future, result, error in results:
+            _resolve(future, result, error)
+
+
+def _resolve(future: Future, result: Any, error: Optional[BaseException]):
+    # A write is applied once queued, but its caller may have been cancelled
+    # meanwhile; its future then takes no result
+    if not future.set_running_or_notify_cancel():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+writer = DBWriter()
+
+metrics.Gauge("tracker_db_write_queue", "Writes waiting for the DB writer thread.", lambda: writer._queue.qsize())
+
+
+async def read(op: Callable[[Session], Any]) -> Any:
+    """Runs a read-only query in a worker thread, on a connection of the read pool."""
+    def run():
+        db = database.ReadSessionLocal()
+        try:
+            return op(db)
+        finally:
+            db.close()
+    return await asyncio.to_thread(run)
+
+
+async def get_tracker(tracker_id: int):
+    return await read(lambda db: crud.get_tracker(db, tracker_id))
+
+
+async def update_tracker_status(tracker_id: int, status: str, logs: str = None, run_info: dict = None):
+    await writer.write(lambda db: crud.update_tracker_status(db, tracker_id, status, logs, run_info, commit=False) is not None)
+
+
+async def get_content_fingerprints(tracker_id: int):
+    return await read(lambda db: crud.get_content_fingerprints(db, tracker_id))
+
+
+async def start_run(tracker_id: int, mark_running: bool = True) -> int:
+    """
+    Opens a history row and returns the run id. With mark_running the
+    tracker's status also shows 'running' while the run lasts.
+    """
+    def op(db):
+        if mark_running:
+            crud.update_tracker_status(db, tracker_id, "running", commit=False)
+        return crud.create_run(db, tracker_id, commit=False).id
+    return await writer.write(op)
+
+
+async def finish_run(tracker_id: int, run_id: int, status: str, logs: str = None, run_info: dict = None,
+                     log_chunks: list = None, content: "content_diff.ContentWatch" = None,
+                     outbox: list = None) -> int:
+    """
+    Closes the history row and updates the denormalized latest status on the
+    tracker. With log_chunks the full log is stored compressed and the history
+    row doesn't keep a text copy. For trackers watching content, a run that
+    changed neither content nor status doesn't notify feeds or dashboards;
+    only successful runs store content fingerprints.
+    Notifications in `outbox` are queued in the same transaction; returns how
+    many were (a repeat of the previous message is dropped unless the status
+    or the watched content changed since).
+    """
+    def op(db):
+        if log_chunks:
+            crud.save_run_log_chunks(db, run_id, log_chunks, commit=False)
+        run = crud.finish_run(db, run_id, status, None if log_chunks else logs, run_info, commit=False)
+        quiet, changed = False, False
+        if content is not None:
+            # A failed run may have stopped after seeing a change; its
+            # fingerprints stay unsaved so the next run reports it again
+            changed = status == "success" and crud.save_content_results(
+                db, tracker_id, run_id, content.results.values(), commit=False)
+            quiet = not changed and run is not None and not run.status_changed
+        if run_info and run_info.get("screenshots"):
+            crud.save_screenshots(db, tracker_id, run_id, run_info["screenshots"], commit=False)
+        crud.update_tracker_status(db, tracker_id, status, logs, run_info, commit=False, quiet=quiet,
+                                   status_changed=run.status_changed if run is not None else None)
+        if not outbox:
+            return 0
+        return crud.enqueue_notifications(db, tracker_id, run_id, outbox, commit=False, content_changed=changed)
+    return await writer.write(op)
+
+
+async def compact_history():
+    return await writer.write(lambda db: crud.compact_runs(db, commit=False))
+
+
+async def collect_screenshots() -> int:
+    """Deletes stored images no screenshot row refers to any more."""
+    referenced = await read(crud.get_screenshot_hashes)
+    return await asyncio.to_thread(screenshots.store.collect_garbage, referenced)
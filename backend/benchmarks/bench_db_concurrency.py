@@ -0,0 +1,197 @@
+"""
+Read latency while runs write statuses. Each journal mode gets a fresh
+interpreter and a throwaway database with N trackers. R reader processes
+look up single trackers by id on the read pool's connections (a cheap
+indexed query, so SQLite locking rather than Python dominates), first
+alone and then while W writer processes (workers finishing runs) commit
+status updates and run rows as fast as they can, in batches like the DB
+writer thread.
+
+    python -m backend.benchmarks.bench_db_concurrency --trackers 2000 --readers 2 --writers 2 --duration 5
+
+The exit code is 1 when a read or write failed in WAL mode.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(ROOT)
+
+MODES = ("DELETE", "WAL")
+# Status updates per write transaction
+WRITE_BATCH = 20
+READ_SQL = "SELECT last_run_status, last_run_at FROM trackers WHERE id = ?"
+
+
+def _percentile(values, q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def seed(count: int):
+    from backend import database, models
+    db = database.WriteSessionLocal()
+    try:
+        db.add_all(models.TrackerModel(
+            name=f"bench-{i}", config=[], is_active=i % 4 != 0, schedule_cron="*/5 * * * *",
+            last_run_status=random.choice(("success", "failure")), last_run_at=datetime.utcnow(),
+            last_run_logs="INFO: ok\n" * 50,
+        ) for i in range(count))
+        db.commit()
+    finally:
+        db.close()
+
+
+def write_load(count: int, stop, ready, results):
+    """Writer process: status updates plus a run row per tracker, WRITE_BATCH per commit."""
+    from backend import database, models
+    T = models.TrackerModel
+    written, errors, commits = 0, 0, []
+    ready.set()
+    while not stop.is_set():
+        started = time.perf_counter()
+        db = database.WriteSessionLocal()
+        try:
+            now = datetime.utcnow()
+            for tracker_id in random.sample(range(1, count + 1), WRITE_BATCH):
+                status = random.choice(("success", "failure"))
+                db.query(T).filter(T.id == tracker_id).update(
+                    {T.last_run_status: status, T.last_run_at: now, T.last_run_logs: "INFO: ok\n" * 50},
+                    synchronize_session=False,
+                )
+                db.add(models.TrackerRunModel(tracker_id=tracker_id, status=status, started_at=now, finished_at=now, duration_ms=1))
+            db.commit()
+            written += WRITE_BATCH
+            commits.append(time.perf_counter() - started)
+        except Exception:
+            db.rollback()
+            errors += 1
+        finally:
+            db.close()
+    results.put({"written": written, "errors": errors, "commit_p99_s": _percentile(commits, 0.99)})
+
+
+def read_load(count: int, duration: float, start, results):
+    """Reader process: one tracker by primary key per query, on a read pool connection."""
+    from backend import database
+    connection = database.read_engine.raw_connection()
+    latencies, errors = [], 0
+    try:
+        start.wait(60)
+        deadline = time.perf_counter() + duration
+        while time.perf_counter() < deadline:
+            tracker_id = random.randint(1, count)
+            started = time.perf_counter()
+            try:
+                cursor = connection.cursor()
+                cursor.execute(READ_SQL, (tracker_id,))
+                cursor.fetchone()
+                cursor.close()
+                latencies.append(time.perf_counter() - started)
+            except Exception:
+                errors += 1
+    finally:
+        connection.close()
+    results.put({"latencies": latencies, "errors": errors})
+
+
+def read_phase(context, args) -> dict:
+    start, results = context.Event(), context.Queue()
+    readers = [context.Process(target=read_load, args=(args.trackers, args.duration, start, results)) for _ in range(args.readers)]
+    for reader in readers:
+        reader.start()
+    start.set()
+    done = [results.get(timeout=args.duration + 60) for _ in readers]
+    for reader in readers:
+        reader.join()
+    latencies = [latency for result in done for latency in result["latencies"]]
+    return {
+        "reads_per_sec": len(latencies) / args.duration, "errors": sum(result["errors"] for result in done),
+        "p50_ms": _percentile(latencies, 0.5) * 1000, "p99_ms": _percentile(latencies, 0.99) * 1000,
+        "p999_ms": _percentile(latencies, 0.999) * 1000, "max_ms": max(latencies, default=0) * 1000,
+    }
+
+
+def child(args) -> dict:
+    from backend import database
+    database.init_db()
+    seed(args.trackers)
+    # Spawned, so every process opens its own connections instead of inheriting ours
+    context = multiprocessing.get_context("spawn")
+    idle = read_phase(context, args)
+
+    stop, results = context.Event(), context.Queue()
+    readies = [context.Event() for _ in range(args.writers)]
+    writers = [context.Process(target=write_load, args=(args.trackers, stop, ready, results)) for ready in readies]
+    for writer in writers:
+        writer.start()
+    for ready in readies:
+        ready.wait(60)
+    loaded = read_phase(context, args)
+    stop.set()
+    written = [results.get(timeout=60) for _ in writers]
+    for writer in writers:
+        writer.join()
+    return {
+        "idle": idle, "loaded": loaded,
+        "writes_per_sec": sum(w["written"] for w in written) / args.duration,
+        "write_errors": sum(w["errors"] for w in written),
+        "commit_p99_ms": max(w["commit_p99_s"] for w in written) * 1000,
+    }
+
+
+def run_mode(mode: str, args) -> dict:
+    with tempfile.TemporaryDirectory(prefix="tracker-bench-") as tmpdir:
+        env = dict(os.environ)
+        env.update({
+            "PYTHONPATH": os.pathsep.join(filter(None, [ROOT, env.get("PYTHONPATH")])),
+            "TRACKER_DATABASE_URL": f"sqlite:///{os.path.join(tmpdir, 'bench.db')}",
+            "TRACKER_DB_JOURNAL_MODE": mode,
+            "PYTHONWARNINGS": "ignore",
+        })
+        command = [sys.executable, "-m", "backend.benchmarks.bench_db_concurrency", "--child",
+                   "--trackers", str(args.trackers), "--readers", str(args.readers),
+                   "--writers", str(args.writers), "--duration", str(args.duration)]
+        out = subprocess.run(command, env=env, capture_output=True, text=True, check=True)
+        return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trackers", type=int, default=2000)
+    parser.add_argument("--readers", type=int, default=2)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--duration", type=float, default=5)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        print(json.dumps(child(args)))
+        return
+
+    print(f"trackers: {args.trackers}, reader processes: {args.readers}, writer processes: {args.writers}, {args.duration:g}s per phase")
+    print(f"{'mode':<7} {'phase':<7} {'reads/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'p99.9 ms':>9} {'max ms':>8} {'errors':>7}")
+    failed = False
+    for mode in MODES:
+        result = run_mode(mode, args)
+        for phase in ("idle", "loaded"):
+            r = result[phase]
+            print(f"{mode:<7} {phase:<7} {r['reads_per_sec']:8.0f} {r['p50_ms']:8.3f} {r['p99_ms']:8.3f} "
+                  f"{r['p999_ms']:9.3f} {r['max_ms']:8.1f} {r['errors']:7d}")
+        print(f"{mode:<7} writes  {result['writes_per_sec']:8.0f}/s, commit p99 {result['commit_p99_ms']:.1f} ms, errors {result['write_errors']}")
+        if mode == "WAL" and (result["loaded"]["errors"] or result["write_errors"]):
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
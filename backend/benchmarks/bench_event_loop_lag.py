@@ -0,0 +1,91 @@
+"""
+Runs N fake trackers at once against a throwaway SQLite database and reports
+event-loop lag, comparing synchronous crud calls on the loop with the
+async_db run path (read threads + batching writer thread).
+
+    python -m backend.benchmarks.bench_event_loop_lag --trackers 200
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+_tmpdir = tempfile.mkdtemp(prefix="tracker-bench-")
+os.environ["TRACKER_DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}"
+
+from backend import async_db, crud, database, models
+
+LOG_BLOB = "INFO: step done\n" * 200
+
+
+async def monitor_lag(samples: list, stop: asyncio.Event, interval: float = 0.005):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        start = loop.time()
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, loop.time() - start - interval))
+
+
+def sync_call(op):
+    # Short-lived session per call, run directly on the event loop thread
+    db = database.SessionLocal()
+    try:
+        return op(db)
+    finally:
+        db.close()
+
+
+async def fake_run_sync(tracker_id: int, work: float):
+    sync_call(lambda db: crud.get_tracker(db, tracker_id))
+    sync_call(lambda db: crud.update_tracker_status(db, tracker_id, "running"))
+    await asyncio.sleep(work)
+    sync_call(lambda db: crud.update_tracker_status(db, tracker_id, "success", LOG_BLOB, {"ok": True}))
+
+
+async def fake_run_async(tracker_id: int, work: float):
+    await async_db.get_tracker(tracker_id)
+    await async_db.update_tracker_status(tracker_id, "running")
+    await asyncio.sleep(work)
+    await async_db.update_tracker_status(tracker_id, "success", LOG_BLOB, {"ok": True})
+
+
+async def run_mode(name: str, run, tracker_ids, work: float):
+    samples = []
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(monitor_lag(samples, stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(run(tid, work) for tid in tracker_ids))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await monitor
+    samples.sort()
+    p99 = samples[int(len(samples) * 0.99)] if samples else 0.0
+    print(f"{name:>6}: {len(tracker_ids)} runs in {elapsed:.3f}s | "
+          f"loop lag p99 {p99 * 1000:.1f}ms, max {samples[-1] * 1000 if samples else 0:.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trackers", type=int, default=200)
+    parser.add_argument("--work", type=float, default=0.05, help="Simulated browser time per run (seconds)")
+    args = parser.parse_args()
+
+    database.init_db()
+    db = database.SessionLocal()
+    db.add_all([models.TrackerModel(name=f"bench-{i}", config=[]) for i in range(args.trackers)])
+    db.commit()
+    tracker_ids = [t.id for t in crud.get_trackers(db, limit=args.trackers)]
+    db.close()
+
+    asyncio.run(run_mode("sync", fake_run_sync, tracker_ids, args.work))
+    asyncio.run(run_mode("async", fake_run_async, tracker_ids, args.work))
+    async_db.writer.stop()
+    print(f"writer: {async_db.writer.writes} writes in {async_db.writer.batches} batches")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+Notification delivery against a local webhook stand-in. N trackers whose
+config is a single send_notification step run at once (a burst of status
+flips), spread over a few destinations. The stand-in answers slowly, rate
+limits every 7th request with 429 + Retry-After and fails every 11th with a
+500. Checks that every message arrives exactly once, that the bursts went
+out as digests within the rate limit, that a repeated message is
+deduplicated and that runs never waited on delivery.
+
+    python -m backend.benchmarks.bench_notifications --trackers 100 --destinations 3
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+_tmpdir = tempfile.mkdtemp(prefix="tracker-bench-")
+os.environ["TRACKER_DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}"
+os.environ["TRACKER_EXECUTION_MODE"] = "local"
+# Per destination; the stand-in isn't Discord or Slack, so the generic limit applies
+os.environ.setdefault("TRACKER_NOTIFY_RATE_PER_MINUTE", "300")
+os.environ.setdefault("TRACKER_NOTIFY_RETRY_BASE", "0.2")
+os.environ.setdefault("TRACKER_NOTIFY_DIGEST_WINDOW", "0.5")
+
+from backend import async_db, crud, database, http_client, models, notifications, runner
+from backend.benchmarks.fixture_server import FixtureServer
+
+RESPONSE_DELAY = 0.05
+
+
+class Webhook:
+    """ASGI webhook stand-in recording what it accepted."""
+
+    def __init__(self):
+        self.requests = 0
+        self.received = Counter() # message -> times delivered
+        self.accepted_at = defaultdict(list) # path -> accept times
+        self.lock = threading.Lock()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+        await asyncio.sleep(RESPONSE_DELAY)
+        with self.lock:
+            self.requests += 1
+            n = self.requests
+        status, headers = 204, []
+        if n % 7 == 3:
+            status, headers = 429, [(b"retry-after", b"1")]
+        elif n % 11 == 5:
+            status = 500
+        else:
+            payload = json.loads(body)
+            with self.lock:
+                self.accepted_at[scope["path"]].append(time.monotonic())
+                for item in payload["notifications"]:
+                    self.received[item["message"]] += 1
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": b""})
+
+
+def configure(base: str, count: int, destinations: int, label: str) -> list:
+    """Creates the trackers, or points their message at a new `label`; returns their ids."""
+    db = database.SessionLocal()
+    try:
+        trackers = db.query(models.TrackerModel).order_by(models.TrackerModel.id).all()
+        if not trackers:
+            trackers = [models.TrackerModel(name=f"bench-{i}", is_active=True) for i in range(count)]
+            db.add_all(trackers)
+        for i, tracker in enumerate(trackers):
+            tracker.config = [{"action": "send_notification", "message": f"Tracker {i} {label}", "url": f"{base}/hook/{i % destinations}"}]
+        db.commit()
+        return [tracker.id for tracker in trackers]
+    finally:
+        db.close()
+
+
+async def wait_delivered(timeout: float):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        counts = await async_db.read(crud.get_notification_stats)
+        if counts["pending"] == counts["sending"] == 0:
+            return counts
+        await asyncio.sleep(0.2)
+    raise RuntimeError(f"Notifications still pending after {timeout}s: {counts}")
+
+
+def max_per_window(times, window: float) -> int:
+    times = sorted(times)
+    best, start = 0, 0
+    for end, t in enumerate(times):
+        while t - times[start] >= window:
+            start += 1
+        best = max(best, end - start + 1)
+    return best
+
+
+async def run_round(tracker_ids: list, timeout: float):
+    started = time.perf_counter()
+    await asyncio.gather(*(runner.run_tracker(tracker_id) for tracker_id in tracker_ids))
+    runs_seconds = time.perf_counter() - started
+    counts = await wait_delivered(timeout)
+    return runs_seconds, time.perf_counter() - started, counts
+
+
+async def bench(count: int, destinations: int, timeout: float):
+    webhook = Webhook()
+    server = FixtureServer(asgi_app=webhook).start()
+    database.init_db()
+    async_db.writer.start()
+    dispatcher = notifications.dispatcher
+    dispatcher.start()
+    rounds = []
+    try:
+        # Burst: everything due at once goes out as digests
+        tracker_ids = configure(server.url, count, destinations, "changed")
+        rounds.append(("burst", "changed", await run_round(tracker_ids, timeout)))
+        # Same messages again: deduplicated, nothing queued
+        rounds.append(("repeat", None, await run_round(tracker_ids, timeout)))
+        # One request per message: exercises the rate limit and retries
+        dispatcher.digest_min = count + 1
+        configure(server.url, count, destinations, "changed again")
+        rounds.append(("single", "changed again", await run_round(tracker_ids, timeout)))
+    finally:
+        await dispatcher.stop()
+        await http_client.close_client()
+        async_db.writer.stop()
+        server.stop()
+
+    requests, per = notifications.PLATFORMS["generic"][:2]
+    # A token bucket allows a full bucket plus what refills during the window
+    limit = max(1, requests) + requests * per
+    burst = max((max_per_window(times, per) for times in webhook.accepted_at.values()), default=0)
+
+    print(f"trackers: {count}, destinations: {destinations}")
+    failures = []
+    sent_before = 0
+    for name, label, (runs_seconds, delivered_seconds, counts) in rounds:
+        print(f"{name:>6}: runs finished in {runs_seconds:.2f}s, delivered after {delivered_seconds:.2f}s, outbox {counts}")
+        if label is None:
+            if counts["sent"] != sent_before:
+                failures.append("repeated messages were not deduplicated")
+        else:
+            missing = [i for i in range(count) if webhook.received[f"Tracker {i} {label}"] == 0]
+            if missing:
+                failures.append(f"{name}: {len(missing)} messages never delivered")
+        sent_before = counts["sent"]
+        if counts["failed"]:
+            failures.append(f"{name}: {counts['failed']} notifications failed")
+    duplicated = [message for message, times in webhook.received.items() if times > 1]
+    if duplicated:
+        failures.append(f"{len(duplicated)} messages delivered more than once")
+    if burst > limit:
+        failures.append("rate limit exceeded")
+    print(f"webhook requests: {webhook.requests} ({dispatcher.digests} digest messages)")
+    print(f"most accepted by one destination in {per:g}s: {burst} (limit {limit:g})")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return not failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trackers", type=int, default=100)
+    parser.add_argument("--destinations", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=120)
+    args = parser.parse_args()
+    sys.exit(0 if asyncio.run(bench(args.trackers, args.destinations, args.timeout)) else 1)
+
+
+if __name__ == "__main__":
+    main()
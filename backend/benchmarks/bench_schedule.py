@@ -0,0 +1,142 @@
+"""
+Replays a day of cron firings for N trackers with a mix of schedules and
+random run durations, once with plain cron triggers (every tracker sharing
+an expression fires in the same second) and once with the per-tracker phase
+offsets the scheduler uses. Runs go through a queue of --concurrency slots
+with the 'skip' overrun policy. Reports peak concurrency, peak starts per
+second and queue waits. Nothing is executed; it only needs the scheduler's
+triggers.
+
+    python -m backend.benchmarks.bench_schedule --trackers 1000 --concurrency 32
+"""
+import argparse
+import heapq
+import os
+import random
+import sys
+import time
+from collections import Counter, deque
+from datetime import datetime, timedelta, timezone
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from backend import scheduler
+
+# (cron, share of trackers)
+CRON_MIX = [
+    ("*/1 * * * *", 0.1),
+    ("*/5 * * * *", 0.35),
+    ("*/15 * * * *", 0.25),
+    ("0 * * * *", 0.2),
+    ("0 9 * * *", 0.1),
+]
+
+
+def fire_times(trigger, start: datetime, end: datetime):
+    times = []
+    fire_time = trigger.get_next_fire_time(None, start)
+    while fire_time is not None and fire_time < end:
+        times.append((fire_time - start).total_seconds())
+        fire_time = trigger.get_next_fire_time(fire_time, fire_time)
+    return times
+
+
+def simulate(firings, durations, concurrency: int):
+    """firings: sorted (second, tracker); durations: tracker -> callable returning seconds."""
+    running = [] # heap of (finish, tracker)
+    busy = set()
+    waiting = deque()
+    starts = Counter()
+    waits = []
+    peak_running = peak_waiting = skipped = 0
+    busy_seconds = 0.0
+
+    def start(tracker, at, fired_at):
+        nonlocal busy_seconds
+        duration = durations[tracker]()
+        heapq.heappush(running, (at + duration, tracker))
+        starts[int(at)] += 1
+        waits.append(at - fired_at)
+        busy_seconds += duration
+
+    def drain(until):
+        while running and running[0][0] <= until:
+            finish, tracker = heapq.heappop(running)
+            busy.discard(tracker)
+            if waiting:
+                next_tracker, fired_at = waiting.popleft()
+                start(next_tracker, finish, fired_at)
+
+    for at, tracker in firings:
+        drain(at)
+        if tracker in busy:
+            skipped += 1
+            continue
+        busy.add(tracker)
+        if len(running) < concurrency:
+            start(tracker, at, at)
+        else:
+            waiting.append((tracker, at))
+        peak_running = max(peak_running, len(running))
+        peak_waiting = max(peak_waiting, len(waiting))
+    drain(float("inf"))
+
+    waits.sort()
+    return {
+        "runs": len(waits),
+        "skipped_overrun": skipped,
+        "peak_running": peak_running,
+        "peak_starts_per_second": max(starts.values()) if starts else 0,
+        "peak_queue_depth": peak_waiting,
+        "wait_p50": waits[len(waits) // 2] if waits else 0.0,
+        "wait_p99": waits[int(len(waits) * 0.99)] if waits else 0.0,
+        "wait_max": waits[-1] if waits else 0.0,
+        "avg_running": busy_seconds / 86400,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trackers", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=32, help="Run slots; 0 for unlimited")
+    parser.add_argument("--min-duration", type=float, default=2.0, help="Seconds")
+    parser.add_argument("--max-duration", type=float, default=20.0, help="Seconds")
+    parser.add_argument("--jitter", type=float, default=scheduler.JITTER_MAX, help="Max phase offset (seconds)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    crons = rng.choices([cron for cron, _ in CRON_MIX], [share for _, share in CRON_MIX], k=args.trackers)
+    base = {tracker: rng.uniform(args.min_duration, args.max_duration) for tracker in range(args.trackers)}
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    end = start + timedelta(days=1)
+    concurrency = args.concurrency or args.trackers
+
+    results = {}
+    for label, jitter in (("aligned", 0.0), ("spread", args.jitter)):
+        begin = time.perf_counter()
+        firings = []
+        for tracker, cron in enumerate(crons):
+            trigger = scheduler.spread_trigger(tracker + 1, cron, jitter_max=jitter)
+            firings.extend((at, tracker) for at in fire_times(trigger, start, end))
+        firings.sort()
+        # Same duration sequence for both runs; now and then a run is 10x slower
+        run_rng = random.Random(args.seed)
+        durations = {
+            tracker: (lambda b=b: b * run_rng.uniform(0.5, 1.5) * (10 if run_rng.random() < 0.02 else 1))
+            for tracker, b in base.items()
+        }
+        results[label] = simulate(firings, durations, concurrency)
+        print(f"{label}: simulated {len(firings)} firings in {time.perf_counter() - begin:.1f}s")
+
+    print(f"\n{args.trackers} trackers, concurrency {args.concurrency or 'unlimited'}, "
+          f"runs {args.min_duration:g}-{args.max_duration:g}s, jitter up to {args.jitter:g}s\n")
+    print(f"{'':24}{'aligned':>12}{'spread':>12}")
+    for key in results["aligned"]:
+        aligned, spread = results["aligned"][key], results["spread"][key]
+        fmt = (lambda v: f"{v:12.1f}") if isinstance(aligned, float) else (lambda v: f"{v:12d}")
+        print(f"{key:24}{fmt(aligned)}{fmt(spread)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Cold start of an API-only process (a dashboard replica in distributed mode):
+how long `import backend.main` takes, how much of that is FastAPI and
+SQLAlchemy themselves, whether any browser or HTTP client modules were
+loaded, and how long uvicorn takes until /health answers. Every
+measurement is a fresh interpreter.
+
+    python -m backend.benchmarks.bench_startup --runs 5
+
+The exit code is 1 when a browser module was imported. The import time is
+also compared with --budget-ms; FastAPI, SQLAlchemy and pydantic alone can
+take most of it, which the backend can't reduce.
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Only processes that execute runs may load these
+HEAVY_MODULES = ("camoufox", "playwright", "httpx", "backend.engine")
+
+_IMPORT_PROBE = f"""
+import json, sys, time
+started = time.perf_counter()
+import fastapi, sqlalchemy.orm, pydantic
+frameworks = time.perf_counter() - started
+import backend.main
+total = time.perf_counter() - started
+print(json.dumps({{"frameworks_s": frameworks, "total_s": total,
+                  "heavy": [m for m in {HEAVY_MODULES!r} if m in sys.modules]}}))
+"""
+
+
+def _env(tmpdir: str):
+    env = dict(os.environ)
+    env.update({
+        "PYTHONPATH": os.pathsep.join(filter(None, [ROOT, env.get("PYTHONPATH")])),
+        "TRACKER_DATABASE_URL": f"sqlite:///{os.path.join(tmpdir, 'startup.db')}",
+        "TRACKER_EXECUTION_MODE": "distributed",
+        "PYTHONWARNINGS": "ignore",
+    })
+    return env
+
+
+def measure_import(env) -> dict:
+    out = subprocess.run([sys.executable, "-c", _IMPORT_PROBE], env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def measure_serving(env, timeout: float = 30) -> float:
+    """Seconds from starting uvicorn until /health answers."""
+    port = _free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except OSError:
+                time.sleep(0.01)
+        raise RuntimeError(f"/health did not answer within {timeout}s")
+    finally:
+        process.terminate()
+        process.wait(10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="tracker-bench-") as tmpdir:
+        env = _env(tmpdir)
+        # First start creates the schema; later ones see an existing database like a replica would
+        measure_serving(env)
+        imports = [measure_import(env) for _ in range(args.runs)]
+        serving = [measure_serving(env) for _ in range(args.runs)]
+
+    total = statistics.median(run["total_s"] for run in imports)
+    frameworks = statistics.median(run["frameworks_s"] for run in imports)
+    heavy = sorted({module for run in imports for module in run["heavy"]})
+    print(f"import backend.main      {total * 1000:7.0f} ms (median of {args.runs})")
+    print(f"  fastapi/sqlalchemy     {frameworks * 1000:7.0f} ms")
+    print(f"  backend                {(total - frameworks) * 1000:7.0f} ms")
+    print(f"uvicorn until /health    {statistics.median(serving) * 1000:7.0f} ms")
+    print(f"browser/HTTP modules     {', '.join(heavy) or 'none'}")
+    verdict = "met" if total * 1000 <= args.budget_ms else "MISSED"
+    print(f"import budget            {args.budget_ms:7.0f} ms {verdict} "
+          f"(frameworks {frameworks * 1000 / args.budget_ms:.0%} of it, backend {(total - frameworks) * 1000 / args.budget_ms:.0%})")
+    sys.exit(1 if heavy else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+"""
+Offline benchmark suite. Runs trackers through the real run path (run
+queue, runner, TrackerEngine, DB writer) against a throwaway SQLite
+database, with the fake browser backend and a local fixture server instead
+of Camoufox and the internet. Then fires the scheduler for every tracker
+and drives the read API in-process.
+
+For every step mix and tracker count it reports throughput, run latency
+p50/p99, event-loop lag, resident memory and peak RSS:
+
+    python -m backend.benchmarks.bench_suite --scales 10,100,1000
+    python -m backend.benchmarks.bench_suite --json before.json
+    python -m backend.benchmarks.bench_suite --baseline before.json --max-regression 0.2
+
+With --baseline the exit code is 1 when a throughput dropped, or a p99
+grew, by more than --max-regression compared to the saved results.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import resource
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+_tmpdir = tempfile.mkdtemp(prefix="tracker-bench-")
+os.environ["TRACKER_DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}"
+os.environ.setdefault("TRACKER_PROFILES_DIR", os.path.join(_tmpdir, "profiles"))
+os.environ.setdefault("TRACKER_SCREENSHOTS_DIR", os.path.join(_tmpdir, "screenshots"))
+os.environ["TRACKER_EXECUTION_MODE"] = "local"
+
+import httpx
+
+from backend import async_db, browser_pool, database, http_client, metrics, models, run_queue, runner, scheduler
+from backend.benchmarks import fake_browser
+from backend.benchmarks.fixture_server import FixtureServer
+
+
+def mixes(base: str, shot_dir: str) -> Dict[str, Any]:
+    """Step mixes by name; each is a function tracker index -> config."""
+    def browser(i):
+        return [
+            {"action": "open", "url": f"{base}/page/{i}"},
+            {"action": "grep", "text": "In stock"},
+            {"action": "extract_text", "selector": "#price", "variable": "price"},
+            {"action": "grep_regex", "regex": r"Price: \$\d+", "selector": "#price"},
+            {"action": "click", "selector": "#title"},
+            {"action": "screenshot", "path": os.path.join(shot_dir, f"{i}.png")},
+        ]
+
+    def http(i):
+        return [
+            {"action": "http_request", "url": f"{base}/api/{i}", "variable": "body"},
+            {"action": "expect_http_status", "status": 200},
+            {"action": "http_request", "url": f"{base}/api/{i}"},
+        ]
+
+    def mixed(i):
+        if i % 2:
+            return http(i)
+        return [
+            {"action": "block_resources", "patterns": "analytics", "cache_static": True},
+            {"action": "open", "url": f"{base}/page/{i}"},
+            {"action": "watch_content", "selector": "#price"},
+            {"action": "extract_text", "selector": "#title", "variable": "title"},
+            {"action": "send_notification", "message": "{title} changed"},
+        ]
+
+    return {"browser": browser, "http": http, "mixed": mixed}
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class LagMonitor:
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.samples: List[float] = []
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - start - self.interval))
+
+    def __enter__(self):
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    def __exit__(self, *exc):
+        self._task.cancel()
+
+    def report(self) -> Dict[str, float]:
+        return {"lag_p99_ms": percentile(self.samples, 0.99) * 1000, "lag_max_ms": max(self.samples, default=0.0) * 1000}
+
+
+def create_trackers(configs: List[list], cron: str = None) -> List[int]:
+    db = database.SessionLocal()
+    try:
+        trackers = [models.TrackerModel(name=f"bench-{i}", config=config, schedule_cron=cron, is_active=True)
+                    for i, config in enumerate(configs)]
+        db.add_all(trackers)
+        db.commit()
+        return [tracker.id for tracker in trackers]
+    finally:
+        db.close()
+
+
+def deactivate_all():
+    db = database.SessionLocal()
+    try:
+        db.query(models.TrackerModel).update({models.TrackerModel.is_active: False})
+        db.commit()
+    finally:
+        db.close()
+
+
+async def bench_runs(tracker_ids: List[int], concurrency: int) -> Dict[str, float]:
+    latencies, finished = [], asyncio.Event()
+    remaining = len(tracker_ids)
+    failures_before = metrics.RUNS.value("failure")
+
+    async def timed_run(tracker_id: int, require_active: bool):
+        nonlocal remaining
+        start = time.perf_counter()
+        try:
+            await runner.run_tracker(tracker_id, require_active)
+        finally:
+            latencies.append(time.perf_counter() - start)
+            remaining -= 1
+            if not remaining:
+                finished.set()
+
+    queue = run_queue.RunQueue(timed_run, concurrency)
+    await queue.start()
+    with LagMonitor() as lag:
+        start = time.perf_counter()
+        for tracker_id in tracker_ids:
+            queue.submit(tracker_id)
+        await finished.wait()
+        elapsed = time.perf_counter() - start
+    await queue.stop()
+    stats = queue.stats()
+    return {
+        "runs": len(tracker_ids),
+        "failed": metrics.RUNS.value("failure") - failures_before,
+        "runs_per_sec": len(tracker_ids) / elapsed,
+        "run_p50_ms": percentile(latencies, 0.5) * 1000,
+        "run_p99_ms": percentile(latencies, 0.99) * 1000,
+        "queue_wait_p95_ms": stats["wait_seconds_p95"] * 1000,
+        **lag.report(),
+    }
+
+
+async def bench_scheduler(tracker_ids: List[int]) -> Dict[str, float]:
+    """Loads every schedule, then fires all jobs at once into a queue whose runs do nothing."""
+    async def no_run(tracker_id: int, require_active: bool):
+        pass
+
+    run_queue.queue.run_func = no_run
+    await run_queue.queue.start()
+    if not scheduler.scheduler.running:
+        scheduler.scheduler.start()
+    start = time.perf_counter()
+    schedules = await asyncio.to_thread(scheduler._load_schedules)
+    for tracker_id, (cron, _) in schedules.items():
+        scheduler.add_job(tracker_id, cron)
+    load_seconds = time.perf_counter() - start
+
+    with LagMonitor() as lag:
+        start = time.perf_counter()
+        await asyncio.gather(*(scheduler.run_tracker_job(tracker_id) for tracker_id in tracker_ids))
+        elapsed = time.perf_counter() - start
+    for tracker_id in tracker_ids:
+        scheduler.remove_job(tracker_id)
+    await run_queue.queue.stop()
+    return {
+        "load_ms": load_seconds * 1000,
+        "firings_per_sec": len(tracker_ids) / elapsed,
+        **lag.report(),
+    }
+
+
+async def bench_api(tracker_ids: List[int], requests: int, clients: int) -> Dict[str, float]:
+    from backend.main import app
+
+    paths = ["/trackers/summary", "/health", "/metrics", "/trackers/?limit=100"]
+    paths += [f"/trackers/{tracker_id}" for tracker_id in tracker_ids[:20]]
+    paths += [f"/trackers/{tracker_id}/runs" for tracker_id in tracker_ids[:20]]
+    latencies = []
+    counter = iter(range(requests))
+
+    async def client_loop(client: httpx.AsyncClient):
+        for n in counter:
+            path = paths[n % len(paths)]
+            start = time.perf_counter()
+            response = await client.get(path)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                raise Exception(f"GET {path}: {response.status_code}")
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        with LagMonitor() as lag:
+            start = time.perf_counter()
+            await asyncio.gather(*(client_loop(client) for _ in range(clients)))
+            elapsed = time.perf_counter() - start
+    return {
+        "requests_per_sec": requests / elapsed,
+        "p50_ms": percentile(latencies, 0.5) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        **lag.report(),
+    }
+
+
+async def run_suite(args) -> Dict[str, Dict[str, float]]:
+    server = FixtureServer().start()
+    shot_dir = os.path.join(_tmpdir, "screenshots")
+    os.makedirs(shot_dir, exist_ok=True)
+    await browser_pool.start(launcher=fake_browser.launcher, playwright=fake_browser.FakePlaywright())
+    async_db.writer.start()
+    results: Dict[str, Dict[str, float]] = {}
+    try:
+        all_mixes = mixes(server.url, shot_dir)
+        for scale in args.scales:
+            for name in args.mixes:
+                tracker_ids = await asyncio.to_thread(create_trackers, [all_mixes[name](i) for i in range(scale)])
+                result = await bench_runs(tracker_ids * args.rounds, args.concurrency)
+                results[f"runs/{name}/{scale}"] = {**result, "rss_mb": metrics.MEMORY.value() / (1024 * 1024), "peak_rss_mb": peak_rss_mb()}
+                print_row(f"runs/{name}/{scale}", results[f"runs/{name}/{scale}"])
+
+            await asyncio.to_thread(deactivate_all)
+            tracker_ids = await asyncio.to_thread(create_trackers, [[{"action": "wait", "seconds": 0}]] * scale, "*/5 * * * *")
+            results[f"scheduler/{scale}"] = await bench_scheduler(tracker_ids)
+            print_row(f"scheduler/{scale}", results[f"scheduler/{scale}"])
+            await asyncio.to_thread(deactivate_all)
+
+            results[f"api/{scale}"] = await bench_api(tracker_ids, args.api_requests, args.api_clients)
+            print_row(f"api/{scale}", results[f"api/{scale}"])
+    finally:
+        if scheduler.scheduler.running:
+            scheduler.scheduler.shutdown(wait=False)
+        await browser_pool.stop()
+        await http_client.close_client()
+        async_db.writer.stop()
+        server.stop()
+    return results
+
+
+def print_row(name: str, result: Dict[str, float]):
+    cells = ", ".join(f"{key} {value:.1f}" if isinstance(value, float) else f"{key} {value}" for key, value in result.items())
+    print(f"{name:22} {cells}", flush=True)
+
+
+# Keys where higher is better; for the other compared keys (p99s) lower is better
+_THROUGHPUT_KEYS = ("runs_per_sec", "firings_per_sec", "requests_per_sec")
+_LATENCY_KEYS = ("run_p99_ms", "p99_ms", "lag_p99_ms")
+LATENCY_NOISE_MS = 10.0
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], max_regression: float) -> List[str]:
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        for key in _THROUGHPUT_KEYS:
+            if key in result and before.get(key) and result[key] < before[key] * (1 - max_regression):
+                regressions.append(f"{name} {key}: {before[key]:.1f} -> {result[key]:.1f}")
+        for key in _LATENCY_KEYS:
+            # A few milliseconds either way is noise
+            if key in result and result[key] > before.get(key, 0) * (1 + max_regression) + LATENCY_NOISE_MS:
+                regressions.append(f"{name} {key}: {before[key]:.1f} -> {result[key]:.1f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", type=lambda s: [int(x) for x in s.split(",")], default=[10, 100, 1000])
+    parser.add_argument("--mixes", type=lambda s: s.split(","), default=["browser", "http", "mixed"])
+    parser.add_argument("--rounds", type=int, default=1, help="Runs per tracker")
+    parser.add_argument("--concurrency", type=int, default=run_queue.MAX_CONCURRENT_RUNS)
+    parser.add_argument("--api-requests", type=int, default=500)
+    parser.add_argument("--api-clients", type=int, default=8)
+    parser.add_argument("--action-delay", type=float, default=fake_browser.ACTION_DELAY, help="Fake in-page action cost (seconds)")
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("--baseline", help="Results file of an earlier run to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger().setLevel(logging.WARNING)
+    fake_browser.ACTION_DELAY = args.action_delay
+    database.init_db()
+
+    results = asyncio.run(run_suite(args))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.max_regression)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        print("FAIL" if regressions else "OK: no regressions")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
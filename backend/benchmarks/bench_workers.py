@@ -0,0 +1,138 @@
+"""
+Starts W worker processes against one throwaway SQLite database with N fake
+trackers (the run only sleeps). For every cron slot all processes enqueue
+the slot for every tracker, like their schedulers would, and the workers
+drain the job table. Optionally one worker dies while holding leases.
+Afterwards every (tracker, slot) must have run exactly once.
+
+    python -m backend.benchmarks.bench_workers --workers 4 --trackers 50 --slots 5 --crash
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+_tmpdir = tempfile.mkdtemp(prefix="tracker-bench-")
+os.environ.setdefault("TRACKER_DATABASE_URL", f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}")
+os.environ["TRACKER_EXECUTION_MODE"] = "distributed"
+
+from backend import database, jobs, models, run_queue
+from backend.worker import Worker
+
+LEASE_SECONDS = 2.0
+
+
+def pending_jobs() -> int:
+    db = database.SessionLocal()
+    try:
+        counts = jobs.stats(db)
+        return counts["pending"] + counts["leased"]
+    finally:
+        db.close()
+
+
+def worker_process(index: int, tracker_ids, slots, work: float, crash: bool, barrier, results):
+    async def fake_run(tracker_id: int, require_active: bool):
+        if crash:
+            # Die while holding leases; they must expire and be re-run elsewhere
+            os._exit(1)
+        await asyncio.sleep(random.uniform(work / 2, work * 1.5))
+        ran[tracker_id] += 1
+
+    async def schedule_slots():
+        for slot in slots:
+            await asyncio.to_thread(barrier.wait)
+            for tracker_id in tracker_ids:
+                result = await jobs.call(lambda db: jobs.enqueue(db, tracker_id, slot, run_queue.PRIORITY_SCHEDULED))
+                enqueued[result] += 1
+            while await asyncio.to_thread(pending_jobs):
+                await asyncio.sleep(0.05)
+        worker.stop()
+
+    async def main():
+        scheduler = asyncio.create_task(schedule_slots())
+        await worker.run()
+        await scheduler
+
+    ran, enqueued = Counter(), Counter()
+    worker = Worker(fake_run, owner=f"bench-{index}", concurrency=4, lease_seconds=LEASE_SECONDS, poll_interval=0.05)
+    asyncio.run(main())
+    results.put((index, dict(ran), dict(enqueued)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--trackers", type=int, default=50)
+    parser.add_argument("--slots", type=int, default=5)
+    parser.add_argument("--work", type=float, default=0.05, help="Simulated browser time per run (seconds)")
+    parser.add_argument("--crash", action="store_true", help="Also start a worker that dies holding leases")
+    args = parser.parse_args()
+
+    database.init_db()
+    db = database.SessionLocal()
+    trackers = [models.TrackerModel(name=f"bench-{i}", config=[]) for i in range(args.trackers)]
+    db.add_all(trackers)
+    db.commit()
+    tracker_ids = [t.id for t in trackers]
+    db.close()
+
+    first_slot = jobs.slot_time() - timedelta(minutes=args.slots)
+    slots = [first_slot + timedelta(minutes=i) for i in range(args.slots)]
+
+    ctx = multiprocessing.get_context("spawn")
+    barrier = ctx.Barrier(args.workers)
+    results = ctx.Queue()
+    procs = []
+    if args.crash:
+        crash_barrier = ctx.Barrier(1)
+        crasher = ctx.Process(target=worker_process, args=(-1, tracker_ids, slots[:1], args.work, True, crash_barrier, results))
+        crasher.start()
+        crasher.join()
+    start = time.perf_counter()
+    for i in range(args.workers):
+        proc = ctx.Process(target=worker_process, args=(i, tracker_ids, slots, args.work, False, barrier, results))
+        proc.start()
+        procs.append(proc)
+    reports = [results.get() for _ in procs]
+    for proc in procs:
+        proc.join()
+    elapsed = time.perf_counter() - start
+
+    ran, enqueued = Counter(), Counter()
+    for index, worker_ran, worker_enqueued in sorted(reports):
+        ran.update(worker_ran)
+        enqueued.update(worker_enqueued)
+        print(f"worker {index}: {sum(worker_ran.values())} runs")
+
+    db = database.SessionLocal()
+    Job = models.TrackerJobModel
+    rows = db.query(Job.tracker_id, Job.scheduled_for, Job.status, Job.attempts).all()
+    db.close()
+    slot_keys = Counter((tracker_id, scheduled_for) for tracker_id, scheduled_for, _, _ in rows)
+    retried = sum(1 for *_, attempts in rows if attempts > 1)
+    expected = len(tracker_ids) * len(slots)
+
+    print(f"{expected} slots, {sum(ran.values())} runs in {elapsed:.2f}s with {args.workers} workers")
+    print(f"enqueue results: {dict(enqueued)}, jobs retried after lease expiry: {retried}")
+    problems = []
+    if len(rows) != expected or any(count != 1 for count in slot_keys.values()):
+        problems.append(f"expected one job per slot, found {len(rows)} jobs for {len(slot_keys)} slots")
+    if any(status != "done" for _, _, status, _ in rows):
+        problems.append(f"unfinished jobs: {Counter(status for _, _, status, _ in rows)}")
+    if any(ran[tracker_id] != len(slots) for tracker_id in tracker_ids):
+        problems.append("some trackers did not run exactly once per slot")
+    print("FAIL: " + "; ".join(problems) if problems else "OK: every slot ran exactly once")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+"""
+Stand-in for Playwright/Camoufox used by the offline benchmarks. Pages load
+real HTML over HTTP (from the local fixture server) so parsing, network
+capture and request routing do real work; clicks, typing and the like only
+cost a configurable delay. Plug it in with
+
+    await browser_pool.start(launcher=fake_browser.launcher, playwright=fake_browser.FakePlaywright())
+"""
+import asyncio
+import html
+import re
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import urljoin
+
+import httpx
+
+# Simulated cost of an in-page interaction (click, fill, evaluate, ...)
+ACTION_DELAY = 0.002
+# Simulated cost of starting a browser process
+LAUNCH_DELAY = 0.05
+
+_TAGS = re.compile(r"<[^>]+>")
+_SCRIPTS = re.compile(r"<(script|style)[^>]*>.*?</\1>", re.S | re.I)
+_SUBRESOURCES = re.compile(r"""<(script|img|link)[^>]+(?:src|href)="([^"]+)\"""", re.I)
+_RESOURCE_TYPES = {"script": "script", "img": "image", "link": "stylesheet"}
+# Tiny valid PNG for screenshots
+_PNG = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000d49444154789c6360000002000100e221bc330000000049454e44ae426082"
+)
+
+
+def _text(markup: str) -> str:
+    return html.unescape(_TAGS.sub(" ", _SCRIPTS.sub(" ", markup)))
+
+
+class FakeRequest:
+    __slots__ = ("url", "method", "headers", "resource_type")
+
+    def __init__(self, url: str, resource_type: str, method: str = "GET", headers: Optional[Dict[str, str]] = None):
+        self.url = url
+        self.method = method
+        self.headers = headers or {}
+        self.resource_type = resource_type
+
+
+class FakeResponse:
+    def __init__(self, response: httpx.Response):
+        self.status = response.status_code
+        self.headers = dict(response.headers)
+        self._body = response.content
+
+    async def body(self) -> bytes:
+        return self._body
+
+
+class FakeRoute:
+    """What a route handler sees; loading the resource is the page's job once the handler decided."""
+
+    def __init__(self, request: FakeRequest, client: httpx.AsyncClient):
+        self.request = request
+        self._client = client
+        self.outcome: Optional[str] = None
+
+    async def abort(self, error_code: str = "failed"):
+        self.outcome = "aborted"
+
+    async def continue_(self, **kwargs):
+        await self._client.get(self.request.url)
+        self.outcome = "continued"
+
+    async def fetch(self, **kwargs) -> FakeResponse:
+        return FakeResponse(await self._client.get(self.request.url))
+
+    async def fulfill(self, **kwargs):
+        self.outcome = "fulfilled"
+
+
+class FakeKeyboard:
+    async def press(self, key: str):
+        await asyncio.sleep(ACTION_DELAY)
+
+
+class FakeLocator:
+    async def scroll_into_view_if_needed(self):
+        await asyncio.sleep(ACTION_DELAY)
+
+    async def screenshot(self, **kwargs) -> bytes:
+        await asyncio.sleep(ACTION_DELAY)
+        return _PNG
+
+
+class FakePage:
+    def __init__(self, context: "FakeContext"):
+        self.context = context
+        self.url = "about:blank"
+        self.keyboard = FakeKeyboard()
+        self._html = ""
+        self._listeners: Dict[str, List[Callable]] = {}
+        self._route_handler: Optional[Callable] = None
+        self._headers: Dict[str, str] = {}
+        self._closed = False
+
+    def on(self, event: str, callback: Callable):
+        self._listeners.setdefault(event, []).append(callback)
+
+    async def route(self, pattern: str, handler: Callable):
+        self._route_handler = handler
+
+    def _emit_request(self, request: FakeRequest):
+        for callback in self._listeners.get("request", ()):
+            callback(request)
+
+    async def _load(self, request: FakeRequest) -> Optional[httpx.Response]:
+        self._emit_request(request)
+        client = self.context.browser.client
+        if self._route_handler is None or request.resource_type == "document":
+            return await client.get(request.url, headers=self._headers)
+        await self._route_handler(FakeRoute(request, client))
+        return None
+
+    async def goto(self, url: str, **kwargs):
+        response = await self._load(FakeRequest(url, "document", headers=self._headers))
+        self.url = url
+        self._html = response.text
+        for callback in self._listeners.get("framenavigated", ()):
+            callback(self)
+        subresources = [
+            FakeRequest(urljoin(url, src), _RESOURCE_TYPES[tag.lower()])
+            for tag, src in _SUBRESOURCES.findall(self._html)
+        ]
+        if subresources:
+            await asyncio.gather(*(self._load(request) for request in subresources))
+        return None
+
+    async def reload(self, **kwargs):
+        return await self.goto(self.url)
+
+    async def content(self) -> str:
+        return self._html
+
+    async def inner_text(self, selector: str, **kwargs) -> str:
+        if selector == "body":
+            return _text(self._html)
+        if selector.startswith("#"):
+            match = re.search(rf'id="{re.escape(selector[1:])}"[^>]*>(.*?)</', self._html, re.S)
+            if match:
+                return _text(match.group(1)).strip()
+        raise Exception(f"Timeout waiting for selector '{selector}'")
+
+    async def click(self, selector: str, **kwargs):
+        await asyncio.sleep(ACTION_DELAY)
+
+    async def fill(self, selector: str, value: str, **kwargs):
+        await asyncio.sleep(ACTION_DELAY)
+
+    def locator(self, selector: str) -> FakeLocator:
+        return FakeLocator()
+
+    async def evaluate(self, script: str, *args) -> Any:
+        await asyncio.sleep(ACTION_DELAY)
+        if script.startswith("([needles, radius])"):
+            return self._find(*args[0])
+        return len(self._html)
+
+    def _find(self, needles: List[str], radius: int) -> List[Optional[Dict[str, Any]]]:
+        """What the grep steps' in-page search returns."""
+        text = _text(self._html)
+        matches = []
+        for needle in needles:
+            for source, haystack in (("text", text), ("html", self._html)):
+                offset = haystack.find(needle)
+                if offset >= 0:
+                    matches.append({"source": source, "offset": offset,
+                                    "snippet": haystack[max(0, offset - radius):offset + len(needle) + radius]})
+                    break
+            else:
+                matches.append(None)
+        return matches
+
+    async def screenshot(self, path: Optional[str] = None, **kwargs) -> bytes:
+        await asyncio.sleep(ACTION_DELAY)
+        if path:
+            with open(path, "wb") as f:
+                f.write(_PNG)
+        return _PNG
+
+    async def set_extra_http_headers(self, headers: Dict[str, str]):
+        self._headers.update(headers)
+
+    async def wait_for_load_state(self, state: str = "load", **kwargs):
+        await asyncio.sleep(ACTION_DELAY)
+
+    async def close(self):
+        self._closed = True
+
+
+class FakeContext:
+    def __init__(self, browser: "FakeBrowser", storage_state: Any = None):
+        self.browser = browser
+        self.pages: List[FakePage] = []
+        self._cookies: List[Dict[str, Any]] = []
+
+    async def new_page(self) -> FakePage:
+        page = FakePage(self)
+        self.pages.append(page)
+        return page
+
+    async def cookies(self) -> List[Dict[str, Any]]:
+        return list(self._cookies)
+
+    async def add_cookies(self, cookies: List[Dict[str, Any]]):
+        self._cookies.extend(cookies)
+
+    async def clear_cookies(self):
+        self._cookies.clear()
+
+    async def storage_state(self) -> Dict[str, Any]:
+        return {"cookies": list(self._cookies), "origins": []}
+
+    async def close(self):
+        self.browser.contexts.remove(self)
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.client = httpx.AsyncClient(timeout=30, limits=httpx.Limits(max_connections=100))
+        self.contexts: List[FakeContext] = []
+        self._connected = True
+
+    def is_connected(self) -> bool:
+        return self._connected
+
+    async def new_context(self, **kwargs) -> FakeContext:
+        context = FakeContext(self, kwargs.get("storage_state"))
+        self.contexts.append(context)
+        return context
+
+    async def close(self):
+        self._connected = False
+        await self.client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+
+class FakePlaywright:
+    """Only passed through to the launcher; nothing is read from it."""
+
+
+async def launcher(playwright, headless: bool) -> FakeBrowser:
+    await asyncio.sleep(LAUNCH_DELAY)
+    return FakeBrowser()
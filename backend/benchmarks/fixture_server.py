@@ -0,0 +1,95 @@
+"""
+Local HTTP stand-in for the sites trackers visit, served by uvicorn on its
+own thread so its work doesn't show up as event-loop lag of the code under
+test.
+
+    /page/<n>     HTML page with a price, a status line and a few subresources
+    /api/<n>      JSON document with an ETag (answers 304 to If-None-Match)
+    /static/<f>   cacheable script/stylesheet/image bodies
+"""
+import hashlib
+import json
+import socket
+import threading
+import time
+
+import uvicorn
+
+STATIC_BYTES = 16 * 1024
+
+
+def _page(n: int) -> bytes:
+    items = "".join(f"<li class=\"item\">Item {i} of page {n}</li>" for i in range(50))
+    return f"""<!doctype html>
+<html><head><title>Fixture {n}</title>
+<link rel="stylesheet" href="/static/site.css">
+<script src="/static/app.js"></script>
+<script src="/static/analytics.js?p={n}"></script>
+</head><body>
+<h1 id="title">Product {n}</h1>
+<p id="price">Price: ${n % 97 + 3}.99</p>
+<p id="status">In stock</p>
+<img src="/static/logo.png">
+<ul>{items}</ul>
+</body></html>""".encode()
+
+
+async def app(scope, receive, send):
+    if scope["type"] != "http":
+        return
+    path = scope["path"]
+    headers = {k.decode().lower(): v.decode() for k, v in scope["headers"]}
+    status, content_type, extra, body = 404, "text/plain", [], b"not found"
+    parts = path.strip("/").split("/")
+    if len(parts) == 2 and parts[0] == "page" and parts[1].isdigit():
+        status, content_type, body = 200, "text/html; charset=utf-8", _page(int(parts[1]))
+    elif len(parts) == 2 and parts[0] == "api" and parts[1].isdigit():
+        body = json.dumps({"id": int(parts[1]), "status": "ok", "values": list(range(20))}).encode()
+        etag = '"' + hashlib.md5(body).hexdigest() + '"'
+        extra = [(b"etag", etag.encode())]
+        if headers.get("if-none-match") == etag:
+            status, body = 304, b""
+        else:
+            status, content_type = 200, "application/json"
+    elif len(parts) == 2 and parts[0] == "static":
+        kind = parts[1].rsplit(".", 1)[-1]
+        content_type = {"js": "application/javascript", "css": "text/css", "png": "image/png"}.get(kind, "application/octet-stream")
+        status, body = 200, b"x" * STATIC_BYTES
+        extra = [(b"cache-control", b"public, max-age=3600")]
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", content_type.encode()), (b"content-length", str(len(body)).encode())] + extra,
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class FixtureServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, asgi_app=app):
+        self.host = host
+        self.port = port or self._free_port()
+        self._server = uvicorn.Server(uvicorn.Config(asgi_app, host=self.host, port=self.port, log_level="warning", lifespan="off"))
+        self._thread = threading.Thread(target=self._server.run, name="fixture-server", daemon=True)
+
+    @staticmethod
+    def _free_port() -> int:
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            return s.getsockname()[1]
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def start(self, timeout: float = 10) -> "FixtureServer":
+        self._thread.start()
+        deadline = time.monotonic() + timeout
+        while not self._server.started:
+            if time.monotonic() > deadline:
+                raise RuntimeError("Fixture server did not start")
+            time.sleep(0.01)
+        return self
+
+    def stop(self):
+        self._server.should_exit = True
+        self._thread.join(5)
@@ -0,0 +1,229 @@
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from backend import metrics
+
+logger = logging.getLogger(__name__)
+
+# Pool configuration (number of browser processes per headless/headed pool and
+# how many runs a browser serves before it is recycled)
+POOL_SIZE = int(os.environ.get("TRACKER_BROWSER_POOL_SIZE", "2"))
+MAX_RUNS_PER_BROWSER = int(os.environ.get("TRACKER_BROWSER_MAX_RUNS", "50"))
+HEALTH_CHECK_INTERVAL = float(os.environ.get("TRACKER_BROWSER_HEALTH_INTERVAL", "30"))
+
+Launcher = Callable[[Any, bool], Awaitable[Any]]
+
+
+async def camoufox_launcher(playwright, headless: bool):
+    from camoufox import AsyncNewBrowser
+    return await AsyncNewBrowser(playwright, headless=headless)
+
+
+class PooledBrowser:
+    def __init__(self, browser):
+        self.browser = browser
+        self.runs = 0 # Contexts handed out over the browser's lifetime
+        self.active = 0 # Contexts currently open
+        self.retiring = False # No new contexts, close once idle
+
+    def is_healthy(self) -> bool:
+        return not self.retiring and self.browser.is_connected()
+
+
+class BrowserPool:
+    """
+    Keeps up to `size` long-lived browser processes and hands out a fresh,
+    isolated BrowserContext per run. Browsers are recycled after `max_runs`
+    contexts or as soon as they are found disconnected.
+    """
+
+    def __init__(self, playwright, headless: bool, size: int = POOL_SIZE,
+                 max_runs: int = MAX_RUNS_PER_BROWSER, launcher: Launcher = camoufox_launcher):
+        self.playwright = playwright
+        self.headless = headless
+        self.size = max(1, size)
+        self.max_runs = max(1, max_runs)
+        self.launcher = launcher
+        self.launches = 0
+        self._browsers: List[PooledBrowser] = []
+        self._launching = 0 # Slots reserved by launches in progress
+        self._lock = asyncio.Lock()
+        self._changed = asyncio.Condition(self._lock)
+        self._closed = False
+
+    async def _launch(self) -> PooledBrowser:
+        started = time.perf_counter()
+        browser = await self.launcher(self.playwright, self.headless)
+        metrics.BROWSER_LAUNCH_SECONDS.observe(time.perf_counter() - started, "pool")
+        self.launches += 1
+        logger.info(f"Launched {'headless' if self.headless else 'headed'} browser (pool launches: {self.launches})")
+        return PooledBrowser(browser)
+
+    async def _checkout(self) -> PooledBrowser:
+        # A launch takes seconds, so it reserves a slot and runs outside the
+        # lock; checkouts meanwhile share the running browsers
+        async with self._changed:
+            while True:
+                if self._closed:
+                    raise Exception("Browser pool is closed")
+                self._prune()
+                healthy = [b for b in self._browsers if b.is_healthy()]
+                if len(healthy) + self._launching < self.size:
+                    self._launching += 1
+                    break
+                if healthy:
+                    return self._hand_out(min(healthy, key=lambda b: b.active))
+                await self._changed.wait()
+        try:
+            pooled = await self._launch()
+        except BaseException:
+            async with self._changed:
+                self._launching -= 1
+                self._changed.notify_all()
+            raise
+        async with self._changed:
+            self._launching -= 1
+            self._browsers.append(pooled)
+            self._changed.notify_all()
+            if self._closed:
+                self._browsers.remove(pooled)
+                closed = True
+            else:
+                closed = False
+                self._hand_out(pooled)
+        if closed:
+            await self._close_browser(pooled)
+            raise Exception("Browser pool is closed")
+        return pooled
+
+    def _hand_out(self, pooled: PooledBrowser) -> PooledBrowser:
+        pooled.active += 1
+        pooled.runs += 1
+        if pooled.runs >= self.max_runs:
+            pooled.retiring = True
+        return pooled
+
+    async def _release(self, pooled: PooledBrowser):
+        pooled.active -= 1
+        if not pooled.browser.is_connected():
+            pooled.retiring = True
+        if pooled.retiring and pooled.active == 0:
+            async with self._changed:
+                if pooled in self._browsers:
+                    self._browsers.remove(pooled)
+                self._changed.notify_all()
+            await self._close_browser(pooled)
+
+    def _prune(self):
+        # Drop crashed browsers that nobody is using anymore
+        for pooled in list(self._browsers):
+            if not pooled.browser.is_connected():
+                pooled.retiring = True
+                if pooled.active == 0:
+                    self._browsers.remove(pooled)
+                    logger.warning("Removed disconnected browser from pool")
+
+    async def _close_browser(self, pooled: PooledBrowser):
+        try:
+            if pooled.browser.is_connected():
+                await pooled.browser.close()
+        except Exception as e:
+            logger.warning(f"Failed to close pooled browser: {e}")
+
+    @asynccontextmanager
+    async def context(self, **kwargs):
+        pooled = await self._checkout()
+        context = None
+        try:
+            context = await pooled.browser.new_context(**kwargs)
+            yield context
+        finally:
+            if context is not None:
+                try:
+                    await context.close()
+                except Exception as e:
+                    logger.warning(f"Failed to close browser context: {e}")
+            await self._release(pooled)
+
+    async def health_check(self):
+        # Passive: only notices browsers whose connection already dropped
+        async with self._changed:
+            self._prune()
+            self._changed.notify_all()
+
+    async def close(self):
+        async with self._changed:
+            self._closed = True
+            self._changed.notify_all()
+            browsers, self._browsers = self._browsers, []
+        for pooled in browsers:
+            await self._close_browser(pooled)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "headless": self.headless,
+            "size": self.size,
+            "browsers": len(self._browsers),
+            "active_contexts": sum(b.active for b in self._browsers),
+            "launches": self.launches,
+        }
+
+
+_playwright_manager = None
+_pools: Dict[bool, BrowserPool] = {}
+_health_task: Optional[asyncio.Task] = None
+
+
+async def start(launcher: Launcher = camoufox_launcher, playwright=None):
+    """Starts the shared Playwright driver. Browsers are launched lazily on first use."""
+    global _playwright_manager, _health_task
+    if _pools:
+        return
+    if playwright is None:
+        from playwright.async_api import async_playwright
+        _playwright_manager = async_playwright()
+        playwright = await _playwright_manager.start()
+    for headless in (True, False):
+        _pools[headless] = BrowserPool(playwright, headless, launcher=launcher)
+    _health_task = asyncio.create_task(_health_loop())
+    logger.info(f"Browser pool started (size={POOL_SIZE}, max_runs={MAX_RUNS_PER_BROWSER})")
+
+
+async def stop():
+    global _playwright_manager, _health_task
+    if _health_task:
+        _health_task.cancel()
+        _health_task = None
+    for pool in _pools.values():
+        await pool.close()
+    _pools.clear()
+    if _playwright_manager:
+        await _playwright_manager.__aexit__(None, None, None)
+        _playwright_manager = None
+    logger.info("Browser pool stopped")
+
+
+def get_pool(headless: bool) -> Optional[BrowserPool]:
+    return _pools.get(headless)
+
+
+def stats() -> List[Dict[str, Any]]:
+    return [pool.stats() for pool in _pools.values()]
+
+
+metrics.Gauge("tracker_browsers_open", "Pooled browser processes.", lambda: sum(len(pool._browsers) for pool in _pools.values()))
+metrics.Gauge("tracker_browser_contexts_open", "Browser contexts of pooled browsers in use.",
+              lambda: sum(b.active for pool in _pools.values() for b in pool._browsers))
+
+
+async def _health_loop():
+    while True:
+        await asyncio.sleep(HEALTH_CHECK_INTERVAL)
+        for pool in list(_pools.values()):
+            try:
+                await pool.health_check()
+            except Exception as e:
+                logger.error(f"Browser pool health check failed: {e}")
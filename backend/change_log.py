@@ -0,0 +1,118 @@
+"""
+Cross-process change log for distributed mode. Runs finish in worker
+processes, whose feed invalidations and dashboard events would otherwise
+only reach their own feed cache and event broker. Every process also
+records them in tracker_events, in the transaction that made the change;
+API processes tail the table and apply what other processes wrote.
+
+Modules register a handler per kind of change with `on`. Rows are applied
+in id order; SQLite commits one writer at a time, so ids become visible in
+order and a tailer never skips one.
+"""
+import asyncio
+import logging
+import os
+import socket
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from backend import database, jobs, models
+
+logger = logging.getLogger(__name__)
+
+# Seconds between polls of API processes (dashboard events); feeds catch up before every request
+POLL_INTERVAL = float(os.environ.get("TRACKER_EVENTS_POLL_SECONDS", "1"))
+RETENTION_HOURS = int(os.environ.get("TRACKER_EVENTS_RETENTION_HOURS", "1"))
+BATCH = 500
+
+ORIGIN = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+_handlers: Dict[str, Callable[[Dict[str, Any]], None]] = {}
+_lock = threading.Lock()
+_last_id: Optional[int] = None
+
+
+def on(kind: str, handler: Callable[[Dict[str, Any]], None]):
+    _handlers[kind] = handler
+
+
+def record(db: Session, data: Dict[str, Any]):
+    """Adds a change to the session's transaction; a no-op unless distributed."""
+    if jobs.is_distributed():
+        db.add(models.TrackerEventModel(origin=ORIGIN, data=data, created_at=datetime.utcnow()))
+
+
+def catch_up(db: Session) -> int:
+    """Applies changes other processes committed since the last call; returns how many."""
+    global _last_id
+    if not jobs.is_distributed():
+        return 0
+    E = models.TrackerEventModel
+    applied = 0
+    with _lock:
+        if _last_id is None:
+            # Starting up: nothing cached or subscribed yet, so older changes don't matter
+            _last_id = db.query(func.max(E.id)).scalar() or 0
+            return 0
+        while True:
+            rows = db.query(E.id, E.origin, E.data).filter(E.id > _last_id).order_by(E.id).limit(BATCH).all()
+            for row_id, origin, data in rows:
+                handler = _handlers.get(data.get("type"))
+                if origin != ORIGIN and handler is not None:
+                    handler(data)
+                    applied += 1
+                _last_id = row_id
+            if len(rows) < BATCH:
+                return applied
+
+
+def purge(db: Session, hours: int = RETENTION_HOURS) -> int:
+    E = models.TrackerEventModel
+    removed = db.query(E).filter(E.created_at < datetime.utcnow() - timedelta(hours=hours)).delete(synchronize_session=False)
+    db.commit()
+    return removed
+
+
+def _call(session_factory, op: Callable[[Session], Any]) -> Any:
+    db = session_factory()
+    try:
+        return op(db)
+    finally:
+        db.close()
+
+
+class Tailer:
+    """Polls the change log in an API process, so dashboards get events from workers."""
+
+    def __init__(self, poll_interval: float = POLL_INTERVAL):
+        self.poll_interval = poll_interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def _loop(self):
+        last_purge = 0.0
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                await asyncio.to_thread(_call, database.ReadSessionLocal, catch_up)
+                if loop.time() - last_purge > 3600:
+                    await asyncio.to_thread(_call, database.WriteSessionLocal, purge)
+                    last_purge = loop.time()
+            except Exception as e:
+                logger.error(f"Reading the change log failed: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+
+tailer = Tailer()
@@ -0,0 +1,80 @@
+import difflib
+import hashlib
+import os
+import re
+import zlib
+from typing import Dict, Optional, Pattern
+
+# Snapshot text is truncated to this many bytes before compression
+SNAPSHOT_MAX_BYTES = int(os.environ.get("TRACKER_SNAPSHOT_MAX_BYTES", str(64 * 1024)))
+# Snapshots kept per tracker and watched key; older ones are deleted
+SNAPSHOTS_KEEP = int(os.environ.get("TRACKER_SNAPSHOTS_KEEP", "5"))
+DIFF_MAX_LINES = int(os.environ.get("TRACKER_DIFF_MAX_LINES", "200"))
+
+_SPACES = re.compile(r"\s+")
+
+
+def normalize(text: str, ignore: Optional[Pattern] = None) -> str:
+    """
+    Canonical form used for fingerprints: ignored fragments (counters,
+    timestamps) removed, whitespace collapsed and blank lines dropped, so
+    layout-only changes don't count as changes.
+    """
+    if ignore is not None:
+        text = ignore.sub("", text)
+    lines = (_SPACES.sub(" ", line).strip() for line in text.splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def fingerprint(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def compress(text: str, max_bytes: int = SNAPSHOT_MAX_BYTES) -> bytes:
+    data = text.encode()
+    if len(data) > max_bytes:
+        data = data[:max_bytes].decode(errors="ignore").encode()
+    return zlib.compress(data)
+
+
+def decompress(data: Optional[bytes]) -> str:
+    return zlib.decompress(data).decode() if data else ""
+
+
+def diff(old: str, new: str, max_lines: int = DIFF_MAX_LINES) -> str:
+    lines = list(difflib.unified_diff(old.splitlines(), new.splitlines(), "before", "after", lineterm="", n=1))
+    if len(lines) > max_lines:
+        lines = lines[:max_lines] + [f"... {len(lines) - max_lines} more lines"]
+    return "\n".join(lines)
+
+
+class WatchResult:
+    __slots__ = ("key", "fingerprint", "text", "changed")
+
+    def __init__(self, key: str, fingerprint: str, text: str, changed: bool):
+        self.key = key
+        self.fingerprint = fingerprint
+        self.text = text
+        self.changed = changed
+
+
+class ContentWatch:
+    """
+    Fingerprints of a tracker's watched content. Holds the fingerprints stored
+    by the previous run and collects this run's results for the runner to
+    persist.
+    """
+
+    def __init__(self, previous: Optional[Dict[str, str]] = None):
+        self.previous = previous or {}
+        self.results: Dict[str, WatchResult] = {}
+
+    def check(self, key: str, text: str) -> WatchResult:
+        value = fingerprint(text)
+        result = WatchResult(key, value, text, self.previous.get(key) != value)
+        self.results[key] = result
+        return result
+
+    @property
+    def changed(self) -> bool:
+        return any(result.changed for result in self.results.values())
@@ -1,20 +1,170 @@
-import sys
 import os
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import hashlib
 
-from sqlalchemy.orm import Session
-from backend import models
-from datetime import datetime
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session, load_only
+from backend import models, feeds, events, plan, content_diff, screenshots
+from datetime import datetime, timedelta
+
+# History retention: raw runs are rolled into hourly aggregates after
+# RUN_RETENTION_DAYS, hourly aggregates into daily ones after HOURLY_RETENTION_DAYS
+RUN_RETENTION_DAYS = int(os.environ.get("TRACKER_RUN_RETENTION_DAYS", "7"))
+HOURLY_RETENTION_DAYS = int(os.environ.get("TRACKER_HOURLY_RETENTION_DAYS", "90"))
+
+_BUCKET_FORMATS = {"hour": "%Y-%m-%d %H:00:00", "day": "%Y-%m-%d 00:00:00"}
 
 def get_tracker(db: Session, tracker_id: int):
     return db.query(models.TrackerModel).filter(models.TrackerModel.id == tracker_id).first()
 
-def get_trackers(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.TrackerModel).offset(skip).limit(limit).all()
+TRACKER_ORDERS = ("id", "last_run")
+
+def _filter_trackers(query, is_active: bool, status: str, order: str):
+    # Each filter and order has an index (ix_trackers_*)
+    T = models.TrackerModel
+    if is_active is not None:
+        query = query.filter(T.is_active == is_active)
+    if status is not None:
+        query = query.filter(T.last_run_status == status)
+    if order == "last_run":
+        return query.order_by(T.last_run_at.desc(), T.id.desc())
+    return query.order_by(T.id)
+
+def get_trackers(db: Session, skip: int = 0, limit: int = 100, is_active: bool = None,
+                 status: str = None, order: str = "id"):
+    query = _filter_trackers(db.query(models.TrackerModel), is_active, status, order)
+    return query.offset(skip).limit(limit).all()
+
+def _summary_query(db: Session):
+    # Only the columns dashboards render, configs and logs are never loaded
+    T = models.TrackerModel
+    return db.query(T).options(load_only(
+        T.id, T.name, T.description, T.schedule_cron, T.last_run_status,
+        T.last_run_at, T.last_run_info, T.is_active, T.created_at,
+    ))
+
+def get_tracker_summaries(db: Session, skip: int = 0, limit: int = 100, is_active: bool = None,
+                          status: str = None, order: str = "id"):
+    return _filter_trackers(_summary_query(db), is_active, status, order).offset(skip).limit(limit).all()
+
+def get_tracker_summary(db: Session, tracker_id: int):
+    return _summary_query(db).filter(models.TrackerModel.id == tracker_id).first()
+
+def iter_trackers(db: Session, chunk_size: int = 500):
+    """All trackers in id order, fetched in keyset-paginated chunks so any number of them streams in flat memory."""
+    T = models.TrackerModel
+    last_id = 0
+    while True:
+        chunk = db.query(T).filter(T.id > last_id).order_by(T.id).limit(chunk_size).all()
+        if not chunk:
+            return
+        yield from chunk
+        last_id = chunk[-1].id
+
+def iter_schedules(db: Session, chunk_size: int = 1000):
+    """(id, cron, last run time) of active scheduled trackers, in chunks; configs are never loaded."""
+    T = models.TrackerModel
+    last_id = 0
+    while True:
+        chunk = db.query(T.id, T.schedule_cron, T.last_run_at).filter(
+            T.id > last_id, T.schedule_cron.isnot(None), T.schedule_cron != "", T.is_active == True,
+        ).order_by(T.id).limit(chunk_size).all()
+        if not chunk:
+            return
+        yield from chunk
+        last_id = chunk[-1].id
+
+def _chunks(ids: list, size: int = 500):
+    # Stays below SQLite's bound parameter limit
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+def get_trackers_by_ids(db: Session, tracker_ids: list):
+    T = models.TrackerModel
+    trackers = []
+    for chunk in _chunks(list(dict.fromkeys(tracker_ids))):
+        trackers.extend(db.query(T).filter(T.id.in_(chunk)).all())
+    return trackers
+
+def _compile_all(trackers: list):
+    for index, tracker in enumerate(trackers):
+        try:
+            plan.compile_config(tracker.config)
+        except plan.PlanError as e:
+            raise plan.PlanError(f"tracker {index + 1} ({tracker.name}): {e}")
+
+def create_trackers(db: Session, trackers: list, commit: bool = True) -> list:
+    """
+    Creates all trackers in one transaction, or none if any config is
+    invalid. Returns the new ids in input order (rows aren't refreshed).
+    """
+    _compile_all(trackers)
+    db_trackers = [models.TrackerModel(**tracker.dict()) for tracker in trackers]
+    db.add_all(db_trackers)
+    db.flush()
+    ids = [db_tracker.id for db_tracker in db_trackers]
+    for tracker_id in ids:
+        feeds.mark_changed(db, tracker_id, transitions=True)
+        events.tracker_changed(db, tracker_id, "created")
+    if commit:
+        db.commit()
+    return ids
+
+def update_trackers(db: Session, updates: list):
+    """Applies TrackerBulkUpdates in one transaction. Returns (updated ids, ids that don't exist)."""
+    _compile_all(updates)
+    existing = {tracker.id: tracker for tracker in get_trackers_by_ids(db, [update.id for update in updates])}
+    updated, missing = [], []
+    for update in updates:
+        db_tracker = existing.get(update.id)
+        if db_tracker is None:
+            missing.append(update.id)
+            continue
+        db_tracker.name = update.name
+        db_tracker.description = update.description
+        db_tracker.config = update.config
+        db_tracker.schedule_cron = update.schedule_cron
+        db_tracker.is_active = update.is_active
+        feeds.mark_changed(db, update.id, transitions=True)
+        events.tracker_changed(db, update.id, "updated")
+        updated.append(update.id)
+    db.commit()
+    return updated, missing
+
+def existing_tracker_ids(db: Session, tracker_ids: list) -> set:
+    T = models.TrackerModel
+    found = set()
+    for chunk in _chunks(list(dict.fromkeys(tracker_ids))):
+        found.update(tracker_id for (tracker_id,) in db.query(T.id).filter(T.id.in_(chunk)).all())
+    return found
+
+def _delete_tracker_history(db: Session, tracker_ids: list):
+    for chunk in _chunks(tracker_ids):
+        run_ids = db.query(models.TrackerRunModel.id).filter(models.TrackerRunModel.tracker_id.in_(chunk))
+        db.query(models.TrackerRunLogChunkModel).filter(models.TrackerRunLogChunkModel.run_id.in_(run_ids.scalar_subquery())).delete(synchronize_session=False)
+        for model in (models.TrackerRunModel, models.TrackerRunAggregateModel, models.TrackerContentFingerprintModel, models.TrackerContentSnapshotModel, models.TrackerScreenshotModel, models.NotificationModel):
+            db.query(model).filter(model.tracker_id.in_(chunk)).delete(synchronize_session=False)
+    for tracker_id in tracker_ids:
+        feeds.mark_changed(db, tracker_id, transitions=True)
+        events.tracker_changed(db, tracker_id, "deleted")
+
+def delete_trackers(db: Session, tracker_ids: list):
+    """Deletes trackers and their history in one transaction. Returns (deleted ids, ids that don't exist)."""
+    found = existing_tracker_ids(db, tracker_ids)
+    deleted = [tracker_id for tracker_id in dict.fromkeys(tracker_ids) if tracker_id in found]
+    _delete_tracker_history(db, deleted)
+    for chunk in _chunks(deleted):
+        db.query(models.TrackerModel).filter(models.TrackerModel.id.in_(chunk)).delete(synchronize_session=False)
+    db.commit()
+    return deleted, [tracker_id for tracker_id in tracker_ids if tracker_id not in found]
 
 def create_tracker(db: Session, tracker: models.TrackerCreate):
+    # Raises plan.PlanError so invalid configs never reach the scheduler
+    plan.compile_config(tracker.config)
     db_tracker = models.TrackerModel(**tracker.dict())
     db.add(db_tracker)
+    db.flush()
+    feeds.mark_changed(db, db_tracker.id, transitions=True)
+    events.tracker_changed(db, db_tracker.id, "created")
     db.commit()
     db.refresh(db_tracker)
     return db_tracker
@@ -22,24 +172,40 @@ def create_tracker(db: Session, tracker: models.TrackerCreate):
 def delete_tracker(db: Session, tracker_id: int):
     db_tracker = db.query(models.TrackerModel).filter(models.TrackerModel.id == tracker_id).first()
     if db_tracker:
+        _delete_tracker_history(db, [tracker_id])
         db.delete(db_tracker)
         db.commit()
     return db_tracker
 
-def update_tracker_status(db: Session, tracker_id: int, status: str, logs: str = None, run_info: dict = None):
+def update_tracker_status(db: Session, tracker_id: int, status: str, logs: str = None, run_info: dict = None, commit: bool = True,
+                          quiet: bool = False, status_changed: bool = None):
+    # quiet: nothing changed since the last run (watched content and status), so feeds and dashboards aren't notified.
+    # status_changed: the final status differs from the previous run's (finish_run knows); without it the
+    # stored status is compared, which is 'running' while a run lasts
     db_tracker = db.query(models.TrackerModel).filter(models.TrackerModel.id == tracker_id).first()
     if db_tracker:
+        if status_changed is None:
+            status_changed = db_tracker.last_run_status != status
+        # Feeds only show final statuses
+        if status != "running" and status_changed and not quiet:
+            feeds.mark_changed(db, tracker_id)
         db_tracker.last_run_status = status
         db_tracker.last_run_at = datetime.utcnow()
         if logs:
             db_tracker.last_run_logs = logs
         if run_info:
             db_tracker.last_run_info = run_info
-        db.commit()
-        db.refresh(db_tracker)
+        if not quiet:
+            events.status_changed(db, tracker_id, status, db_tracker.last_run_at)
+        if commit:
+            db.commit()
+            db.refresh(db_tracker)
+        else:
+            db.flush()
     return db_tracker
 
 def update_tracker(db: Session, tracker_id: int, tracker_update: models.TrackerCreate):
+    plan.compile_config(tracker_update.config)
     db_tracker = db.query(models.TrackerModel).filter(models.TrackerModel.id == tracker_id).first()
     if db_tracker:
         db_tracker.name = tracker_update.name
@@ -47,6 +213,264 @@ def update_tracker(db: Session, tracker_id: int, tracker_update: models.TrackerC
         db_tracker.config = tracker_update.config
         db_tracker.schedule_cron = tracker_update.schedule_cron
         db_tracker.is_active = tracker_update.is_active
+        feeds.mark_changed(db, tracker_id, transitions=True)
+        events.tracker_changed(db, tracker_id, "updated")
         db.commit()
         db.refresh(db_tracker)
     return db_tracker
+
+def create_run(db: Session, tracker_id: int, commit: bool = True):
+    db_run = models.TrackerRunModel(tracker_id=tracker_id, status="running", started_at=datetime.utcnow())
+    db.add(db_run)
+    if commit:
+        db.commit()
+        db.refresh(db_run)
+    else:
+        db.flush()
+    return db_run
+
+def finish_run(db: Session, run_id: int, status: str, logs: str = None, run_info: dict = None, commit: bool = True):
+    db_run = db.query(models.TrackerRunModel).filter(models.TrackerRunModel.id == run_id).first()
+    if db_run:
+        previous = db.query(models.TrackerRunModel.status).filter(
+            models.TrackerRunModel.tracker_id == db_run.tracker_id,
+            models.TrackerRunModel.started_at <= db_run.started_at,
+            models.TrackerRunModel.id != db_run.id,
+            models.TrackerRunModel.status != "running",
+        ).order_by(models.TrackerRunModel.started_at.desc()).first()
+        db_run.status = status
+        db_run.status_changed = previous is None or previous.status != status
+        if db_run.status_changed:
+            feeds.mark_changed(db, db_run.tracker_id, transitions=True)
+        db_run.finished_at = datetime.utcnow()
+        db_run.duration_ms = int((db_run.finished_at - db_run.started_at).total_seconds() * 1000)
+        db_run.logs = logs
+        db_run.run_info = run_info
+        if commit:
+            db.commit()
+            db.refresh(db_run)
+        else:
+            db.flush()
+    return db_run
+
+def get_run(db: Session, tracker_id: int, run_id: int):
+    return db.query(models.TrackerRunModel).filter(
+        models.TrackerRunModel.tracker_id == tracker_id,
+        models.TrackerRunModel.id == run_id,
+    ).first()
+
+def get_runs(db: Session, tracker_id: int, skip: int = 0, limit: int = 100, before_id: int = None):
+    # before_id allows keyset pagination, which stays fast on deep pages
+    query = db.query(models.TrackerRunModel).filter(models.TrackerRunModel.tracker_id == tracker_id)
+    if before_id is not None:
+        query = query.filter(models.TrackerRunModel.id < before_id)
+    return query.order_by(models.TrackerRunModel.started_at.desc(), models.TrackerRunModel.id.desc()).offset(skip).limit(limit).all()
+
+def get_failure_streak(db: Session, tracker_id: int, limit: int = 32):
+    """Number of consecutive failed runs (up to `limit`) and when the latest run started."""
+    rows = db.query(models.TrackerRunModel.status, models.TrackerRunModel.started_at).filter(
+        models.TrackerRunModel.tracker_id == tracker_id,
+        models.TrackerRunModel.status != "running",
+    ).order_by(models.TrackerRunModel.started_at.desc()).limit(limit).all()
+    streak = 0
+    for status, _ in rows:
+        if status != "failure":
+            break
+        streak += 1
+    return streak, rows[0].started_at if rows else None
+
+def save_run_log_chunks(db: Session, run_id: int, chunks: list, commit: bool = True):
+    db.add_all([models.TrackerRunLogChunkModel(run_id=run_id, seq=seq, data=data) for seq, data in enumerate(chunks)])
+    if commit:
+        db.commit()
+    else:
+        db.flush()
+
+def get_run_log_chunks(db: Session, run_id: int):
+    return db.query(models.TrackerRunLogChunkModel).filter(
+        models.TrackerRunLogChunkModel.run_id == run_id
+    ).order_by(models.TrackerRunLogChunkModel.seq).all()
+
+def get_content_fingerprints(db: Session, tracker_id: int):
+    rows = db.query(models.TrackerContentFingerprintModel.key, models.TrackerContentFingerprintModel.fingerprint).filter(
+        models.TrackerContentFingerprintModel.tracker_id == tracker_id
+    ).all()
+    return {key: fingerprint for key, fingerprint in rows}
+
+def save_content_results(db: Session, tracker_id: int, run_id: int, results, commit: bool = True):
+    """
+    Stores the fingerprints of a run's watch_content steps. Changed content
+    gets a compressed snapshot with a diff against the previous snapshot;
+    only the newest SNAPSHOTS_KEEP snapshots per key are kept.
+    """
+    F, S = models.TrackerContentFingerprintModel, models.TrackerContentSnapshotModel
+    now = datetime.utcnow()
+    changed = False
+    for result in results:
+        row = db.query(F).filter(F.tracker_id == tracker_id, F.key == result.key).first()
+        if row is None:
+            row = F(tracker_id=tracker_id, key=result.key, fingerprint="")
+            db.add(row)
+        row.checked_at = now
+        if row.fingerprint == result.fingerprint:
+            continue
+        changed = True
+        previous = db.query(S.content).filter(S.tracker_id == tracker_id, S.key == result.key).order_by(S.id.desc()).first()
+        db.add(S(
+            tracker_id=tracker_id, key=result.key, run_id=run_id, fingerprint=result.fingerprint,
+            content=content_diff.compress(result.text), created_at=now,
+            diff=content_diff.compress(content_diff.diff(content_diff.decompress(previous.content), result.text)) if previous else None,
+        ))
+        row.fingerprint = result.fingerprint
+        row.size = len(result.text)
+        row.changed_at = now
+        db.flush()
+        stale = db.query(S.id).filter(S.tracker_id == tracker_id, S.key == result.key).order_by(S.id.desc()).offset(content_diff.SNAPSHOTS_KEEP)
+        db.query(S).filter(S.id.in_(stale.scalar_subquery())).delete(synchronize_session=False)
+    if changed:
+        # New guid for the tracker's feed item even if the status stayed the same
+        feeds.mark_changed(db, tracker_id)
+    if commit:
+        db.commit()
+    else:
+        db.flush()
+    return changed
+
+def save_screenshots(db: Session, tracker_id: int, run_id: int, shots, commit: bool = True):
+    """Records a run's screenshots; only the newest screenshots.KEEP per tracker are kept."""
+    Shot = models.TrackerScreenshotModel
+    now = datetime.utcnow()
+    db.add_all([Shot(tracker_id=tracker_id, run_id=run_id, hash=shot["hash"], format=shot["format"], size=shot["size"],
+                     selector=shot.get("selector"), created_at=now) for shot in shots])
+    db.flush()
+    stale = db.query(Shot.id).filter(Shot.tracker_id == tracker_id).order_by(Shot.id.desc()).offset(screenshots.KEEP)
+    db.query(Shot).filter(Shot.id.in_(stale.scalar_subquery())).delete(synchronize_session=False)
+    if commit:
+        db.commit()
+    else:
+        db.flush()
+
+def get_screenshots(db: Session, tracker_id: int, skip: int = 0, limit: int = 20):
+    Shot = models.TrackerScreenshotModel
+    return db.query(Shot).filter(Shot.tracker_id == tracker_id).order_by(Shot.id.desc()).offset(skip).limit(limit).all()
+
+def get_screenshot_hashes(db: Session):
+    """Every image some screenshot row still refers to."""
+    return {digest for digest, in db.query(models.TrackerScreenshotModel.hash).distinct()}
+
+def enqueue_notifications(db: Session, tracker_id: int, run_id: int, items, commit: bool = True,
+                          content_changed: bool = False):
+    """
+    Adds send_notification messages ({"destination", "message"}) to the
+    outbox. A message identical to the last one queued for the same tracker
+    and destination is dropped unless the tracker's final status changed
+    since (this run included) or the run saw its watched content change, so
+    a tracker reporting the same state run after run notifies once per
+    transition. Returns how many were queued.
+    """
+    N = models.NotificationModel
+    Run = models.TrackerRunModel
+    now = datetime.utcnow()
+    queued = 0
+    for item in items:
+        key = hashlib.sha256(item["message"].encode()).hexdigest()[:32]
+        last = db.query(N.dedup_key, N.run_id).filter(
+            N.tracker_id == tracker_id, N.destination == item["destination"],
+        ).order_by(N.id.desc()).first()
+        if not content_changed and last is not None and last.dedup_key == key and last.run_id is not None:
+            transitioned = db.query(Run.id).filter(
+                Run.tracker_id == tracker_id, Run.id > last.run_id, Run.status_changed == True,
+            ).first() is not None
+            if not transitioned:
+                continue
+        db.add(N(tracker_id=tracker_id, run_id=run_id, destination=item["destination"], message=item["message"], dedup_key=key,
+                 status="pending", attempts=0, next_attempt_at=now, created_at=now))
+        queued += 1
+    if commit:
+        db.commit()
+    else:
+        db.flush()
+    return queued
+
+def get_notifications(db: Session, status: str = None, limit: int = 100):
+    N = models.NotificationModel
+    query = db.query(N)
+    if status:
+        query = query.filter(N.status == status)
+    return query.order_by(N.id.desc()).limit(limit).all()
+
+def get_notification_stats(db: Session):
+    N = models.NotificationModel
+    counts = dict(db.query(N.status, func.count(N.id)).group_by(N.status).all())
+    return {status: counts.get(status, 0) for status in ("pending", "sending", "sent", "failed")}
+
+def get_content_changes(db: Session, tracker_id: int, key: str = None, skip: int = 0, limit: int = 20):
+    S = models.TrackerContentSnapshotModel
+    query = db.query(S).options(load_only(S.id, S.key, S.run_id, S.fingerprint, S.created_at, S.diff)).filter(S.tracker_id == tracker_id)
+    if key is not None:
+        query = query.filter(S.key == key)
+    return query.order_by(S.id.desc()).offset(skip).limit(limit).all()
+
+def get_run_aggregates(db: Session, tracker_id: int, granularity: str = "hour", skip: int = 0, limit: int = 100):
+    return db.query(models.TrackerRunAggregateModel).filter(
+        models.TrackerRunAggregateModel.tracker_id == tracker_id,
+        models.TrackerRunAggregateModel.granularity == granularity,
+    ).order_by(models.TrackerRunAggregateModel.bucket_start.desc()).offset(skip).limit(limit).all()
+
+def _merge_aggregate(db: Session, tracker_id: int, granularity: str, bucket: str, runs: int, successes: int, failures: int, duration_ms: int):
+    bucket_start = datetime.strptime(bucket, "%Y-%m-%d %H:%M:%S")
+    aggregate = db.query(models.TrackerRunAggregateModel).filter(
+        models.TrackerRunAggregateModel.tracker_id == tracker_id,
+        models.TrackerRunAggregateModel.granularity == granularity,
+        models.TrackerRunAggregateModel.bucket_start == bucket_start,
+    ).first()
+    if not aggregate:
+        aggregate = models.TrackerRunAggregateModel(
+            tracker_id=tracker_id, granularity=granularity, bucket_start=bucket_start,
+            runs=0, successes=0, failures=0, total_duration_ms=0,
+        )
+        db.add(aggregate)
+    aggregate.runs += runs
+    aggregate.successes += successes
+    aggregate.failures += failures
+    aggregate.total_duration_ms += duration_ms
+
+def compact_runs(db: Session, now: datetime = None, commit: bool = True):
+    """Downsamples old raw runs to hourly aggregates and old hourly aggregates to daily ones."""
+    now = now or datetime.utcnow()
+    Run = models.TrackerRunModel
+    Aggregate = models.TrackerRunAggregateModel
+
+    run_cutoff = now - timedelta(days=RUN_RETENTION_DAYS)
+    # Each tracker's newest finished run stays, finish_run compares the next status with it
+    newest_ids = db.query(func.max(Run.id)).filter(Run.status != "running").group_by(Run.tracker_id).scalar_subquery()
+    old_runs = (Run.started_at < run_cutoff, Run.id.not_in(newest_ids))
+    hour = func.strftime(_BUCKET_FORMATS["hour"], Run.started_at)
+    rows = db.query(
+        Run.tracker_id, hour, func.count(Run.id),
+        func.sum(case((Run.status == "success", 1), else_=0)),
+        func.sum(case((Run.status == "failure", 1), else_=0)),
+        func.coalesce(func.sum(Run.duration_ms), 0),
+    ).filter(*old_runs).group_by(Run.tracker_id, hour).all()
+    for tracker_id, bucket, runs, successes, failures, duration_ms in rows:
+        _merge_aggregate(db, tracker_id, "hour", bucket, runs, successes, failures, duration_ms)
+    old_run_ids = db.query(Run.id).filter(*old_runs).scalar_subquery()
+    db.query(models.TrackerRunLogChunkModel).filter(models.TrackerRunLogChunkModel.run_id.in_(old_run_ids)).delete(synchronize_session=False)
+    runs_compacted = db.query(Run).filter(*old_runs).delete(synchronize_session=False)
+
+    hourly_cutoff = now - timedelta(days=HOURLY_RETENTION_DAYS)
+    day = func.strftime(_BUCKET_FORMATS["day"], Aggregate.bucket_start)
+    old_hourly = (Aggregate.granularity == "hour", Aggregate.bucket_start < hourly_cutoff)
+    rows = db.query(
+        Aggregate.tracker_id, day, func.sum(Aggregate.runs), func.sum(Aggregate.successes),
+        func.sum(Aggregate.failures), func.sum(Aggregate.total_duration_ms),
+    ).filter(*old_hourly).group_by(Aggregate.tracker_id, day).all()
+    for tracker_id, bucket, runs, successes, failures, duration_ms in rows:
+        _merge_aggregate(db, tracker_id, "day", bucket, runs, successes, failures, duration_ms)
+    hours_compacted = db.query(Aggregate).filter(*old_hourly).delete(synchronize_session=False)
+
+    if commit:
+        db.commit()
+    else:
+        db.flush()
+    return {"runs_compacted": runs_compacted, "hourly_compacted": hours_compacted}
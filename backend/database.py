@@ -1,20 +1,142 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, declarative_base
 import os
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-SQLALCHEMY_DATABASE_URL = f"sqlite:///{os.path.join(BASE_DIR, 'tracker.db')}"
+SQLALCHEMY_DATABASE_URL = os.environ.get(
+    "TRACKER_DATABASE_URL", f"sqlite:///{os.path.join(BASE_DIR, 'tracker.db')}"
+)
+# Seconds a connection waits for another process' write lock (API + workers share the file)
+BUSY_TIMEOUT = float(os.environ.get("TRACKER_DB_BUSY_TIMEOUT", "30"))
+# WAL lets readers run while a write is in progress; DELETE is SQLite's default,
+# needed only where the file lives on a network filesystem
+JOURNAL_MODE = os.environ.get("TRACKER_DB_JOURNAL_MODE", "WAL").upper()
+# NORMAL never corrupts in WAL mode, a power loss can only drop the last commits
+SYNCHRONOUS = os.environ.get("TRACKER_DB_SYNCHRONOUS", "NORMAL" if JOURNAL_MODE == "WAL" else "FULL").upper()
+# Page cache and memory-mapped I/O per connection
+CACHE_MB = int(os.environ.get("TRACKER_DB_CACHE_MB", "16"))
+MMAP_MB = int(os.environ.get("TRACKER_DB_MMAP_MB", "256"))
+# Read-only connections per process, shared by API reads and async_db.read
+READ_POOL_SIZE = int(os.environ.get("TRACKER_DB_READ_POOL", "8"))
+
+_CONNECT_ARGS = {"check_same_thread": False, "timeout": BUSY_TIMEOUT}
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+PRAGMAS = (
+    f"synchronous = {SYNCHRONOUS}",
+    f"cache_size = {-CACHE_MB * 1024}", # Negative is KiB
+    f"mmap_size = {MMAP_MB * 1024 * 1024}",
+    "temp_store = MEMORY",
+    # Truncates the WAL after checkpoints instead of leaving it at its largest size
+    "journal_size_limit = 67108864",
 )
+
+def _set_pragmas(dbapi_connection, read_only: bool = False):
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma in PRAGMAS:
+            cursor.execute(f"PRAGMA {pragma}")
+        if read_only:
+            cursor.execute("PRAGMA query_only = ON")
+    finally:
+        cursor.close()
+
+# General purpose connections: API requests that write and scripts
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args=_CONNECT_ARGS)
+
+# pysqlite only opens a transaction before DML, so a SAVEPOINT would open one of
+# its own and releasing it would commit. SQLAlchemy emits BEGIN itself instead.
+@event.listens_for(engine, "connect")
+def _configure(dbapi_connection, connection_record):
+    _set_pragmas(dbapi_connection)
+    dbapi_connection.isolation_level = None
+
+@event.listens_for(engine, "begin")
+def _begin(connection):
+    connection.exec_driver_sql("BEGIN")
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# The single write connection of this process, used by the DB writer thread
+# (async_db.writer) and job operations, which queue for it instead of for
+# SQLite's lock. Transactions take the write lock up front (BEGIN IMMEDIATE):
+# short read-then-write transactions race across processes, like job leases,
+# and a deferred transaction would fail with "database is locked" when two
+# processes both read and then try to write.
+write_engine = create_engine(
+    SQLALCHEMY_DATABASE_URL, connect_args=_CONNECT_ARGS,
+    pool_size=1, max_overflow=0, pool_timeout=BUSY_TIMEOUT,
+)
+
+@event.listens_for(write_engine, "connect")
+def _configure_write(dbapi_connection, connection_record):
+    _set_pragmas(dbapi_connection)
+    dbapi_connection.isolation_level = None
+
+@event.listens_for(write_engine, "begin")
+def _begin_immediate(connection):
+    connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+WriteSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=write_engine)
+
+# Read-only connections for dashboards and feeds; in WAL mode they never wait for writers
+read_engine = create_engine(
+    SQLALCHEMY_DATABASE_URL, connect_args=_CONNECT_ARGS,
+    pool_size=READ_POOL_SIZE, max_overflow=0, pool_timeout=BUSY_TIMEOUT,
+)
+
+@event.listens_for(read_engine, "connect")
+def _configure_read(dbapi_connection, connection_record):
+    _set_pragmas(dbapi_connection, read_only=True)
+
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
 Base = declarative_base()
 
+# Schema changes create_all can't make to existing tables, in order; a
+# database's PRAGMA user_version is the number it has. Append only.
+MIGRATIONS = [
+    # 1: indexes for tracker filters, the scheduler's active trackers and the transitions feed
+    (
+        "CREATE INDEX IF NOT EXISTS ix_trackers_active ON trackers (is_active, id)",
+        "CREATE INDEX IF NOT EXISTS ix_trackers_status ON trackers (last_run_status, last_run_at)",
+        "CREATE INDEX IF NOT EXISTS ix_trackers_last_run_at ON trackers (last_run_at)",
+        "CREATE INDEX IF NOT EXISTS ix_tracker_runs_transitions ON tracker_runs (started_at) WHERE status_changed = 1",
+    ),
+]
+
+def init_db():
+    """
+    Sets the journal mode, creates missing tables and indexes and applies
+    pending migrations. Run by each process at startup, never at import.
+    """
+    from backend import models # Registers the tables on Base
+    # Persistent in the file, and can't change inside a transaction
+    raw = engine.raw_connection()
+    try:
+        raw.cursor().execute(f"PRAGMA journal_mode = {JOURNAL_MODE}")
+    finally:
+        raw.close()
+    # Under the write lock, processes starting together migrate once
+    with write_engine.begin() as connection:
+        Base.metadata.create_all(bind=connection)
+        version = connection.exec_driver_sql("PRAGMA user_version").scalar()
+        for statements in MIGRATIONS[version:]:
+            for statement in statements:
+                connection.exec_driver_sql(statement)
+        if version < len(MIGRATIONS):
+            connection.exec_driver_sql(f"PRAGMA user_version = {len(MIGRATIONS)}")
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+def get_read_db():
+    """Session on a read-only connection, for endpoints that only query."""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
@@ -1,43 +1,39 @@
 import asyncio
 import logging
-import sys
 import os
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import sys
+import time
+
+if __name__ == "__main__":
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, List, Dict, Any, Optional
+from backend import browser_pool, content_diff, interception, metrics, plan, profiles, run_logs
 
-from typing import List, Dict, Any
-from camoufox import AsyncNewBrowser
-from playwright.async_api import Page, BrowserContext, async_playwright, Request
-import io
-import re
-import httpx
-import json
+if TYPE_CHECKING:
+    from playwright.async_api import Page
 
 logger = logging.getLogger(__name__)
 
 class TrackerEngine:
     def __init__(self):
-        pass
+        self._started = time.perf_counter()
+        # send_notification messages of the last run, for the caller to queue
+        self.notifications: List[Dict[str, str]] = []
 
-    async def execute_tracker(self, config: List[Dict[str, Any]]) -> tuple[str, Dict[str, Any]]:
+    async def execute_tracker(self, config: List[Dict[str, Any]], run_log: Optional[run_logs.RunLog] = None,
+                              content: Optional[content_diff.ContentWatch] = None) -> tuple[str, Dict[str, Any]]:
         """
         Executes a sequence of steps defined in the tracker config.
-        Returns the execution log and run info.
+        Returns the execution log and run info. Records go to `run_log`, so the
+        caller still has them when this raises. watch_content results are
+        collected in `content`, send_notification messages in `self.notifications`.
         """
-        log_stream = io.StringIO()
-        handler = logging.StreamHandler(log_stream)
-        handler.setFormatter(logging.Formatter('%(levelname)s: %(message)s'))
-        tracker_logger = logging.getLogger('tracker_exec')
-        tracker_logger.setLevel(logging.INFO)
-        tracker_logger.addHandler(handler)
-        
+        self._started = time.perf_counter()
+        self.notifications = []
+        tracker_logger = run_log if run_log is not None else run_logs.RunLog()
         tracker_logger.info("Starting tracker execution")
-        
-        # Determine headless mode from config (default True)
-        headless = True
-        for step in config:
-            if step.get("action") == "open" and "headless" in step:
-                headless = bool(step.get("headless"))
-                break
 
         run_info = {
             "grep_matches": [],
@@ -46,184 +42,115 @@ class TrackerEngine:
         }
 
         try:
-            # Initialize Playwright and Camoufox
-            async with async_playwright() as p:
-                browser = await AsyncNewBrowser(p, headless=headless)
-                async with browser:
-                    context = await browser.new_context()
-                    page = await context.new_page()
-                    
-                    # Network listener
-                    captured_requests = []
-                    async def on_request(request: Request):
-                        captured_requests.append({
-                            "url": request.url,
-                            "method": request.method,
-                            "headers": request.headers
-                        })
-                    page.on("request", on_request)
-
-                    variables = {} # Execution Context
-
-                    for step in config:
-                        await self.execute_step(page, step, variables, tracker_logger, captured_requests, run_info)
-                    
-                    run_info["extracted_variables"] = variables
-                    run_info["network_requests_captured"] = len(captured_requests)
+            # Compiled once per config version and shared between runs
+            tracker_plan = plan.compile_config(config)
+            headless = tracker_plan.headless
+            pool = browser_pool.get_pool(headless)
+
+            if not tracker_plan.needs_browser:
+                # HTTP-only configs never touch Playwright
+                run_info["browserless"] = True
+                await self._run_steps(None, tracker_plan, tracker_logger, run_info, content)
+            elif tracker_plan.profile:
+                await self._run_with_profile(pool, tracker_plan, tracker_logger, run_info, content)
+            else:
+                async with self._new_context(pool, headless) as context:
+                    await self._run_steps(await context.new_page(), tracker_plan, tracker_logger, run_info, content)
 
         except Exception as e:
             tracker_logger.error(f"Error executing tracker: {e}")
             raise
-        finally:
-            handler.close()
-            
-        return log_stream.getvalue(), run_info
-
-    def _substitute(self, value: Any, variables: Dict[str, Any]) -> Any:
-        if isinstance(value, str):
-            try:
-                return value.format(**variables)
-            except KeyError:
-                return value
-        return value
-
-    async def execute_step(self, page: Page, step: Dict[str, Any], variables: Dict[str, Any], logger, captured_requests: List[Dict], run_info: Dict[str, Any]):
-        action = step.get("action")
-        logger.info(f"Executing step: {action}")
-
-        if action == "open":
-            url = self._substitute(step.get("url"), variables)
-            if url:
-                await page.goto(url)
-                logger.info(f"Opened {url}")
-        
-        elif action == "wait":
-            seconds = float(step.get("seconds", 1))
-            await asyncio.sleep(seconds)
-            logger.info(f"Waited {seconds}s")
-        
-        elif action == "screenshot":
-            path = self._substitute(step.get("path", "screenshot.png"), variables)
-            await page.screenshot(path=path)
-            logger.info(f"Screenshot saved to {path}")
-        
-        elif action == "click":
-            selector = self._substitute(step.get("selector"), variables)
-            if selector:
-                await page.click(selector)
-                logger.info(f"Clicked {selector}")
-        
-        elif action == "type":
-            selector = self._substitute(step.get("selector"), variables)
-            text = self._substitute(step.get("text"), variables)
-            if selector and text:
-                await page.fill(selector, text)
-                logger.info(f"Typed into {selector}")
-        
-        elif action == "press_key":
-            key = self._substitute(step.get("key"), variables)
-            if key:
-                await page.keyboard.press(key)
-                logger.info(f"Pressed key: {key}")
-
-        elif action == "scroll":
-            selector = self._substitute(step.get("selector"), variables)
-            if selector:
-                await page.locator(selector).scroll_into_view_if_needed()
-                logger.info(f"Scrolled to {selector}")
-
-        elif action == "grep":
-            text = self._substitute(step.get("text"), variables)
-            selector = self._substitute(step.get("selector", "body"), variables)
-            if text:
-                content = await page.content() if selector == "body" else await page.inner_text(selector)
-                if text not in content:
-                    raise Exception(f"Grep failed: '{text}' not found in {selector}")
-                logger.info(f"Grep success: Found '{text}'")
-                run_info["grep_matches"].append({"text": text, "found": True})
-
-        elif action == "grep_regex":
-            pattern = self._substitute(step.get("regex"), variables)
-            selector = self._substitute(step.get("selector", "body"), variables)
-            if pattern:
-                content = await page.content() if selector == "body" else await page.inner_text(selector)
-                if not re.search(pattern, content):
-                    raise Exception(f"Grep Regex failed: '{pattern}' not found")
-                logger.info(f"Grep Regex success: Found pattern")
-                run_info["grep_matches"].append({"regex": pattern, "found": True})
-
-        elif action == "extract_text":
-            selector = self._substitute(step.get("selector"), variables)
-            variable_name = step.get("variable")
-            if selector and variable_name:
-                extracted = await page.inner_text(selector)
-                variables[variable_name] = extracted
-                logger.info(f"Extracted '{extracted}' to variable '{variable_name}'")
-
-        elif action == "execute_js":
-            script = self._substitute(step.get("script"), variables)
-            result = await page.evaluate(script)
-            logger.info(f"Executed JS. Result: {result}")
-            if step.get("variable"):
-                variables[step.get("variable")] = result
-
-        elif action == "refresh":
-            await page.reload()
-            logger.info("Refreshed page")
-
-        elif action == "wait_network_idle":
-            await page.wait_for_load_state("networkidle")
-            logger.info("Waited for network idle")
-
-        elif action == "clear_cookies":
-            await page.context.clear_cookies()
-            logger.info("Cleared cookies")
-
-        elif action == "set_header":
-            key = self._substitute(step.get("key"), variables)
-            value = self._substitute(step.get("value"), variables)
-            if key and value:
-                await page.set_extra_http_headers({key: value})
-                logger.info(f"Set header {key}")
-
-        elif action == "http_request":
-            method = step.get("method", "GET")
-            url = self._substitute(step.get("url"), variables)
-            body = self._substitute(step.get("body"), variables)
-            async with httpx.AsyncClient() as client:
-                response = await client.request(method, url, content=body)
-                logger.info(f"HTTP {method} {url} - Status: {response.status_code}")
-                if step.get("variable"):
-                    variables[step.get("variable")] = response.text
-                variables["last_http_status"] = response.status_code
-                variables["last_http_body"] = response.text
-
-        elif action == "expect_http_status":
-            expected = int(step.get("status"))
-            last_status = variables.get("last_http_status")
-            if last_status != expected:
-                raise Exception(f"Expected HTTP status {expected}, got {last_status}")
-            logger.info(f"Verified HTTP status {expected}")
-
-        elif action == "capture_network":
-            pattern = self._substitute(step.get("regex"), variables)
-            found = False
-            if captured_requests:
-                for req in captured_requests:
-                    if re.search(pattern, req['url']):
-                        found = True
-                        break
-            if not found:
-                raise Exception(f"Network request matching '{pattern}' not found")
-            logger.info(f"Found network request matching '{pattern}'")
-
-        elif action == "send_notification":
-            message = self._substitute(step.get("message"), variables)
-            # Placeholder for webhook implementation
-            logger.info(f"NOTIFICATION: {message}")
 
+        return tracker_logger.text(), run_info
+
+    @asynccontextmanager
+    async def _new_context(self, pool: Optional[browser_pool.BrowserPool], headless: bool, **kwargs):
+        if pool:
+            async with pool.context(**kwargs) as context:
+                yield context
         else:
-            logger.warning(f"Unknown action: {action}")
+            # No shared pool (e.g. standalone usage), launch a one-off browser
+            from camoufox import AsyncNewBrowser
+            from playwright.async_api import async_playwright
+            async with async_playwright() as p:
+                launch_started = time.perf_counter()
+                browser = await AsyncNewBrowser(p, headless=headless)
+                metrics.BROWSER_LAUNCH_SECONDS.observe(time.perf_counter() - launch_started, "standalone")
+                async with browser:
+                    yield await browser.new_context(**kwargs)
+
+    async def _run_with_profile(self, pool: Optional[browser_pool.BrowserPool], tracker_plan: plan.Plan, tracker_logger,
+                                run_info: Dict[str, Any], content: Optional[content_diff.ContentWatch]):
+        """
+        Runs inside the tracker's context profile. Storage state (cookies,
+        localStorage) is loaded into the run and saved back after a successful
+        run, so logins carry over. Persistent profiles reuse a warm context
+        with its own on-disk HTTP cache.
+        """
+        async with profiles.manager.checkout(tracker_plan.profile) as profile:
+            run_info["profile"] = profile.name
+            if profile.persistent and pool:
+                context = await profiles.manager.persistent_context(profile, pool.playwright, tracker_plan.headless)
+                page = await context.new_page()
+                try:
+                    await self._run_steps(page, tracker_plan, tracker_logger, run_info, content, profile)
+                    await asyncio.to_thread(profile.save_storage_state, await context.storage_state())
+                except Exception:
+                    try:
+                        await context.cookies()
+                    except Exception:
+                        # Context died with the run, relaunch next time
+                        await profiles.manager.discard_context(profile)
+                    raise
+                finally:
+                    try:
+                        await page.close()
+                    except Exception:
+                        pass
+                return
+
+            state = profile.storage_state_path if os.path.exists(profile.storage_state_path) else None
+            async with self._new_context(pool, tracker_plan.headless, storage_state=state) as context:
+                await self._run_steps(await context.new_page(), tracker_plan, tracker_logger, run_info, content, profile)
+                await asyncio.to_thread(profile.save_storage_state, await context.storage_state())
+
+    async def _run_steps(self, page: Optional["Page"], tracker_plan: plan.Plan, tracker_logger, run_info: Dict[str, Any],
+                         content: Optional[content_diff.ContentWatch] = None, profile: Optional[profiles.Profile] = None):
+        # Network listener, matches capture patterns as requests arrive
+        capture = tracker_plan.new_network_capture()
+        # Blocks resources / serves cached static assets before anything is loaded
+        route_handler = None
+        if not tracker_plan.interception.is_empty:
+            route_handler = interception.RouteHandler(tracker_plan.interception)
+
+        async def setup_page(new_page):
+            new_page.on("request", capture.on_request)
+            if route_handler is not None:
+                await new_page.route("**/*", route_handler.handle)
+
+        if page is not None:
+            await setup_page(page)
+
+        ctx = plan.RunContext(page, tracker_logger, run_info, capture, content, profile)
+        ctx.notifications = self.notifications
+        # Pages opened by parallel branches get the same listeners
+        ctx.page_setup = setup_page
+
+        steps_started = time.perf_counter()
+        try:
+            await plan.run_steps(tracker_plan.steps, ctx)
+        finally:
+            if route_handler is not None:
+                run_info["interception"] = route_handler.stats.to_dict()
+            # Setup is everything before the first step: plan, browser context, profile, listeners
+            run_info["timings"] = {
+                "setup_ms": round((steps_started - self._started) * 1000, 1),
+                "steps_ms": round((time.perf_counter() - steps_started) * 1000, 1),
+                **ctx.timings.to_dict(),
+            }
+
+        run_info["extracted_variables"] = ctx.variables
+        run_info["network_requests_captured"] = capture.total
 
 # Test execution
 if __name__ == "__main__":
@@ -0,0 +1,133 @@
+import asyncio
+import os
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from backend import change_log
+
+# Recent events kept for clients resuming with Last-Event-ID
+EVENT_BUFFER_SIZE = int(os.environ.get("TRACKER_EVENT_BUFFER_SIZE", "1000"))
+
+
+class EventBroker:
+    """
+    Fans out status-change events to push subscribers (SSE). Events get
+    increasing ids and the most recent ones are buffered so a reconnecting
+    client can resume from its last seen id. Ids start over in every
+    process, so the ids clients see carry the broker's epoch and an id from
+    another process or an earlier boot never resumes.
+    """
+
+    def __init__(self, buffer_size: int = EVENT_BUFFER_SIZE):
+        self._events: deque = deque(maxlen=buffer_size)
+        self._next_id = 1
+        self.epoch = os.urandom(4).hex()
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+
+    def bind(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+
+    def publish(self, data: Dict[str, Any]):
+        """Safe to call from any thread (e.g. the DB writer thread)."""
+        with self._lock:
+            event_id = self._next_id
+            self._next_id += 1
+            self._events.append((event_id, data))
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._deliver(event_id, data)
+        else:
+            loop.call_soon_threadsafe(self._deliver, event_id, data)
+
+    def _deliver(self, event_id: int, data: Dict[str, Any]):
+        for queue in self._subscribers:
+            queue.put_nowait((event_id, data))
+
+    def since(self, last_id: int) -> Optional[List[tuple]]:
+        """Buffered events after `last_id`, or None if some were already evicted or it was never issued."""
+        with self._lock:
+            events = list(self._events)
+            newest = self._next_id - 1
+        if last_id > newest or (events and last_id < events[0][0] - 1):
+            return None
+        return [(event_id, data) for event_id, data in events if event_id > last_id]
+
+    @property
+    def last_id(self) -> int:
+        return self._next_id - 1
+
+    def format_id(self, event_id: int) -> str:
+        """The SSE id of an event."""
+        return f"{self.epoch}-{event_id}"
+
+    def parse_id(self, value: str) -> Optional[int]:
+        """Event id from a client's Last-Event-ID, None if this broker didn't issue it."""
+        epoch, _, event_id = value.partition("-")
+        if epoch != self.epoch or not event_id.isdigit():
+            return None
+        return int(event_id)
+
+    def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+
+broker = EventBroker()
+
+# Like feed invalidation, events are only published once the write commits
+PENDING_KEY = "status_events"
+
+
+def _add(db: Session, data: Dict[str, Any]):
+    db.info.setdefault(PENDING_KEY, []).append(data)
+    # Dashboards connected to other processes, in distributed mode
+    change_log.record(db, data)
+
+
+def status_changed(db: Session, tracker_id: int, status: str, last_run_at: Optional[datetime]):
+    # Kept small, it goes to every dashboard; run details are fetched on demand
+    _add(db, {
+        "type": "status",
+        "tracker_id": tracker_id,
+        "status": status,
+        "last_run_at": last_run_at.isoformat() if last_run_at else None,
+    })
+
+
+def tracker_changed(db: Session, tracker_id: int, change: str):
+    """Tracker created, updated or deleted; dashboards refetch its summary."""
+    _add(db, {"type": "tracker", "tracker_id": tracker_id, "change": change})
+
+
+change_log.on("status", broker.publish)
+change_log.on("tracker", broker.publish)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_pending(db: Session):
+    for data in db.info.pop(PENDING_KEY, []):
+        broker.publish(data)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(db: Session):
+    db.info.pop(PENDING_KEY, None)
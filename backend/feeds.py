@@ -0,0 +1,246 @@
+import email.utils
+import hashlib
+import io
+import threading
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, Optional
+from xml.sax.saxutils import XMLGenerator
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session, load_only
+from backend import change_log, models
+
+FEED_LINK = "http://localhost:5173"
+FEED_LIMIT = 100
+TRANSITIONS_LIMIT = 50
+
+ALL_FEED = "all"
+TRANSITIONS_FEED = "transitions"
+
+
+class CachedFeed:
+    def __init__(self, body: bytes, last_modified: datetime):
+        self.body = body
+        self.etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        self.last_modified = last_modified.replace(microsecond=0)
+
+    @property
+    def last_modified_header(self) -> str:
+        return email.utils.format_datetime(self.last_modified, usegmt=True)
+
+    def is_fresh(self, if_none_match: Optional[str], if_modified_since: Optional[str]) -> bool:
+        """True if the client's conditional headers match this version (i.e. answer 304)."""
+        if if_none_match:
+            tags = {tag.strip() for tag in if_none_match.split(",")}
+            return "*" in tags or self.etag in tags or f"W/{self.etag}" in tags
+        if if_modified_since:
+            try:
+                since = email.utils.parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                return False
+            if since.tzinfo is None:
+                since = since.replace(tzinfo=timezone.utc)
+            return self.last_modified <= since
+        return False
+
+
+class FeedCache:
+    """
+    Caches rendered feeds until a tracker's status changes. The main feed is
+    rebuilt incrementally: every tracker item is kept as a rendered fragment
+    and only the fragments of invalidated trackers are re-rendered.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._feeds: Dict[str, CachedFeed] = {}
+        self._items: Dict[int, bytes] = {}
+        self._generation = 0 # Bumped on every invalidation
+
+    def invalidate(self, tracker_id: int, transitions: bool = False):
+        with self._lock:
+            self._generation += 1
+            self._items.pop(tracker_id, None)
+            self._feeds.pop(ALL_FEED, None)
+            if transitions:
+                self._feeds.pop(TRANSITIONS_FEED, None)
+                self._feeds.pop(_tracker_key(tracker_id), None)
+
+    def invalidate_all(self):
+        with self._lock:
+            self._generation += 1
+            self._items.clear()
+            self._feeds.clear()
+
+    def get(self, key: str, build: Callable[[], bytes]) -> CachedFeed:
+        with self._lock:
+            cached = self._feeds.get(key)
+            generation = self._generation
+        if cached:
+            return cached
+        # Build outside the lock, but don't keep the result if an invalidation raced with it
+        cached = CachedFeed(build(), datetime.now(timezone.utc))
+        with self._lock:
+            if self._generation == generation:
+                self._feeds[key] = cached
+        return cached
+
+    def item(self, tracker_id: int, render: Callable[[], bytes]) -> bytes:
+        with self._lock:
+            fragment = self._items.get(tracker_id)
+            generation = self._generation
+        if fragment is None:
+            fragment = render()
+            with self._lock:
+                if self._generation == generation:
+                    self._items[tracker_id] = fragment
+        return fragment
+
+
+cache = FeedCache()
+
+
+def _tracker_key(tracker_id: int) -> str:
+    return f"tracker:{tracker_id}"
+
+
+def _rfc822(value: Optional[datetime]) -> str:
+    if value is None:
+        return email.utils.formatdate(usegmt=True)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return email.utils.format_datetime(value, usegmt=True)
+
+
+def _write_item(xml: XMLGenerator, title: str, description: str, guid: str, pub_date: Optional[datetime]):
+    xml.startElement("item", {})
+    for name, text in (("title", title), ("description", description), ("guid", guid), ("pubDate", _rfc822(pub_date))):
+        xml.startElement(name, {"isPermaLink": "false"} if name == "guid" else {})
+        xml.characters(text)
+        xml.endElement(name)
+    xml.endElement("item")
+
+
+def _render_fragment(write: Callable[[XMLGenerator], None]) -> bytes:
+    out = io.BytesIO()
+    write(XMLGenerator(out, encoding="utf-8", short_empty_elements=True))
+    return out.getvalue()
+
+
+def _render_channel(title: str, description: str, items: Iterable[bytes]) -> bytes:
+    out = io.BytesIO()
+    xml = XMLGenerator(out, encoding="utf-8")
+    xml.startDocument()
+    xml.startElement("rss", {"version": "2.0"})
+    xml.startElement("channel", {})
+    for name, text in (("title", title), ("link", FEED_LINK), ("description", description)):
+        xml.startElement(name, {})
+        xml.characters(text)
+        xml.endElement(name)
+    for fragment in items:
+        out.write(fragment)
+    xml.endElement("channel")
+    xml.endElement("rss")
+    xml.endDocument()
+    return out.getvalue()
+
+
+def _render_tracker_item(tracker, final: Optional[tuple] = None) -> bytes:
+    # While a run lasts the item shows the previous run's outcome, `final` (status, finished_at)
+    status, checked_at = tracker.last_run_status, tracker.last_run_at
+    if status == "running":
+        status, checked_at = final or (None, None)
+    status = status or "pending"
+    return _render_fragment(lambda xml: _write_item(
+        xml,
+        f"{tracker.name}: {status.upper()}",
+        f"Status: {status}. Checked at: {checked_at}",
+        f"{tracker.id}-{checked_at}",
+        checked_at,
+    ))
+
+
+def _render_transition_item(run, tracker_name: str) -> bytes:
+    return _render_fragment(lambda xml: _write_item(
+        xml,
+        f"{tracker_name}: {run.status.upper()}",
+        f"Status changed to {run.status} at {run.finished_at}",
+        f"{run.tracker_id}-run-{run.id}",
+        run.finished_at,
+    ))
+
+
+def _last_final_runs(db: Session, tracker_ids: list) -> Dict[int, tuple]:
+    """tracker id -> (status, finished_at) of its latest finished run."""
+    if not tracker_ids:
+        return {}
+    Run = models.TrackerRunModel
+    latest = db.query(func.max(Run.id)).filter(
+        Run.tracker_id.in_(tracker_ids), Run.status != "running",
+    ).group_by(Run.tracker_id)
+    rows = db.query(Run.tracker_id, Run.status, Run.finished_at).filter(Run.id.in_(latest.scalar_subquery())).all()
+    return {tracker_id: (status, finished_at) for tracker_id, status, finished_at in rows}
+
+
+def status_feed(db: Session) -> CachedFeed:
+    def build():
+        trackers = db.query(models.TrackerModel).options(load_only(
+            models.TrackerModel.id, models.TrackerModel.name,
+            models.TrackerModel.last_run_status, models.TrackerModel.last_run_at,
+        )).limit(FEED_LIMIT).all()
+        finals = _last_final_runs(db, [t.id for t in trackers if t.last_run_status == "running"])
+        items = [cache.item(t.id, lambda t=t: _render_tracker_item(t, finals.get(t.id))) for t in trackers]
+        return _render_channel("Tracker Status Feed", "Latest status updates from Tracker", items)
+    return cache.get(ALL_FEED, build)
+
+
+def _transition_runs(db: Session, tracker_id: Optional[int] = None):
+    query = db.query(models.TrackerRunModel, models.TrackerModel.name).join(
+        models.TrackerModel, models.TrackerModel.id == models.TrackerRunModel.tracker_id
+    ).options(load_only(
+        models.TrackerRunModel.id, models.TrackerRunModel.tracker_id,
+        models.TrackerRunModel.status, models.TrackerRunModel.finished_at,
+    )).filter(models.TrackerRunModel.status_changed == True)
+    if tracker_id is not None:
+        query = query.filter(models.TrackerRunModel.tracker_id == tracker_id)
+    return query.order_by(models.TrackerRunModel.started_at.desc()).limit(TRANSITIONS_LIMIT).all()
+
+
+def transitions_feed(db: Session) -> CachedFeed:
+    def build():
+        items = [_render_transition_item(run, name) for run, name in _transition_runs(db)]
+        return _render_channel("Tracker Status Changes", "Status transitions from Tracker", items)
+    return cache.get(TRANSITIONS_FEED, build)
+
+
+def tracker_feed(db: Session, tracker) -> CachedFeed:
+    def build():
+        items = [_render_transition_item(run, name) for run, name in _transition_runs(db, tracker.id)]
+        return _render_channel(f"{tracker.name} Status", f"Status changes of {tracker.name}", items)
+    return cache.get(_tracker_key(tracker.id), build)
+
+
+# Invalidation is deferred until the surrounding transaction commits, so a
+# concurrent reader can never cache a feed built from pre-commit data.
+PENDING_KEY = "feed_invalidations"
+
+
+def mark_changed(db: Session, tracker_id: int, transitions: bool = False):
+    pending: Dict[int, bool] = db.info.setdefault(PENDING_KEY, {})
+    pending[tracker_id] = pending.get(tracker_id, False) or transitions
+    # Other processes' caches, in distributed mode
+    change_log.record(db, {"type": "feed", "tracker_id": tracker_id, "transitions": transitions})
+
+
+change_log.on("feed", lambda data: cache.invalidate(data["tracker_id"], data["transitions"]))
+
+
+@event.listens_for(Session, "after_commit")
+def _flush_pending(db: Session):
+    pending: Dict[int, bool] = db.info.pop(PENDING_KEY, {})
+    for tracker_id, transitions in pending.items():
+        cache.invalidate(tracker_id, transitions)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(db: Session):
+    db.info.pop(PENDING_KEY, None)
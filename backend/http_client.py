@@ -0,0 +1,134 @@
+import asyncio
+import logging
+import os
+from collections import OrderedDict
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from typing import TYPE_CHECKING, Dict, Optional
+from urllib.parse import urlsplit
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger(__name__)
+
+# Process-wide connection pool settings
+MAX_CONNECTIONS = int(os.environ.get("TRACKER_HTTP_MAX_CONNECTIONS", "100"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.environ.get("TRACKER_HTTP_MAX_KEEPALIVE", "20"))
+KEEPALIVE_EXPIRY = float(os.environ.get("TRACKER_HTTP_KEEPALIVE_EXPIRY", "30"))
+MAX_CONNECTIONS_PER_HOST = int(os.environ.get("TRACKER_HTTP_MAX_PER_HOST", "6"))
+TIMEOUT = float(os.environ.get("TRACKER_HTTP_TIMEOUT", "30"))
+HTTP2 = os.environ.get("TRACKER_HTTP2", "1") == "1"
+CONDITIONAL_CACHE_SIZE = int(os.environ.get("TRACKER_HTTP_CACHE_SIZE", "1000"))
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401 (httpx needs it for HTTP/2)
+        return True
+    except ImportError:
+        return False
+
+
+class HttpResult:
+    __slots__ = ("status_code", "text", "headers", "from_cache")
+
+    def __init__(self, status_code: int, text: str, headers: Dict[str, str], from_cache: bool = False):
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers
+        self.from_cache = from_cache
+
+
+_client: Optional["httpx.AsyncClient"] = None
+_host_limits: Dict[str, asyncio.Semaphore] = {}
+# url -> last full response that carried a validator (ETag / Last-Modified)
+_validated: "OrderedDict[str, HttpResult]" = OrderedDict()
+
+
+def get_client() -> "httpx.AsyncClient":
+    global _client
+    if _client is None or _client.is_closed:
+        # Imported on first use, processes that never make requests don't load it
+        import httpx
+        http2 = HTTP2 and _http2_available()
+        _client = httpx.AsyncClient(
+            http2=http2,
+            timeout=TIMEOUT,
+            # Shared by every tracker, so it must not keep what one site set;
+            # runs carry their own jar (new_cookies)
+            cookies=CookieJar(policy=DefaultCookiePolicy(allowed_domains=[])),
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=KEEPALIVE_EXPIRY,
+            ),
+        )
+        logger.info(f"Created shared HTTP client (http2={http2})")
+    return _client
+
+
+def new_cookies() -> "httpx.Cookies":
+    """Empty cookie jar for one run's requests."""
+    import httpx
+    return httpx.Cookies()
+
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+    _host_limits.clear()
+
+
+def _host_limit(url: str) -> asyncio.Semaphore:
+    host = urlsplit(url).netloc
+    limit = _host_limits.get(host)
+    if limit is None:
+        limit = _host_limits[host] = asyncio.Semaphore(MAX_CONNECTIONS_PER_HOST)
+    return limit
+
+
+def _remember(url: str, result: HttpResult):
+    _validated[url] = result
+    _validated.move_to_end(url)
+    if len(_validated) > CONDITIONAL_CACHE_SIZE:
+        _validated.popitem(last=False)
+
+
+async def request(method: str, url: str, content: Optional[str] = None,
+                  headers: Optional[Dict[str, str]] = None, conditional: bool = True,
+                  cookies: Optional["httpx.Cookies"] = None) -> HttpResult:
+    """
+    Sends a request over the shared pool. GETs are revalidated with
+    If-None-Match / If-Modified-Since when a previous response carried a
+    validator; a 304 is answered from the cached response. `cookies` is sent
+    with the request and takes the cookies the response sets.
+    """
+    method = method.upper()
+    headers = dict(headers or {})
+    cached = _validated.get(url) if conditional and method == "GET" else None
+    if cached is not None:
+        if "etag" in cached.headers:
+            headers.setdefault("If-None-Match", cached.headers["etag"])
+        if "last-modified" in cached.headers:
+            headers.setdefault("If-Modified-Since", cached.headers["last-modified"])
+
+    client = get_client()
+    outgoing = client.build_request(method, url, content=content, headers=headers)
+    if cookies is not None:
+        cookies.set_cookie_header(outgoing)
+    async with _host_limit(url):
+        response = await client.send(outgoing)
+    if cookies is not None:
+        cookies.extract_cookies(response)
+
+    if cached is not None and response.status_code == 304:
+        return HttpResult(cached.status_code, cached.text, cached.headers, from_cache=True)
+
+    result = HttpResult(response.status_code, response.text, {k.lower(): v for k, v in response.headers.items()})
+    if conditional and method == "GET" and response.status_code == 200 and (
+        "etag" in result.headers or "last-modified" in result.headers
+    ):
+        _remember(url, result)
+    return result
@@ -0,0 +1,261 @@
+import logging
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Pattern, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Playwright resource types that can be blocked ('document' never is, it would break navigation)
+RESOURCE_TYPES = frozenset({
+    "stylesheet", "image", "media", "font", "script", "texttrack", "xhr", "fetch",
+    "eventsource", "websocket", "manifest", "other",
+})
+# Types served from the static cache when a policy enables it
+STATIC_TYPES = frozenset({"stylesheet", "script", "font", "image"})
+
+PRESETS: Dict[str, List[str]] = {
+    "analytics": [
+        r"google-analytics\.com", r"googletagmanager\.com", r"analytics\.google\.com", r"segment\.(io|com)",
+        r"hotjar\.com", r"mixpanel\.com", r"amplitude\.com", r"clarity\.ms", r"fullstory\.com",
+        r"newrelic\.com", r"nr-data\.net", r"sentry\.io", r"plausible\.io", r"matomo",
+    ],
+    "ads": [
+        r"doubleclick\.net", r"googlesyndication\.com", r"googleadservices\.com", r"adservice\.google\.",
+        r"amazon-adsystem\.com", r"adnxs\.com", r"criteo\.(com|net)", r"taboola\.com", r"outbrain\.com",
+        r"facebook\.com/tr", r"connect\.facebook\.net", r"ads\.linkedin\.com", r"bat\.bing\.com",
+    ],
+}
+
+# Process-wide static asset cache, shared by all runs
+STATIC_CACHE_MAX_BYTES = int(os.environ.get("TRACKER_STATIC_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+STATIC_CACHE_MAX_ENTRY_BYTES = int(os.environ.get("TRACKER_STATIC_CACHE_MAX_ENTRY_BYTES", str(2 * 1024 * 1024)))
+STATIC_CACHE_TTL = float(os.environ.get("TRACKER_STATIC_CACHE_TTL", "3600"))
+STATIC_CACHE_MAX_ENTRIES = int(os.environ.get("TRACKER_STATIC_CACHE_MAX_ENTRIES", "10000"))
+# Seconds between sweeps of expired entries, which otherwise go only when looked up
+STATIC_CACHE_SWEEP_INTERVAL = 60
+_COOKIE_HEADERS = ("set-cookie", "set-cookie2")
+
+_MAX_AGE = re.compile(r"max-age=(\d+)")
+
+
+def split_list(value: Any, separators: str = r"[,\s]+") -> List[str]:
+    """Accepts a list or a separated string (the editor only has single-line text fields)."""
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [item for item in re.split(separators, value) if item]
+    return [str(item) for item in value if item]
+
+
+class InterceptionPolicy:
+    """What a tracker's pages may load: blocked resource types, blocked URL patterns, static caching."""
+
+    def __init__(self, resource_types: Iterable[str] = (), patterns: Iterable[Pattern] = (), cache_static: bool = False):
+        self.resource_types: FrozenSet[str] = frozenset(resource_types)
+        self.patterns: Tuple[Pattern, ...] = tuple({p.pattern: p for p in patterns}.values())
+        self.cache_static = cache_static
+        # One alternation is much cheaper per request than testing each pattern
+        self._combined = re.compile("|".join(f"(?:{p.pattern})" for p in self.patterns)) if self.patterns else None
+
+    @classmethod
+    def build(cls, types: Any = None, patterns: Any = None, presets: Any = None, cache_static: bool = False) -> "InterceptionPolicy":
+        """Raises ValueError on unknown types, presets or invalid regexes."""
+        resource_types = set(split_list(types))
+        unknown = resource_types - RESOURCE_TYPES
+        if unknown:
+            raise ValueError(f"unknown resource types {sorted(unknown)}, expected some of {sorted(RESOURCE_TYPES)}")
+        sources = split_list(patterns, r"\s+")
+        for preset in split_list(presets):
+            if preset not in PRESETS:
+                raise ValueError(f"unknown preset '{preset}', expected one of {sorted(PRESETS)}")
+            sources.extend(PRESETS[preset])
+        compiled = []
+        for source in sources:
+            try:
+                compiled.append(re.compile(source))
+            except re.error as e:
+                raise ValueError(f"invalid pattern '{source}': {e}")
+        return cls(resource_types, compiled, cache_static)
+
+    @property
+    def is_empty(self) -> bool:
+        return not self.resource_types and not self.patterns and not self.cache_static
+
+    def merged(self, other: "InterceptionPolicy") -> "InterceptionPolicy":
+        return InterceptionPolicy(
+            self.resource_types | other.resource_types, self.patterns + other.patterns,
+            self.cache_static or other.cache_static,
+        )
+
+    def blocks(self, resource_type: str, url: str) -> bool:
+        return resource_type in self.resource_types or (self._combined is not None and self._combined.search(url) is not None)
+
+
+def _global_policy() -> InterceptionPolicy:
+    try:
+        return InterceptionPolicy.build(
+            os.environ.get("TRACKER_BLOCK_RESOURCE_TYPES"),
+            os.environ.get("TRACKER_BLOCK_URL_PATTERNS"),
+            os.environ.get("TRACKER_BLOCK_PRESETS"),
+            os.environ.get("TRACKER_STATIC_CACHE", "0") == "1",
+        )
+    except ValueError as e:
+        logger.error(f"Ignoring invalid global blocking policy: {e}")
+        return InterceptionPolicy()
+
+
+GLOBAL_POLICY = _global_policy()
+
+
+class _CachedAsset:
+    __slots__ = ("status", "headers", "body", "fetch_ms", "expires")
+
+    def __init__(self, status: int, headers: Dict[str, str], body: bytes, fetch_ms: float, expires: float):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.fetch_ms = fetch_ms
+        self.expires = expires
+
+
+class StaticCache:
+    """Byte- and count-bounded LRU of static responses. Also remembers sizes of resources it saw, to estimate savings."""
+
+    def __init__(self, max_bytes: int = STATIC_CACHE_MAX_BYTES, max_entry_bytes: int = STATIC_CACHE_MAX_ENTRY_BYTES,
+                 ttl: float = STATIC_CACHE_TTL, max_entries: int = STATIC_CACHE_MAX_ENTRIES):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.size = 0
+        self._entries: "OrderedDict[str, _CachedAsset]" = OrderedDict()
+        self._swept = time.time()
+        # url -> (bytes, fetch ms) of resources loaded earlier, cached or not
+        self._seen: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()
+
+    def get(self, url: str) -> Optional[_CachedAsset]:
+        asset = self._entries.get(url)
+        if asset is None:
+            return None
+        if asset.expires < time.time():
+            self._remove(url)
+            return None
+        self._entries.move_to_end(url)
+        return asset
+
+    def put(self, url: str, status: int, headers: Dict[str, str], body: bytes, fetch_ms: float):
+        self.remember(url, len(body), fetch_ms)
+        cache_control = headers.get("cache-control", "")
+        if status != 200 or "no-store" in cache_control or "private" in cache_control or len(body) > self.max_entry_bytes:
+            return
+        # A response setting cookies belongs to one session, replaying its
+        # Set-Cookie would hand that session to every other run
+        if any(name in headers for name in _COOKIE_HEADERS):
+            return
+        max_age = _MAX_AGE.search(cache_control)
+        ttl = min(self.ttl, int(max_age.group(1))) if max_age else self.ttl
+        if ttl <= 0:
+            return
+        now = time.time()
+        if now - self._swept > STATIC_CACHE_SWEEP_INTERVAL:
+            self._sweep(now)
+        self._remove(url)
+        self._entries[url] = _CachedAsset(status, headers, body, fetch_ms, now + ttl)
+        self.size += len(body)
+        while (self.size > self.max_bytes or len(self._entries) > self.max_entries) and self._entries:
+            self._remove(next(iter(self._entries)))
+
+    def remember(self, url: str, size: int, fetch_ms: float):
+        self._seen[url] = (size, fetch_ms)
+        self._seen.move_to_end(url)
+        if len(self._seen) > 10000:
+            self._seen.popitem(last=False)
+
+    def known_cost(self, url: str) -> Optional[Tuple[int, float]]:
+        return self._seen.get(url)
+
+    def _sweep(self, now: float):
+        self._swept = now
+        for url in [url for url, asset in self._entries.items() if asset.expires < now]:
+            self._remove(url)
+
+    def _remove(self, url: str):
+        asset = self._entries.pop(url, None)
+        if asset is not None:
+            self.size -= len(asset.body)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len(self._entries), "bytes": self.size}
+
+
+static_cache = StaticCache()
+
+
+class InterceptionStats:
+    def __init__(self):
+        self.blocked: Dict[str, int] = {}
+        self.cache_hits = 0
+        self.bytes_saved = 0
+        self.time_saved_ms = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "blocked_requests": sum(self.blocked.values()),
+            "blocked_by_type": dict(self.blocked),
+            "cache_hits": self.cache_hits,
+            # Exact for cache hits; blocked requests only count when their size was seen before
+            "bytes_saved": self.bytes_saved,
+            "time_saved_ms": round(self.time_saved_ms),
+        }
+
+
+class RouteHandler:
+    """Playwright route handler applying a policy to every request of a page."""
+
+    def __init__(self, policy: InterceptionPolicy, cache: StaticCache = static_cache):
+        self.policy = policy
+        self.cache = cache
+        self.stats = InterceptionStats()
+
+    def _saved(self, url: str):
+        cost = self.cache.known_cost(url)
+        if cost is not None:
+            self.stats.bytes_saved += cost[0]
+            self.stats.time_saved_ms += cost[1]
+
+    async def handle(self, route):
+        request = route.request
+        resource_type = request.resource_type
+        url = request.url
+        if resource_type != "document" and self.policy.blocks(resource_type, url):
+            self.stats.blocked[resource_type] = self.stats.blocked.get(resource_type, 0) + 1
+            self._saved(url)
+            await route.abort("blockedbyclient")
+            return
+
+        if not (self.policy.cache_static and resource_type in STATIC_TYPES and request.method == "GET"):
+            await route.continue_()
+            return
+
+        asset = self.cache.get(url)
+        if asset is not None:
+            self.stats.cache_hits += 1
+            self.stats.bytes_saved += len(asset.body)
+            self.stats.time_saved_ms += asset.fetch_ms
+            await route.fulfill(status=asset.status, headers=asset.headers, body=asset.body)
+            return
+
+        start = time.perf_counter()
+        try:
+            response = await route.fetch()
+            body = await response.body()
+        except Exception as e:
+            # Let the browser load (or fail) it the normal way
+            logger.debug(f"Static fetch of {url} failed: {e}")
+            await route.continue_()
+            return
+        fetch_ms = (time.perf_counter() - start) * 1000
+        self.cache.put(url, response.status, {k.lower(): v for k, v in response.headers.items()}, body, fetch_ms)
+        await route.fulfill(response=response, body=body)
@@ -0,0 +1,158 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from sqlalchemy import and_, func, insert, or_, update
+from sqlalchemy.orm import Session
+from backend import database, models
+
+logger = logging.getLogger(__name__)
+
+# 'local': runs execute in the API process through run_queue.
+# 'distributed': runs are written to tracker_jobs and executed by backend.worker processes.
+EXECUTION_MODE = os.environ.get("TRACKER_EXECUTION_MODE", "local")
+LEASE_SECONDS = float(os.environ.get("TRACKER_JOB_LEASE_SECONDS", "60"))
+MAX_ATTEMPTS = int(os.environ.get("TRACKER_JOB_MAX_ATTEMPTS", "3"))
+JOB_RETENTION_HOURS = int(os.environ.get("TRACKER_JOB_RETENTION_HOURS", "24"))
+
+
+def is_distributed() -> bool:
+    return EXECUTION_MODE == "distributed"
+
+
+async def call(op: Callable[[Session], Any]) -> Any:
+    """
+    Runs a job operation in a worker thread. Job sessions begin with SQLite's
+    write lock held, so a claim or enqueue is atomic across processes.
+    """
+    def run():
+        db = database.WriteSessionLocal()
+        try:
+            return op(db)
+        finally:
+            db.close()
+    return await asyncio.to_thread(run)
+
+
+def slot_time(when: Optional[datetime] = None) -> datetime:
+    """Cron slots have minute resolution; every scheduler maps a firing to the same slot."""
+    return (when or datetime.utcnow()).replace(second=0, microsecond=0)
+
+
+def enqueue(db: Session, tracker_id: int, scheduled_for: datetime, priority: int, require_active: bool = True,
+            commit: bool = True, if_running: str = "queue") -> str:
+    """
+    Adds a job unless one exists for the same slot ('duplicate') or the
+    tracker already has a pending job ('coalesced'). With if_running='skip'
+    nothing is added while a worker holds a live lease for the tracker
+    ('running').
+    """
+    Job = models.TrackerJobModel
+    if if_running == "skip" and db.query(Job.id).filter(
+        Job.tracker_id == tracker_id, Job.status == "leased", Job.lease_expires_at >= datetime.utcnow()
+    ).first() is not None:
+        if commit:
+            db.rollback()
+        return "running"
+    pending = db.query(Job).filter(Job.tracker_id == tracker_id, Job.status == "pending").first()
+    if pending is not None:
+        if priority < pending.priority:
+            pending.priority = priority
+            pending.require_active = pending.require_active and require_active
+        result = "coalesced"
+    else:
+        inserted = db.execute(insert(Job).prefix_with("OR IGNORE").values(
+            tracker_id=tracker_id, scheduled_for=scheduled_for, priority=priority,
+            require_active=require_active, status="pending", attempts=0,
+        ))
+        result = "queued" if inserted.rowcount == 1 else "duplicate"
+    if commit:
+        db.commit()
+    else:
+        db.flush()
+    return result
+
+
+def _claimable(now: datetime):
+    Job = models.TrackerJobModel
+    return or_(
+        and_(Job.status == "pending", Job.scheduled_for <= now),
+        # Lease of a crashed or hung worker ran out
+        and_(Job.status == "leased", Job.lease_expires_at < now),
+    )
+
+
+def claim(db: Session, owner: str, limit: int, lease_seconds: float = LEASE_SECONDS) -> List[Tuple[int, int, bool]]:
+    """
+    Leases up to `limit` due jobs for `owner`, returning (job_id, tracker_id,
+    require_active). Jobs are taken with a conditional UPDATE, so even
+    without the immediate transaction two workers never lease the same job.
+    """
+    Job = models.TrackerJobModel
+    now = datetime.utcnow()
+    # Trackers currently leased elsewhere are skipped so a tracker never runs twice at once
+    busy = db.query(Job.tracker_id).filter(Job.status == "leased", Job.lease_expires_at >= now)
+    candidates = db.query(Job.id, Job.tracker_id, Job.require_active).filter(
+        _claimable(now), Job.tracker_id.notin_(busy.scalar_subquery())
+    ).order_by(Job.priority, Job.scheduled_for).limit(limit * 2).all()
+
+    claimed = []
+    seen_trackers = set()
+    for job_id, tracker_id, require_active in candidates:
+        if len(claimed) >= limit or tracker_id in seen_trackers:
+            continue
+        taken = db.execute(update(Job).where(Job.id == job_id, _claimable(now)).values(
+            status="leased", lease_owner=owner,
+            lease_expires_at=now + timedelta(seconds=lease_seconds),
+            attempts=Job.attempts + 1,
+        ))
+        if taken.rowcount == 1:
+            claimed.append((job_id, tracker_id, require_active))
+            seen_trackers.add(tracker_id)
+    db.commit()
+    return claimed
+
+
+def heartbeat(db: Session, owner: str, job_ids: List[int], lease_seconds: float = LEASE_SECONDS) -> int:
+    """Extends the leases `owner` still holds; returns how many were extended."""
+    if not job_ids:
+        return 0
+    Job = models.TrackerJobModel
+    result = db.execute(update(Job).where(
+        Job.id.in_(job_ids), Job.lease_owner == owner, Job.status == "leased"
+    ).values(lease_expires_at=datetime.utcnow() + timedelta(seconds=lease_seconds)))
+    db.commit()
+    return result.rowcount
+
+
+def complete(db: Session, job_id: int, owner: str, status: str = "done"):
+    Job = models.TrackerJobModel
+    db.execute(update(Job).where(Job.id == job_id, Job.lease_owner == owner).values(
+        status=status, finished_at=datetime.utcnow(), lease_expires_at=None,
+    ))
+    db.commit()
+
+
+def fail_exhausted(db: Session, max_attempts: int = MAX_ATTEMPTS) -> int:
+    """Gives up on jobs whose leases keep expiring (e.g. they crash their worker)."""
+    Job = models.TrackerJobModel
+    result = db.execute(update(Job).where(
+        Job.status == "leased", Job.lease_expires_at < datetime.utcnow(), Job.attempts >= max_attempts
+    ).values(status="failed", finished_at=datetime.utcnow()))
+    db.commit()
+    return result.rowcount
+
+
+def purge(db: Session, retention_hours: int = JOB_RETENTION_HOURS) -> int:
+    Job = models.TrackerJobModel
+    cutoff = datetime.utcnow() - timedelta(hours=retention_hours)
+    result = db.execute(Job.__table__.delete().where(Job.status.in_(("done", "failed")), Job.finished_at < cutoff))
+    db.commit()
+    return result.rowcount
+
+
+def stats(db: Session) -> Dict[str, int]:
+    Job = models.TrackerJobModel
+    counts = dict(db.query(Job.status, func.count(Job.id)).group_by(Job.status).all())
+    return {status: counts.get(status, 0) for status in ("pending", "leased", "done", "failed")}
@@ -6,34 +6,56 @@ import asyncio
 if sys.platform == 'win32':
     asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
 
-# Add project root to sys.path to allow 'from backend import ...'
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
-from fastapi import FastAPI, Depends, HTTPException, BackgroundTasks, Header, Response
+from fastapi import FastAPI, Depends, HTTPException, Header, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List, Optional
-from backend import models, crud, database
-from backend.engine import TrackerEngine
+from typing import List, Optional, Union
+from backend import models, crud, database, feeds, events, plan
 from backend import scheduler
+from backend import browser_pool, run_queue, async_db, http_client, run_logs, jobs, content_diff, profiles, interception, metrics, notifications, screenshots, change_log
 import logging
-import email.utils
+import json
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-models.Base.metadata.create_all(bind=database.engine)
-
 app = FastAPI(title="Tracker API", version="0.1.0")
 
 # Security
 ADMIN_SECRET = "secret123" # TODO: Move to env var
 
+# Largest list accepted by the bulk endpoints (and largest import batch)
+BULK_MAX_ITEMS = int(os.environ.get("TRACKER_BULK_MAX_ITEMS", "5000"))
+
 @app.on_event("startup")
 async def startup_event():
+    database.init_db()
+    events.broker.bind(asyncio.get_running_loop())
+    async_db.writer.start()
+    # Delivers notifications queued by runs of this process and, in distributed mode, of the workers
+    notifications.dispatcher.start()
+    if jobs.is_distributed():
+        # Feed invalidations and dashboard events of worker runs arrive through the change log
+        change_log.tailer.start()
+        # Runs and schedules are handled by backend.worker processes
+        logger.info("Distributed execution mode: runs are queued for workers")
+        return
+    await browser_pool.start()
+    await run_queue.queue.start()
     scheduler.start_scheduler()
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    await change_log.tailer.stop()
+    await run_queue.queue.stop()
+    await notifications.dispatcher.stop()
+    await profiles.manager.close()
+    await browser_pool.stop()
+    await http_client.close_client()
+    async_db.writer.stop()
+
 async def verify_admin(x_admin_key: Optional[str] = Header(None)):
     if x_admin_key != ADMIN_SECRET:
         raise HTTPException(status_code=401, detail="Invalid Admin Key")
@@ -53,41 +75,55 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.exception_handler(plan.PlanError)
+async def plan_error_handler(request: Request, exc: plan.PlanError):
+    return JSONResponse(status_code=422, content={"detail": f"Invalid tracker config: {exc}"})
+
+@app.exception_handler(profiles.ProfileError)
+async def profile_error_handler(request: Request, exc: profiles.ProfileError):
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
+
 @app.get("/")
 async def root():
     return {"message": "Tracker API is running"}
 
 @app.get("/health")
 async def health_check():
-    return {"status": "ok"}
+    return {
+        "status": "ok",
+        "browser_pools": browser_pool.stats(),
+        "profiles": profiles.manager.stats(),
+        "static_cache": interception.static_cache.stats(),
+    }
+
+@app.get("/metrics")
+async def get_metrics():
+    # Prometheus text exposition format
+    return Response(content=metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+def _feed_response(feed: feeds.CachedFeed, if_none_match: Optional[str], if_modified_since: Optional[str]) -> Response:
+    headers = {"ETag": feed.etag, "Last-Modified": feed.last_modified_header, "Cache-Control": "no-cache"}
+    if feed.is_fresh(if_none_match, if_modified_since):
+        return Response(status_code=304, headers=headers)
+    return Response(content=feed.body, media_type="application/rss+xml", headers=headers)
 
 @app.get("/feed")
-def get_rss_feed(db: Session = Depends(database.get_db)):
-    trackers = crud.get_trackers(db, limit=100)
-    
-    xml = '<?xml version="1.0" encoding="UTF-8" ?>'
-    xml += '<rss version="2.0">'
-    xml += '<channel>'
-    xml += '<title>Tracker Status Feed</title>'
-    xml += '<link>http://localhost:5173</link>'
-    xml += '<description>Latest status updates from Tracker</description>'
-    
-    for tracker in trackers:
-        status = tracker.last_run_status or "pending"
-        # Convert date to RFC 822 format
-        pub_date = email.utils.format_datetime(tracker.last_run_at) if tracker.last_run_at else email.utils.formatdate(usegmt=True)
-        
-        xml += '<item>'
-        xml += f'<title>{tracker.name}: {status.upper()}</title>'
-        xml += f'<description>Status: {status}. Checked at: {tracker.last_run_at}</description>'
-        xml += f'<guid>{tracker.id}-{tracker.last_run_at}</guid>'
-        xml += f'<pubDate>{pub_date}</pubDate>'
-        xml += '</item>'
-        
-    xml += '</channel>'
-    xml += '</rss>'
-    
-    return Response(content=xml, media_type="application/rss+xml")
+def get_rss_feed(db: Session = Depends(database.get_read_db), if_none_match: Optional[str] = Header(None), if_modified_since: Optional[str] = Header(None)):
+    change_log.catch_up(db)
+    return _feed_response(feeds.status_feed(db), if_none_match, if_modified_since)
+
+@app.get("/feed/transitions")
+def get_transitions_feed(db: Session = Depends(database.get_read_db), if_none_match: Optional[str] = Header(None), if_modified_since: Optional[str] = Header(None)):
+    change_log.catch_up(db)
+    return _feed_response(feeds.transitions_feed(db), if_none_match, if_modified_since)
+
+@app.get("/trackers/{tracker_id}/feed")
+def get_tracker_feed(tracker_id: int, db: Session = Depends(database.get_read_db), if_none_match: Optional[str] = Header(None), if_modified_since: Optional[str] = Header(None)):
+    change_log.catch_up(db)
+    db_tracker = crud.get_tracker(db, tracker_id=tracker_id)
+    if db_tracker is None:
+        raise HTTPException(status_code=404, detail="Tracker not found")
+    return _feed_response(feeds.tracker_feed(db, db_tracker), if_none_match, if_modified_since)
 
 @app.post("/trackers/", response_model=models.Tracker)
 def create_tracker(tracker: models.TrackerCreate, db: Session = Depends(database.get_db), admin_auth: str = Depends(verify_admin)):
@@ -96,6 +132,122 @@ def create_tracker(tracker: models.TrackerCreate, db: Session = Depends(database
         scheduler.add_job(new_tracker.id, new_tracker.schedule_cron)
     return new_tracker
 
+# Bulk routes are declared before /trackers/{tracker_id} so "bulk", "export" and
+# "import" aren't taken for tracker ids
+
+def _check_bulk_size(count: int):
+    if count > BULK_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {BULK_MAX_ITEMS} trackers per bulk request")
+
+def _reschedule(trackers):
+    for tracker in trackers:
+        scheduler.remove_job(tracker.id)
+        if tracker.schedule_cron and tracker.is_active:
+            scheduler.add_job(tracker.id, tracker.schedule_cron)
+
+@app.post("/trackers/bulk", response_model=models.BulkResult)
+def create_trackers_bulk(trackers: List[models.TrackerCreate], db: Session = Depends(database.get_db), admin_auth: str = Depends(verify_admin)):
+    _check_bulk_size(len(trackers))
+    ids = crud.create_trackers(db, trackers)
+    _reschedule(models.TrackerBulkUpdate(id=tracker_id, **tracker.dict()) for tracker_id, tracker in zip(ids, trackers))
+    return {"ids": ids}
+
+@app.put("/trackers/bulk", response_model=models.BulkResult)
+def update_trackers_bulk(trackers: List[models.TrackerBulkUpdate], db: Session = Depends(database.get_db), admin_auth: str = Depends(verify_admin)):
+    _check_bulk_size(len(trackers))
+    updated, missing = crud.update_trackers(db, trackers)
+    updated_ids = set(updated)
+    _reschedule(tracker for tracker in trackers if tracker.id in updated_ids)
+    return {"ids": updated, "missing": missing}
+
+@app.post("/trackers/bulk/delete", response_model=models.BulkResult)
+def delete_trackers_bulk(request: models.TrackerIds, db: Session = Depends(database.get_db), admin_auth: str = Depends(verify_admin)):
+    _check_bulk_size(len(request.ids))
+    deleted, missing = crud.delete_trackers(db, request.ids)
+    for tracker_id in deleted:
+        scheduler.remove_job(tracker_id)
+    return {"ids": deleted, "missing": missing}
+
+@app.post("/trackers/bulk/run", response_model=models.BulkResult)
+async def run_trackers_bulk(request: models.TrackerIds, admin_auth: str = Depends(verify_admin)):
+    _check_bulk_size(len(request.ids))
+    found = await async_db.read(lambda db: crud.existing_tracker_ids(db, request.ids))
+    ids = [tracker_id for tracker_id in dict.fromkeys(request.ids) if tracker_id in found]
+    results = await run_queue.submit_many(ids, run_queue.PRIORITY_MANUAL, require_active=False)
+    return {"ids": ids, "missing": [tracker_id for tracker_id in request.ids if tracker_id not in found], "results": results}
+
+@app.get("/trackers/export")
+def export_trackers(admin_auth: str = Depends(verify_admin)):
+    """All trackers as NDJSON, one object per line, streamed in chunks."""
+    def lines():
+        db = database.ReadSessionLocal()
+        try:
+            for tracker in crud.iter_trackers(db):
+                yield json.dumps({
+                    "id": tracker.id, "name": tracker.name, "description": tracker.description,
+                    "config": tracker.config, "schedule_cron": tracker.schedule_cron, "is_active": tracker.is_active,
+                }) + "\n"
+        finally:
+            db.close()
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson",
+                             headers={"Content-Disposition": "attachment; filename=trackers.ndjson"})
+
+@app.post("/trackers/import", response_model=models.TrackerImportResult)
+async def import_trackers(request: Request, batch_size: int = 500, admin_auth: str = Depends(verify_admin)):
+    """
+    Creates trackers from an NDJSON body (the export format; ids are
+    ignored). Lines are parsed as they arrive and written one transaction
+    per batch. Invalid lines are skipped and reported.
+    """
+    batch_size = max(1, min(batch_size, BULK_MAX_ITEMS))
+    ids, errors, batch = [], [], []
+
+    def write(trackers):
+        db = database.SessionLocal()
+        try:
+            return crud.create_trackers(db, trackers)
+        finally:
+            db.close()
+
+    async def flush():
+        # Configs were validated per line, so a batch is all or nothing only on DB errors
+        created = await asyncio.to_thread(write, [tracker for _, tracker in batch])
+        _reschedule(models.TrackerBulkUpdate(id=tracker_id, **tracker.dict()) for tracker_id, (_, tracker) in zip(created, batch))
+        ids.extend(created)
+        batch.clear()
+
+    def parse(number: int, line: bytes):
+        if not line.strip():
+            return
+        try:
+            data = json.loads(line)
+            if not isinstance(data, dict):
+                raise ValueError("expected a JSON object")
+            data.pop("id", None)
+            tracker = models.TrackerCreate(**data)
+            plan.compile_config(tracker.config)
+        except (ValueError, TypeError) as e: # JSON, validation and PlanError are all ValueErrors
+            if len(errors) < 100:
+                errors.append({"line": number, "detail": str(e)[:500]})
+            return
+        batch.append((number, tracker))
+
+    buffer, number = b"", 0
+    async for data in request.stream():
+        buffer += data
+        *complete, buffer = buffer.split(b"\n")
+        for line in complete:
+            number += 1
+            parse(number, line)
+        if len(batch) >= batch_size:
+            await flush()
+    if buffer:
+        parse(number + 1, buffer)
+    if batch:
+        await flush()
+    return {"created": len(ids), "ids": ids, "errors": errors}
+
 @app.put("/trackers/{tracker_id}", response_model=models.Tracker)
 def update_tracker(tracker_id: int, tracker: models.TrackerCreate, db: Session = Depends(database.get_db), admin_auth: str = Depends(verify_admin)):
     db_tracker = crud.get_tracker(db, tracker_id=tracker_id)
@@ -111,49 +263,256 @@ def update_tracker(tracker_id: int, tracker: models.TrackerCreate, db: Session =
         
     return updated_tracker
 
+def _check_tracker_order(order: str):
+    if order not in crud.TRACKER_ORDERS:
+        raise HTTPException(status_code=400, detail=f"order must be one of {', '.join(crud.TRACKER_ORDERS)}")
+
 @app.get("/trackers/", response_model=List[models.Tracker])
-def read_trackers(skip: int = 0, limit: int = 100, db: Session = Depends(database.get_db)):
-    trackers = crud.get_trackers(db, skip=skip, limit=limit)
+def read_trackers(skip: int = 0, limit: int = 100, is_active: Optional[bool] = None, status: Optional[str] = None,
+                  order: str = "id", db: Session = Depends(database.get_read_db)):
+    _check_tracker_order(order)
+    trackers = crud.get_trackers(db, skip=skip, limit=limit, is_active=is_active, status=status, order=order)
     return trackers
 
+def _sse(event: str, data: dict, event_id: Union[int, str, None] = None) -> str:
+    prefix = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{prefix}event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.get("/trackers/summary", response_model=List[models.TrackerSummary])
+def read_tracker_summaries(skip: int = 0, limit: int = 100, is_active: Optional[bool] = None, status: Optional[str] = None,
+                           order: str = "id", db: Session = Depends(database.get_read_db)):
+    _check_tracker_order(order)
+    return crud.get_tracker_summaries(db, skip=skip, limit=limit, is_active=is_active, status=status, order=order)
+
+@app.get("/trackers/{tracker_id}/summary", response_model=models.TrackerSummary)
+def read_tracker_summary(tracker_id: int, db: Session = Depends(database.get_read_db)):
+    db_tracker = crud.get_tracker_summary(db, tracker_id)
+    if db_tracker is None:
+        raise HTTPException(status_code=404, detail="Tracker not found")
+    return db_tracker
+
+@app.get("/events")
+async def stream_events(request: Request, last_event_id: Optional[str] = Header(None)):
+    """
+    Server-sent status-change events. Reconnecting clients resume after
+    Last-Event-ID; if that is too old or from another process (or an earlier
+    boot), a 'resync' event asks them to refetch.
+    """
+    broker = events.broker
+    queue = broker.subscribe()
+
+    async def stream():
+        try:
+            sent = broker.last_id
+            yield "retry: 3000\n\n"
+            if last_event_id is not None:
+                resume = broker.parse_id(last_event_id)
+                backlog = broker.since(resume) if resume is not None else None
+                if backlog is None:
+                    # The refetch covers everything up to here
+                    yield _sse("resync", {}, broker.format_id(sent))
+                    backlog = []
+                else:
+                    sent = resume
+                for event_id, data in backlog:
+                    yield _sse(data["type"], data, broker.format_id(event_id))
+                    sent = event_id
+            while not await request.is_disconnected():
+                try:
+                    event_id, data = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if event_id > sent:
+                    yield _sse(data["type"], data, broker.format_id(event_id))
+                    sent = event_id
+        finally:
+            events.broker.unsubscribe(queue)
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
 @app.get("/trackers/{tracker_id}", response_model=models.Tracker)
-def read_tracker(tracker_id: int, db: Session = Depends(database.get_db)):
+def read_tracker(tracker_id: int, db: Session = Depends(database.get_read_db)):
     db_tracker = crud.get_tracker(db, tracker_id=tracker_id)
     if db_tracker is None:
         raise HTTPException(status_code=404, detail="Tracker not found")
     return db_tracker
 
-async def execute_tracker_task(tracker_id: int):
-    # Create a new session for the background task
-    db = database.SessionLocal()
-    try:
-        tracker = crud.get_tracker(db, tracker_id)
-        if not tracker:
-            logger.error(f"Tracker {tracker_id} not found during execution")
-            return
+@app.get("/trackers/{tracker_id}/runs", response_model=List[models.TrackerRun])
+def read_tracker_runs(tracker_id: int, skip: int = 0, limit: int = 100, before_id: Optional[int] = None, db: Session = Depends(database.get_read_db)):
+    return crud.get_runs(db, tracker_id, skip=skip, limit=min(limit, 1000), before_id=before_id)
 
-        crud.update_tracker_status(db, tracker_id, "running")
-        
-        engine = TrackerEngine()
+@app.get("/trackers/{tracker_id}/runs/{run_id}", response_model=models.TrackerRunDetail)
+def read_tracker_run(tracker_id: int, run_id: int, db: Session = Depends(database.get_read_db)):
+    db_run = crud.get_run(db, tracker_id, run_id)
+    if db_run is None:
+        raise HTTPException(status_code=404, detail="Run not found")
+    logs = db_run.logs
+    chunks = crud.get_run_log_chunks(db, run_id)
+    if chunks:
+        records = [record for chunk in chunks for record in run_logs.decode_chunk(chunk.data)]
+        logs = "".join(f"{r['level']}: {r['message']}\n" for r in records)
+    return {
+        "id": db_run.id, "tracker_id": db_run.tracker_id, "status": db_run.status,
+        "status_changed": db_run.status_changed, "started_at": db_run.started_at,
+        "finished_at": db_run.finished_at, "duration_ms": db_run.duration_ms,
+        "logs": logs, "run_info": db_run.run_info,
+    }
+
+@app.get("/trackers/{tracker_id}/runs/{run_id}/logs")
+async def stream_tracker_run_logs(tracker_id: int, run_id: int, last_event_id: Optional[int] = Header(None)):
+    """Server-sent events tail of a run's log; follows live runs until they finish."""
+    db_run = await async_db.read(lambda db: crud.get_run(db, tracker_id, run_id))
+    if db_run is None:
+        raise HTTPException(status_code=404, detail="Run not found")
+    after = last_event_id or 0
+
+    async def live_events(run_log: run_logs.RunLog):
+        queue = run_log.subscribe()
         try:
-            logs, run_info = await engine.execute_tracker(tracker.config)
-            crud.update_tracker_status(db, tracker_id, "success", logs, run_info)
-        except Exception as e:
-            logger.error(f"Tracker {tracker_id} failed: {e}")
-            # Try to get logs even on failure? engine.execute_tracker raises Exception, so logs are lost if we don't catch inside
-            # Ideally engine should return logs + status or raise with logs attached.
-            # For now, we only get logs on success or partial logs if we refactor engine. 
-            # Given engine raises, we miss logs.
-            # Let's simple pass the exception message as log for now.
-            crud.update_tracker_status(db, tracker_id, "failure", str(e))
-    finally:
-        db.close()
+            # Replay what was logged before we subscribed, then follow
+            snapshot = list(run_log.records)
+            for record in snapshot:
+                if record["seq"] > after:
+                    yield _sse("log", record, record["seq"])
+            last_seq = snapshot[-1]["seq"] if snapshot else after
+            while True:
+                try:
+                    record = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if record is None:
+                    break
+                if record["seq"] > max(after, last_seq):
+                    yield _sse("log", record, record["seq"])
+        finally:
+            run_log.unsubscribe(queue)
+        yield _sse("end", {"run_id": run_id})
+
+    async def stored_events():
+        chunks = await async_db.read(lambda db: crud.get_run_log_chunks(db, run_id))
+        for chunk in chunks:
+            for record in run_logs.decode_chunk(chunk.data):
+                if record["seq"] > after:
+                    yield _sse("log", record, record["seq"])
+        yield _sse("end", {"run_id": run_id})
+
+    run_log = run_logs.get_live(run_id)
+    stream = live_events(run_log) if run_log else stored_events()
+    return StreamingResponse(stream, media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.get("/trackers/{tracker_id}/history", response_model=List[models.TrackerRunAggregate])
+def read_tracker_history(tracker_id: int, granularity: str = "hour", skip: int = 0, limit: int = 100, db: Session = Depends(database.get_read_db)):
+    if granularity not in ("hour", "day"):
+        raise HTTPException(status_code=400, detail="granularity must be 'hour' or 'day'")
+    return crud.get_run_aggregates(db, tracker_id, granularity=granularity, skip=skip, limit=min(limit, 1000))
+
+@app.get("/trackers/{tracker_id}/changes", response_model=List[models.TrackerContentChange])
+def read_tracker_changes(tracker_id: int, key: Optional[str] = None, skip: int = 0, limit: int = 20, db: Session = Depends(database.get_read_db)):
+    changes = crud.get_content_changes(db, tracker_id, key=key, skip=skip, limit=min(limit, 100))
+    return [{
+        "id": c.id, "key": c.key, "run_id": c.run_id, "fingerprint": c.fingerprint,
+        "created_at": c.created_at, "diff": content_diff.decompress(c.diff) if c.diff else None,
+    } for c in changes]
+
+@app.get("/trackers/{tracker_id}/screenshots", response_model=List[models.TrackerScreenshot])
+def read_tracker_screenshots(tracker_id: int, skip: int = 0, limit: int = 20, db: Session = Depends(database.get_read_db)):
+    return crud.get_screenshots(db, tracker_id, skip=skip, limit=min(limit, 100))
+
+def _screenshot_response(digest: str, thumbnail: bool, if_none_match: Optional[str]) -> Response:
+    found = screenshots.store.find(digest, thumbnail)
+    if found is None:
+        raise HTTPException(status_code=404, detail="Screenshot not found")
+    path, media_type = found
+    # Content-addressed: a URL always returns the same bytes
+    headers = {"ETag": f'"{digest}"', "Cache-Control": "public, max-age=31536000, immutable"}
+    if if_none_match and headers["ETag"] in if_none_match:
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, media_type=media_type, headers=headers)
+
+@app.get("/screenshots/{digest}")
+def read_screenshot(digest: str, if_none_match: Optional[str] = Header(None)):
+    return _screenshot_response(digest, False, if_none_match)
+
+@app.get("/screenshots/{digest}/thumbnail")
+def read_screenshot_thumbnail(digest: str, if_none_match: Optional[str] = Header(None)):
+    # The full image when there's no thumbnail (Pillow not installed)
+    return _screenshot_response(digest, True, if_none_match)
 
 @app.post("/trackers/{tracker_id}/run")
-async def run_tracker(tracker_id: int, background_tasks: BackgroundTasks, db: Session = Depends(database.get_db), admin_auth: str = Depends(verify_admin)):
+async def run_tracker(tracker_id: int, db: Session = Depends(database.get_read_db), admin_auth: str = Depends(verify_admin)):
     db_tracker = crud.get_tracker(db, tracker_id=tracker_id)
     if db_tracker is None:
         raise HTTPException(status_code=404, detail="Tracker not found")
     
-    background_tasks.add_task(execute_tracker_task, tracker_id)
-    return {"message": "Tracker execution started"}
+    result = await run_queue.submit(tracker_id, run_queue.PRIORITY_MANUAL, require_active=False)
+    if result == "running":
+        return {"message": "Tracker is already running", "status": result}
+    return {"message": "Tracker execution queued", "status": result}
+
+@app.get("/queue")
+def read_queue_stats(db: Session = Depends(database.get_read_db), admin_auth: str = Depends(verify_admin)):
+    if jobs.is_distributed():
+        return {"mode": "distributed", "jobs": jobs.stats(db)}
+    return run_queue.queue.stats()
+
+@app.get("/notifications", response_model=List[models.Notification])
+def read_notifications(status: Optional[str] = None, limit: int = 100, db: Session = Depends(database.get_read_db), admin_auth: str = Depends(verify_admin)):
+    return crud.get_notifications(db, status, min(limit, 1000))
+
+@app.get("/notifications/stats")
+def read_notification_stats(db: Session = Depends(database.get_read_db), admin_auth: str = Depends(verify_admin)):
+    return crud.get_notification_stats(db)
+
+# Browser context profiles
+def _existing_profile(name: str) -> profiles.Profile:
+    profile = profiles.manager.get(name)
+    if not profile.exists():
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return profile
+
+@app.get("/profiles", response_model=List[models.BrowserProfile])
+def read_profiles(admin_auth: str = Depends(verify_admin)):
+    return [profile.info() for profile in profiles.manager.list()]
+
+@app.post("/profiles", response_model=models.BrowserProfile)
+async def create_profile(profile: models.BrowserProfileCreate, admin_auth: str = Depends(verify_admin)):
+    if profiles.manager.get(profile.name).exists():
+        raise HTTPException(status_code=409, detail="Profile already exists")
+    profiles.manager.get(profile.name).create(persistent=profile.persistent)
+    return profiles.manager.get(profile.name).info()
+
+@app.delete("/profiles/{name}")
+async def delete_profile(name: str, admin_auth: str = Depends(verify_admin)):
+    _existing_profile(name)
+    await profiles.manager.delete(name)
+    return {"message": "Profile deleted"}
+
+@app.get("/profiles/{name}/cookies")
+def read_profile_cookies(name: str, admin_auth: str = Depends(verify_admin)):
+    return _existing_profile(name).cookies()
+
+@app.put("/profiles/{name}/cookies", response_model=models.BrowserProfile)
+async def replace_profile_cookies(name: str, cookies: List[dict], admin_auth: str = Depends(verify_admin)):
+    _existing_profile(name)
+    async with profiles.manager.checkout(name) as profile:
+        profile.set_cookies(cookies)
+        # A warm persistent context still has the old cookies
+        await profiles.manager.discard_context(profile)
+    return profile.info()
+
+@app.post("/profiles/{name}/snapshots/{snapshot}", response_model=models.BrowserProfile)
+async def save_profile_snapshot(name: str, snapshot: str, admin_auth: str = Depends(verify_admin)):
+    _existing_profile(name)
+    async with profiles.manager.checkout(name) as profile:
+        profile.save_snapshot(snapshot, profile.storage_state() or {"cookies": [], "origins": []})
+    return profile.info()
+
+@app.post("/profiles/{name}/snapshots/{snapshot}/restore", response_model=models.BrowserProfile)
+async def restore_profile_snapshot(name: str, snapshot: str, admin_auth: str = Depends(verify_admin)):
+    _existing_profile(name)
+    async with profiles.manager.checkout(name) as profile:
+        profile.save_storage_state(profile.load_snapshot(snapshot))
+        await profiles.manager.discard_context(profile)
+    return profile.info()
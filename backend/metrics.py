@@ -0,0 +1,225 @@
+"""
+In-process metrics in the Prometheus text format, served by GET /metrics.
+Every process (API, workers) keeps its own; scrape each of them.
+"""
+import asyncio
+import bisect
+import os
+import sys
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Step timings listed one by one in run_info; the per-action totals cover all of them
+RUN_INFO_MAX_STEPS = int(os.environ.get("TRACKER_TIMINGS_MAX_STEPS", "100"))
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+RUN_BUCKETS = (0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+_registry: List["_Metric"] = []
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", r"\\").replace("\n", r"\n").replace('"', r'\"')
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock() # The DB writer thread records too
+        _registry.append(self)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"] + self.samples()
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        super().__init__(name, help, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values: str) -> float:
+        return self._values.get(label_values, 0)
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labels, key)} {_number(value)}" for key, value in sorted(self._values.items())]
+
+
+class Gauge(_Metric):
+    """A value set directly, or read from `func` at scrape time."""
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, func: Optional[Callable[[], float]] = None):
+        super().__init__(name, help)
+        self.func = func
+        self._value = 0.0
+
+    def set(self, value: float):
+        self._value = value
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1):
+        self.inc(-amount)
+
+    def value(self) -> float:
+        return self.func() if self.func is not None else self._value
+
+    def samples(self) -> List[str]:
+        try:
+            value = self.value()
+        except Exception:
+            return []
+        return [f"{self.name} {_number(value)}"]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (last one is +Inf), sum]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *label_values: str):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def count(self, *label_values: str) -> int:
+        series = self._series.get(label_values)
+        return sum(series[0]) if series else 0
+
+    def samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            series = sorted((key, (list(counts), total)) for key, (counts, total) in self._series.items())
+        for key, (counts, total) in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {cumulative}")
+        return lines
+
+
+def render() -> str:
+    return "\n".join(line for metric in _registry for line in metric.render()) + "\n"
+
+
+async def serve(port: int, host: str = "0.0.0.0"):
+    """Minimal /metrics HTTP listener for processes without the API (workers)."""
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), 5)
+            path = request.split(b" ", 2)[1] if request.count(b" ") >= 2 else b""
+            if path.split(b"?")[0] == b"/metrics":
+                status, body = "200 OK", render().encode()
+            else:
+                status, body = "404 Not Found", b"Not Found\n"
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+            )
+            await writer.drain()
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
+
+
+def _rss_bytes() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        # No procfs: peak RSS is the best there is (bytes on macOS, KiB elsewhere)
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+RUNS = Counter("tracker_runs_total", "Finished tracker runs by status.", ("status",))
+RUN_SECONDS = Histogram("tracker_run_duration_seconds", "Wall time of tracker runs.", buckets=RUN_BUCKETS)
+RUNS_IN_FLIGHT = Gauge("tracker_runs_in_flight", "Tracker runs currently executing.")
+STEP_SECONDS = Histogram("tracker_step_duration_seconds", "Time spent per plan step, by action.", ("action",))
+BROWSER_LAUNCH_SECONDS = Histogram("tracker_browser_launch_seconds", "Browser and persistent context launch time.", ("kind",))
+QUEUE_WAIT_SECONDS = Histogram("tracker_queue_wait_seconds", "Time runs spent in the run queue before starting.")
+SUBMISSIONS = Counter("tracker_run_submissions_total", "Run submissions by outcome (queued, coalesced, running, ...).", ("result",))
+DB_WRITE_SECONDS = Histogram("tracker_db_write_batch_seconds", "Time to apply and commit one DB writer batch.")
+DB_WRITES = Counter("tracker_db_writes_total", "Write operations applied by the DB writer.")
+MEMORY = Gauge("process_resident_memory_bytes", "Resident memory of this process.", _rss_bytes)
+
+
+class StepTimings:
+    """Per-run step timing breakdown; also feeds the step latency histogram."""
+
+    __slots__ = ("steps", "by_action", "dropped")
+
+    def __init__(self):
+        self.steps: List[Tuple[str, float]] = []
+        self.by_action: Dict[str, List[float]] = {} # action -> [count, total seconds, max seconds]
+        self.dropped = 0
+
+    def record(self, action: str, seconds: float):
+        STEP_SECONDS.observe(seconds, action)
+        totals = self.by_action.get(action)
+        if totals is None:
+            self.by_action[action] = [1, seconds, seconds]
+        else:
+            totals[0] += 1
+            totals[1] += seconds
+            if seconds > totals[2]:
+                totals[2] = seconds
+        if len(self.steps) < RUN_INFO_MAX_STEPS:
+            self.steps.append((action, seconds))
+        else:
+            self.dropped += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        result: Dict[str, Any] = {
+            "steps": [{"action": action, "ms": round(seconds * 1000, 1)} for action, seconds in self.steps],
+            "by_action": {
+                action: {"count": count, "total_ms": round(total * 1000, 1), "max_ms": round(peak * 1000, 1)}
+                for action, (count, total, peak) in self.by_action.items()
+            },
+        }
+        if self.dropped:
+            result["steps_not_listed"] = self.dropped
+        return result
@@ -1,9 +1,5 @@
-import sys
-import os
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
-from sqlalchemy import Column, Integer, String, Text, Boolean, JSON, DateTime
-from sqlalchemy.sql import func
+from sqlalchemy import Column, Integer, String, Text, Boolean, JSON, DateTime, Index, LargeBinary
+from sqlalchemy.sql import func, text
 from backend.database import Base
 from pydantic import BaseModel
 from typing import List, Optional, Any, Dict
@@ -12,6 +8,12 @@ from datetime import datetime
 # SQLAlchemy Models
 class TrackerModel(Base):
     __tablename__ = "trackers"
+    # Also created on existing databases by database.MIGRATIONS
+    __table_args__ = (
+        Index("ix_trackers_active", "is_active", "id"),
+        Index("ix_trackers_status", "last_run_status", "last_run_at"),
+        Index("ix_trackers_last_run_at", "last_run_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
@@ -25,6 +27,156 @@ class TrackerModel(Base):
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+class TrackerRunModel(Base):
+    """Append-only record of a single tracker run."""
+    __tablename__ = "tracker_runs"
+    __table_args__ = (
+        Index("ix_tracker_runs_tracker_started", "tracker_id", "started_at"),
+        Index("ix_tracker_runs_transitions", "started_at", sqlite_where=text("status_changed = 1")),
+    )
+
+    id = Column(Integer, primary_key=True)
+    tracker_id = Column(Integer, nullable=False)
+    status = Column(String, nullable=False) # 'running', 'success', 'failure'
+    status_changed = Column(Boolean, default=False) # Final status differs from the previous run
+    started_at = Column(DateTime(timezone=True), nullable=False)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    duration_ms = Column(Integer, nullable=True)
+    logs = Column(Text, nullable=True)
+    run_info = Column(JSON, nullable=True)
+
+class TrackerRunLogChunkModel(Base):
+    """zlib-compressed JSON-lines log records of a run, in order of seq."""
+    __tablename__ = "tracker_run_log_chunks"
+    __table_args__ = (Index("ix_tracker_run_log_chunks_run", "run_id", "seq"),)
+
+    id = Column(Integer, primary_key=True)
+    run_id = Column(Integer, nullable=False)
+    seq = Column(Integer, nullable=False)
+    data = Column(LargeBinary, nullable=False)
+
+class TrackerRunAggregateModel(Base):
+    """Downsampled run counts that replace raw runs past the retention window."""
+    __tablename__ = "tracker_run_aggregates"
+    __table_args__ = (Index("ix_tracker_run_aggregates_bucket", "tracker_id", "granularity", "bucket_start", unique=True),)
+
+    id = Column(Integer, primary_key=True)
+    tracker_id = Column(Integer, nullable=False)
+    granularity = Column(String, nullable=False) # 'hour' or 'day'
+    bucket_start = Column(DateTime(timezone=True), nullable=False)
+    runs = Column(Integer, default=0)
+    successes = Column(Integer, default=0)
+    failures = Column(Integer, default=0)
+    total_duration_ms = Column(Integer, default=0)
+
+class TrackerJobModel(Base):
+    """
+    A run waiting for, or leased by, a worker process. The unique
+    (tracker_id, scheduled_for) pair makes every cron slot fire once no
+    matter how many schedulers enqueue it.
+    """
+    __tablename__ = "tracker_jobs"
+    __table_args__ = (
+        Index("ix_tracker_jobs_slot", "tracker_id", "scheduled_for", unique=True),
+        Index("ix_tracker_jobs_claim", "status", "priority", "scheduled_for"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    tracker_id = Column(Integer, nullable=False)
+    scheduled_for = Column(DateTime(timezone=True), nullable=False)
+    priority = Column(Integer, nullable=False, default=10)
+    require_active = Column(Boolean, default=True)
+    status = Column(String, nullable=False, default="pending") # 'pending', 'leased', 'done', 'failed'
+    lease_owner = Column(String, nullable=True)
+    lease_expires_at = Column(DateTime(timezone=True), nullable=True)
+    attempts = Column(Integer, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+class TrackerContentFingerprintModel(Base):
+    """Latest fingerprint of a tracker's watched content (watch_content step), per key."""
+    __tablename__ = "tracker_content_fingerprints"
+    __table_args__ = (Index("ix_tracker_content_fingerprints_key", "tracker_id", "key", unique=True),)
+
+    id = Column(Integer, primary_key=True)
+    tracker_id = Column(Integer, nullable=False)
+    key = Column(String, nullable=False)
+    fingerprint = Column(String, nullable=False) # sha256 of the normalized content
+    size = Column(Integer, default=0)
+    checked_at = Column(DateTime(timezone=True), nullable=True)
+    changed_at = Column(DateTime(timezone=True), nullable=True)
+
+class TrackerContentSnapshotModel(Base):
+    """Watched content at a change, zlib-compressed and size-capped, with the diff to the previous one."""
+    __tablename__ = "tracker_content_snapshots"
+    __table_args__ = (Index("ix_tracker_content_snapshots_key", "tracker_id", "key", "id"),)
+
+    id = Column(Integer, primary_key=True)
+    tracker_id = Column(Integer, nullable=False)
+    key = Column(String, nullable=False)
+    run_id = Column(Integer, nullable=True)
+    fingerprint = Column(String, nullable=False)
+    content = Column(LargeBinary, nullable=False)
+    diff = Column(LargeBinary, nullable=True) # None for the first snapshot
+    created_at = Column(DateTime(timezone=True), nullable=False)
+
+class TrackerScreenshotModel(Base):
+    """A screenshot a run took; the image itself is in the content-addressed screenshot store."""
+    __tablename__ = "tracker_screenshots"
+    __table_args__ = (
+        Index("ix_tracker_screenshots_tracker", "tracker_id", "id"),
+        Index("ix_tracker_screenshots_hash", "hash"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    tracker_id = Column(Integer, nullable=False)
+    run_id = Column(Integer, nullable=True)
+    hash = Column(String, nullable=False) # sha256 of the image
+    format = Column(String, nullable=False) # 'png' or 'jpeg'
+    size = Column(Integer, nullable=False)
+    selector = Column(String, nullable=True) # Element screenshots only
+    created_at = Column(DateTime(timezone=True), nullable=False)
+
+class NotificationModel(Base):
+    """
+    Outbox of webhook notifications. Runs only insert rows; the dispatcher
+    delivers them in the background, retrying with backoff.
+    """
+    __tablename__ = "notification_outbox"
+    __table_args__ = (
+        Index("ix_notification_outbox_due", "status", "next_attempt_at"),
+        Index("ix_notification_outbox_dedup", "tracker_id", "destination", "id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    tracker_id = Column(Integer, nullable=False)
+    run_id = Column(Integer, nullable=True)
+    destination = Column(String, nullable=False) # Webhook URL
+    message = Column(Text, nullable=False)
+    dedup_key = Column(String, nullable=True) # Hash of the message; an unchanged message isn't sent again
+    status = Column(String, nullable=False, default="pending") # 'pending', 'sending', 'sent', 'failed'
+    attempts = Column(Integer, default=0)
+    next_attempt_at = Column(DateTime(timezone=True), nullable=False)
+    lease_owner = Column(String, nullable=True)
+    lease_expires_at = Column(DateTime(timezone=True), nullable=True)
+    last_error = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    sent_at = Column(DateTime(timezone=True), nullable=True)
+
+class TrackerEventModel(Base):
+    """
+    Distributed mode: feed invalidations and dashboard events of every
+    process, tailed by API processes (backend.change_log).
+    """
+    __tablename__ = "tracker_events"
+    # Ids are never reused, even after the newest rows are purged; tailers resume after the last id they saw
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id = Column(Integer, primary_key=True)
+    origin = Column(String, nullable=False) # Process that wrote it; it already applied it locally
+    data = Column(JSON, nullable=False)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+
 # Pydantic Schemas
 class TrackerBase(BaseModel):
     name: str
@@ -36,6 +188,22 @@ class TrackerBase(BaseModel):
 class TrackerCreate(TrackerBase):
     pass
 
+class TrackerBulkUpdate(TrackerBase):
+    id: int
+
+class TrackerIds(BaseModel):
+    ids: List[int]
+
+class BulkResult(BaseModel):
+    ids: List[int] = [] # Trackers created, updated, deleted or submitted
+    missing: List[int] = [] # Requested ids that don't exist
+    results: Dict[str, int] = {} # Bulk run: submissions by outcome (queued, coalesced, running, ...)
+
+class TrackerImportResult(BaseModel):
+    created: int
+    ids: List[int]
+    errors: List[Dict[str, Any]] # {"line": n, "detail": "..."} of skipped lines
+
 class Tracker(TrackerBase):
     id: int
     last_run_status: Optional[str] = None
@@ -46,3 +214,93 @@ class Tracker(TrackerBase):
 
     class Config:
         orm_mode = True
+
+class TrackerSummary(BaseModel):
+    """Tracker without config and logs, for dashboards."""
+    id: int
+    name: str
+    description: Optional[str] = None
+    schedule_cron: Optional[str] = None
+    last_run_status: Optional[str] = None
+    last_run_at: Optional[datetime] = None
+    last_run_info: Optional[Dict[str, Any]] = None
+    is_active: bool = True
+    created_at: datetime
+
+    class Config:
+        orm_mode = True
+
+class TrackerRun(BaseModel):
+    id: int
+    tracker_id: int
+    status: str
+    status_changed: bool = False
+    started_at: datetime
+    finished_at: Optional[datetime] = None
+    duration_ms: Optional[int] = None
+
+    class Config:
+        orm_mode = True
+
+class TrackerRunDetail(TrackerRun):
+    logs: Optional[str] = None
+    run_info: Optional[Dict[str, Any]] = None
+
+class TrackerRunAggregate(BaseModel):
+    tracker_id: int
+    granularity: str
+    bucket_start: datetime
+    runs: int
+    successes: int
+    failures: int
+    total_duration_ms: int
+
+    class Config:
+        orm_mode = True
+
+class TrackerContentChange(BaseModel):
+    id: int
+    key: str
+    run_id: Optional[int] = None
+    fingerprint: str
+    created_at: datetime
+    diff: Optional[str] = None
+
+class TrackerScreenshot(BaseModel):
+    id: int
+    run_id: Optional[int] = None
+    hash: str
+    format: str
+    size: int
+    selector: Optional[str] = None
+    created_at: datetime
+
+    class Config:
+        orm_mode = True
+
+class BrowserProfileCreate(BaseModel):
+    name: str
+    persistent: bool = False # Keep a full browser profile (HTTP cache) and a warm context
+
+class BrowserProfile(BaseModel):
+    name: str
+    persistent: bool = False
+    cookies: int = 0
+    snapshots: List[str] = []
+    created_at: Optional[str] = None
+
+class Notification(BaseModel):
+    id: int
+    tracker_id: int
+    run_id: Optional[int] = None
+    destination: str
+    message: str
+    status: str
+    attempts: int
+    next_attempt_at: datetime
+    last_error: Optional[str] = None
+    created_at: datetime
+    sent_at: Optional[datetime] = None
+
+    class Config:
+        orm_mode = True
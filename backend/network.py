@@ -0,0 +1,78 @@
+import asyncio
+import os
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Pattern, Tuple
+
+# Requests kept for patterns that are only known at run time (templated regexes)
+NETWORK_BUFFER_SIZE = int(os.environ.get("TRACKER_NETWORK_BUFFER_SIZE", "500"))
+
+
+class CapturedRequest:
+    __slots__ = ("url", "method", "headers")
+
+    def __init__(self, url: str, method: str, headers: Optional[Dict[str, str]] = None):
+        self.url = url
+        self.method = method
+        self.headers = headers
+
+    def to_dict(self) -> Dict:
+        data = {"url": self.url, "method": self.method}
+        if self.headers is not None:
+            data["headers"] = self.headers
+        return data
+
+
+class NetworkCapture:
+    """
+    Matches page requests against capture patterns as they arrive. Patterns
+    known up front are tested until their first match and then dropped, so a
+    busy page costs one regex test per outstanding pattern per request. A
+    bounded ring buffer of recent requests serves patterns only known at run
+    time.
+    """
+
+    def __init__(self, patterns: Iterable[Pattern] = (), buffer_size: int = NETWORK_BUFFER_SIZE, retain_headers: bool = False):
+        self.retain_headers = retain_headers
+        self.total = 0
+        self.buffer: deque = deque(maxlen=max(0, buffer_size))
+        self._pending: List[Pattern] = list({p.pattern: p for p in patterns}.values())
+        self._matches: Dict[str, CapturedRequest] = {}
+        self._waiters: List[Tuple[Pattern, asyncio.Future]] = []
+
+    def on_request(self, request):
+        self.total += 1
+        entry = CapturedRequest(request.url, request.method, request.headers if self.retain_headers else None)
+        if self.buffer.maxlen:
+            self.buffer.append(entry)
+        if self._pending:
+            for pattern in list(self._pending):
+                if pattern.search(entry.url):
+                    self._matches[pattern.pattern] = entry
+                    self._pending.remove(pattern)
+        if self._waiters:
+            for pattern, future in self._waiters:
+                if not future.done() and pattern.search(entry.url):
+                    future.set_result(entry)
+
+    def find(self, pattern: Pattern) -> Optional[CapturedRequest]:
+        match = self._matches.get(pattern.pattern)
+        if match is not None:
+            return match
+        for entry in self.buffer:
+            if pattern.search(entry.url):
+                return entry
+        return None
+
+    async def wait_for(self, pattern: Pattern, timeout: float) -> Optional[CapturedRequest]:
+        """Resolves as soon as a matching request was seen, or None after `timeout` seconds."""
+        match = self.find(pattern)
+        if match is not None:
+            return match
+        waiter = (pattern, asyncio.get_running_loop().create_future())
+        self._waiters.append(waiter)
+        try:
+            return await asyncio.wait_for(waiter[1], timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            self._waiters.remove(waiter)
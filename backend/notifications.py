@@ -0,0 +1,319 @@
+"""
+Webhook notifications. send_notification steps only collect messages; the
+runner writes them to the notification_outbox table together with the run
+result, and the Dispatcher delivers them in the background over the shared
+HTTP pool: rate limited per destination, several messages to one
+destination combined into a digest, failures retried with exponential
+backoff. Rows are claimed with a lease, so API and worker processes can all
+run a dispatcher.
+"""
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from backend import async_db, http_client, metrics, models
+
+logger = logging.getLogger(__name__)
+
+# Requests per minute to one destination that isn't Discord or Slack
+RATE_PER_MINUTE = float(os.environ.get("TRACKER_NOTIFY_RATE_PER_MINUTE", "30"))
+# This many messages due for one destination at once are sent as a digest
+DIGEST_MIN = int(os.environ.get("TRACKER_NOTIFY_DIGEST_MIN", "3"))
+# After a wake-up the dispatcher waits this long so a burst of runs lands in one digest
+DIGEST_WINDOW = float(os.environ.get("TRACKER_NOTIFY_DIGEST_WINDOW", "2"))
+MAX_ATTEMPTS = int(os.environ.get("TRACKER_NOTIFY_MAX_ATTEMPTS", "6"))
+RETRY_BASE_SECONDS = float(os.environ.get("TRACKER_NOTIFY_RETRY_BASE", "5"))
+RETRY_MAX_SECONDS = float(os.environ.get("TRACKER_NOTIFY_RETRY_MAX", "3600"))
+POLL_INTERVAL = float(os.environ.get("TRACKER_NOTIFY_POLL_SECONDS", "5"))
+RETENTION_DAYS = int(os.environ.get("TRACKER_NOTIFY_RETENTION_DAYS", "7"))
+LEASE_SECONDS = 120
+CLAIM_BATCH = 200
+
+# platform -> (requests, per seconds, max message length)
+PLATFORMS: Dict[str, Tuple[float, float, int]] = {
+    "discord": (5, 2.0, 2000), # Discord webhooks: 5 requests per 2 seconds
+    "slack": (1, 1.0, 40000), # Slack incoming webhooks: about one message per second
+    "generic": (RATE_PER_MINUTE / 60, 1.0, 100000),
+}
+
+# (url, JSON payload) -> (HTTP status, lower-cased headers)
+Sender = Callable[[str, Dict[str, Any]], Awaitable[Tuple[int, Dict[str, str]]]]
+
+SENT = metrics.Counter("tracker_notifications_total", "Notification deliveries by outcome.", ("result",))
+DELIVERY_SECONDS = metrics.Histogram("tracker_notification_delivery_seconds", "Time from enqueue to successful delivery.",
+                                     buckets=(1, 2.5, 5, 10, 30, 60, 300, 900, 3600))
+
+
+def platform(url: str) -> str:
+    host = urlsplit(url).hostname or ""
+    if host.endswith(("discord.com", "discordapp.com")):
+        return "discord"
+    if host == "hooks.slack.com":
+        return "slack"
+    return "generic"
+
+
+def redact(url: str) -> str:
+    """Webhook URLs embed their secret; logs and run_info only show the host."""
+    return urlsplit(url).hostname or "webhook"
+
+
+def payload(kind: str, text: str, items: List[Dict[str, Any]]) -> Dict[str, Any]:
+    if kind == "discord":
+        return {"content": text}
+    if kind == "slack":
+        return {"text": text}
+    return {"text": text, "notifications": items}
+
+
+def _backoff(attempts: int) -> float:
+    delay = min(RETRY_BASE_SECONDS * 2 ** max(0, attempts - 1), RETRY_MAX_SECONDS)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def claim(db: Session, owner: str, limit: int = CLAIM_BATCH) -> list:
+    """Leases due rows (pending, or sending with an expired lease) to `owner`."""
+    N = models.NotificationModel
+    now = datetime.utcnow()
+    due = db.query(N.id).filter(
+        ((N.status == "pending") & (N.next_attempt_at <= now)) | ((N.status == "sending") & (N.lease_expires_at < now))
+    ).order_by(N.id).limit(limit)
+    expires = now + timedelta(seconds=LEASE_SECONDS)
+    # One statement, so concurrent dispatchers never lease the same row
+    db.execute(update(N).where(N.id.in_(due.scalar_subquery())).values(
+        status="sending", lease_owner=owner, lease_expires_at=expires, attempts=N.attempts + 1,
+    ).execution_options(synchronize_session=False))
+    return db.query(N.id, N.tracker_id, N.run_id, N.destination, N.message, N.attempts, N.created_at).filter(
+        N.status == "sending", N.lease_owner == owner, N.lease_expires_at == expires,
+    ).order_by(N.id).all()
+
+
+def finish(db: Session, owner: str, sent: List[int], retry: Dict[int, float], released: Dict[int, float],
+           failed: Dict[int, str], errors: Dict[int, str]):
+    """
+    Records delivery outcomes of leased rows: sent ids, retry id -> delay
+    seconds, released (not tried, the claim's attempt doesn't count) id ->
+    delay seconds, failed id -> error.
+    """
+    N = models.NotificationModel
+    now = datetime.utcnow()
+    mine = (N.lease_owner == owner) & (N.status == "sending")
+    if sent:
+        db.execute(update(N).where(N.id.in_(sent), mine).values(status="sent", sent_at=now, lease_owner=None, last_error=None)
+                   .execution_options(synchronize_session=False))
+    for row_id, delay in retry.items():
+        db.execute(update(N).where(N.id == row_id, mine).values(
+            status="pending", lease_owner=None, next_attempt_at=now + timedelta(seconds=delay), last_error=errors.get(row_id),
+        ).execution_options(synchronize_session=False))
+    for row_id, delay in released.items():
+        db.execute(update(N).where(N.id == row_id, mine).values(
+            status="pending", lease_owner=None, next_attempt_at=now + timedelta(seconds=delay), attempts=N.attempts - 1,
+        ).execution_options(synchronize_session=False))
+    for row_id, error in failed.items():
+        db.execute(update(N).where(N.id == row_id, mine).values(status="failed", lease_owner=None, last_error=error)
+                   .execution_options(synchronize_session=False))
+
+
+def purge(db: Session, days: int = RETENTION_DAYS) -> int:
+    N = models.NotificationModel
+    return db.query(N).filter(N.status.in_(("sent", "failed")), N.created_at < datetime.utcnow() - timedelta(days=days)).delete(synchronize_session=False)
+
+
+class RateLimiter:
+    """Token bucket: `requests` per `per` seconds, bursts up to `requests`."""
+
+    def __init__(self, requests: float, per: float):
+        self.capacity = max(1.0, requests)
+        self.rate = requests / per
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    await asyncio.sleep(self.blocked_until - now)
+                    continue
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def block(self, seconds: float):
+        """The destination answered 429; send nothing for `seconds`."""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+async def http_sender(url: str, body: Dict[str, Any]) -> Tuple[int, Dict[str, str]]:
+    response = await http_client.request("POST", url, content=json.dumps(body),
+                                         headers={"Content-Type": "application/json"}, conditional=False)
+    return response.status_code, response.headers
+
+
+def _retry_after(headers: Dict[str, str]) -> Optional[float]:
+    value = headers.get("retry-after")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class Dispatcher:
+    def __init__(self, sender: Sender = http_sender, owner: Optional[str] = None, poll_interval: float = POLL_INTERVAL,
+                 digest_window: float = DIGEST_WINDOW, digest_min: int = DIGEST_MIN):
+        self.sender = sender
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.poll_interval = poll_interval
+        self.digest_window = digest_window
+        self.digest_min = max(2, digest_min)
+        self._limiters: Dict[str, RateLimiter] = {}
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._next_retry = float("inf") # monotonic time of the earliest retry scheduled here
+        self.requests = 0
+        self.digests = 0
+
+    def start(self):
+        if self._task is None:
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    def wake(self):
+        """New rows were queued in this process; deliver after the digest window instead of the next poll."""
+        if self._wake is not None:
+            self._wake.set()
+
+    async def _loop(self):
+        last_purge = 0.0
+        while True:
+            # Retries this process scheduled are picked up on time, others by polling
+            timeout = min(self.poll_interval, max(0.0, self._next_retry - time.monotonic()))
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+                await asyncio.sleep(self.digest_window)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            if self._next_retry <= time.monotonic():
+                self._next_retry = float("inf") # Due now, claimed below
+            try:
+                await self.dispatch_due()
+                if time.monotonic() - last_purge > 3600:
+                    await async_db.writer.write(purge)
+                    last_purge = time.monotonic()
+            except Exception as e:
+                logger.error(f"Notification dispatch failed: {e}")
+
+    async def dispatch_due(self) -> int:
+        """Delivers everything that is due; returns the number of rows handled."""
+        handled = 0
+        while True:
+            rows = await async_db.writer.write(lambda db: claim(db, self.owner))
+            if not rows:
+                return handled
+            by_destination: Dict[str, List[Any]] = {}
+            for row in rows:
+                by_destination.setdefault(row.destination, []).append(row)
+            await asyncio.gather(*(self._deliver(destination, batch) for destination, batch in by_destination.items()))
+            handled += len(rows)
+
+    def _limiter(self, destination: str) -> RateLimiter:
+        limiter = self._limiters.get(destination)
+        if limiter is None:
+            requests, per, _ = PLATFORMS[platform(destination)]
+            limiter = self._limiters[destination] = RateLimiter(requests, per)
+        return limiter
+
+    def _messages(self, kind: str, rows: list) -> List[Tuple[str, List[Any]]]:
+        """(text, rows it covers): one per row, or digests split to the platform's length limit."""
+        if len(rows) < self.digest_min:
+            return [(row.message, [row]) for row in rows]
+        max_length = PLATFORMS[kind][2]
+        messages, lines, covered = [], [], []
+        for row in rows:
+            line = f"• {row.message}"[:max_length - 40]
+            if lines and sum(len(l) + 1 for l in lines) + len(line) + 40 > max_length:
+                messages.append((lines, covered))
+                lines, covered = [], []
+            lines.append(line)
+            covered.append(row)
+        messages.append((lines, covered))
+        return [(f"{len(covered)} tracker updates:\n" + "\n".join(lines), covered) for lines, covered in messages]
+
+    async def _deliver(self, destination: str, rows: list):
+        kind = platform(destination)
+        limiter = self._limiter(destination)
+        sent, retry, released, failed, errors = [], {}, {}, {}, {}
+        messages = self._messages(kind, rows)
+        for index, (text, covered) in enumerate(messages):
+            items = [{"tracker_id": row.tracker_id, "run_id": row.run_id, "message": row.message,
+                      "created_at": row.created_at.isoformat()} for row in covered]
+            await limiter.acquire()
+            self.requests += 1
+            try:
+                status, headers = await self.sender(destination, payload(kind, text, items))
+                error = None if 200 <= status < 300 else f"HTTP {status}"
+            except Exception as e:
+                status, headers, error = None, {}, f"{type(e).__name__}: {e}"[:300]
+
+            if error is None:
+                sent.extend(row.id for row in covered)
+                self.digests += len(covered) > 1
+                continue
+            if status is not None and 400 <= status < 500 and status not in (408, 429):
+                # Bad URL or payload, retrying won't help
+                failed.update((row.id, error) for row in covered)
+                continue
+            # Rate limited or the destination is down: retry this message later and
+            # hold back the rest for as long, without counting an attempt for them
+            wait = _retry_after(headers) if status == 429 else None
+            if wait is not None:
+                limiter.block(wait)
+            delay = max(_backoff(max(row.attempts for row in covered)), wait or 0)
+            for row in covered:
+                if row.attempts >= MAX_ATTEMPTS:
+                    failed[row.id] = error
+                else:
+                    retry[row.id] = delay
+                    errors[row.id] = error
+            for _, later in messages[index + 1:]:
+                released.update((row.id, delay) for row in later)
+            logger.warning(f"Notification delivery to {redact(destination)} failed ({error}), retrying in {delay:.0f}s")
+            break
+
+        await async_db.writer.write(lambda db: finish(db, self.owner, sent, retry, released, failed, errors))
+        if retry:
+            # After the write: next_attempt_at is counted from when the row was updated
+            self._next_retry = min(self._next_retry, time.monotonic() + min(retry.values()))
+        now = datetime.utcnow()
+        delivered = set(sent)
+        for row in rows:
+            if row.id in delivered:
+                DELIVERY_SECONDS.observe((now - row.created_at).total_seconds())
+        SENT.inc("sent", amount=len(sent))
+        SENT.inc("retried", amount=len(retry))
+        SENT.inc("deferred", amount=len(released))
+        SENT.inc("failed", amount=len(failed))
+
+
+dispatcher = Dispatcher()
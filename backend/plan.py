@@ -0,0 +1,940 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import string
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Pattern, Type
+from urllib.parse import urlsplit
+from backend import content_diff, http_client, interception, metrics, network, profiles, screenshots
+
+# Compiled plans are shared by every run of the same config version
+PLAN_CACHE_SIZE = 512
+
+_MISSING = object()
+_formatter = string.Formatter()
+_CACHEABLE_TYPES = (str, int, float, bool, type(None))
+
+
+class PlanError(ValueError):
+    """Raised when a tracker config can't be compiled into a plan."""
+
+
+class Template:
+    """
+    A step field that may reference run variables using str.format syntax.
+    The referenced variable names are parsed once; rendering is skipped when
+    none of them changed since the last render.
+    """
+    __slots__ = ("source", "names", "_key", "_value")
+
+    def __init__(self, source: Any, field: str = "value"):
+        self.source = source
+        self.names: tuple = ()
+        self._key = None
+        self._value = None
+        if isinstance(source, str):
+            try:
+                names = []
+                for _, name, _, _ in _formatter.parse(source):
+                    if name is None:
+                        continue
+                    root = re.split(r"[.\[]", name, 1)[0]
+                    if root == "" or root.isdigit():
+                        raise PlanError(f"Field '{field}' uses a positional placeholder, use {{variable}} instead")
+                    names.append(root)
+            except ValueError as e:
+                if isinstance(e, PlanError):
+                    raise
+                raise PlanError(f"Field '{field}' is not a valid template: {e}")
+            self.names = tuple(dict.fromkeys(names))
+
+    @property
+    def is_constant(self) -> bool:
+        return not self.names
+
+    def render(self, variables: Dict[str, Any]) -> Any:
+        if not self.names:
+            return self.source
+        key = tuple(variables.get(name, _MISSING) for name in self.names)
+        if self._key is not None and key == self._key:
+            return self._value
+        if _MISSING in key:
+            # Same as str.format raising KeyError: keep the raw value
+            value = self.source
+        else:
+            try:
+                value = self.source.format(**variables)
+            except KeyError:
+                value = self.source
+        # Only cache on immutable inputs, a mutated dict would compare equal to itself
+        if all(isinstance(v, _CACHEABLE_TYPES) for v in key):
+            self._key, self._value = key, value
+        return value
+
+
+class RegexTemplate:
+    """A template whose rendered value is a regex, compiled once when constant."""
+
+    def __init__(self, source: Any, field: str = "regex"):
+        try:
+            self.template = Template(source, field)
+        except PlanError:
+            # Quantifiers like \d{3} aren't placeholders, use the regex as-is
+            self.template = Template(None, field)
+            self.template.source = source
+        self.pattern: Optional[Pattern] = None
+        if source is not None and self.template.is_constant:
+            try:
+                self.pattern = re.compile(source)
+            except re.error as e:
+                raise PlanError(f"Field '{field}' is not a valid regex: {e}")
+
+    def render(self, variables: Dict[str, Any]) -> Optional[Pattern]:
+        """Returns the compiled regex, or None when the field is empty."""
+        if self.pattern is not None:
+            return self.pattern if self.template.source else None
+        source = self.template.render(variables)
+        # re keeps its own cache of compiled patterns for dynamic regexes
+        return re.compile(source) if source else None
+
+
+# Characters of context around a grep match kept in run_info
+SNIPPET_RADIUS = 40
+
+# Finds strings in the page's innerText and, for those it doesn't contain, in
+# its HTML (what grep used to search), so only offsets and snippets are sent back
+_FIND_IN_PAGE_JS = """([needles, radius]) => {
+    const text = document.body ? document.body.innerText : '';
+    let html = null;
+    return needles.map(needle => {
+        let source = 'text', offset = text.indexOf(needle), haystack = text;
+        if (offset < 0) {
+            if (html === null) html = document.documentElement.outerHTML;
+            source = 'html'; offset = html.indexOf(needle); haystack = html;
+        }
+        if (offset < 0) return null;
+        return {source, offset, snippet: haystack.slice(Math.max(0, offset - radius), offset + needle.length + radius)};
+    });
+}"""
+
+
+def _match(source: str, haystack: str, start: int, end: int) -> Dict[str, Any]:
+    return {"source": source, "offset": start,
+            "snippet": haystack[max(0, start - SNIPPET_RADIUS):end + SNIPPET_RADIUS]}
+
+
+class PageSnapshots:
+    """
+    Text and HTML read from the page, kept until a step that can change the
+    page runs or the page navigates, so consecutive checks don't serialize
+    the DOM again.
+    """
+
+    def __init__(self, page):
+        self.page = page
+        self._text: Dict[str, str] = {}
+        self._html: Optional[str] = None
+        if page is not None:
+            # Redirects and client-side navigation between two reads
+            page.on("framenavigated", lambda frame: self.clear())
+
+    def clear(self):
+        self._text.clear()
+        self._html = None
+
+    async def text(self, selector: str) -> str:
+        text = self._text.get(selector)
+        if text is None:
+            text = self._text[selector] = await self.page.inner_text(selector)
+        return text
+
+    async def html(self) -> str:
+        if self._html is None:
+            self._html = await self.page.content()
+        return self._html
+
+    async def find(self, needles: List[str], selector: str = "body") -> List[Optional[Dict[str, Any]]]:
+        """Match (source, offset, snippet) of each string in the element's text, None where missing."""
+        cached = selector != "body" or ("body" in self._text and all(needle in self._text["body"] for needle in needles))
+        if not cached:
+            return await self.page.evaluate(_FIND_IN_PAGE_JS, [needles, SNIPPET_RADIUS])
+        text = await self.text(selector)
+        offsets = [text.find(needle) for needle in needles]
+        return [_match("text", text, i, i + len(needle)) if i >= 0 else None for needle, i in zip(needles, offsets)]
+
+    async def search(self, pattern: Pattern, selector: str = "body") -> Optional[Dict[str, Any]]:
+        """First match of a regex in the element's text; for body also in the HTML when the text has none."""
+        text = await self.text(selector)
+        found = pattern.search(text)
+        if found:
+            return _match("text", text, found.start(), found.end())
+        if selector == "body":
+            html = await self.html()
+            found = pattern.search(html)
+            if found:
+                return _match("html", html, found.start(), found.end())
+        return None
+
+
+class RunContext:
+    """Per-run state handed to every step."""
+
+    def __init__(self, page, logger, run_info: Dict[str, Any], network_capture: "network.NetworkCapture",
+                 content: Optional[content_diff.ContentWatch] = None, profile: Optional["profiles.Profile"] = None):
+        self.page = page
+        self.logger = logger
+        self.run_info = run_info
+        self.network = network_capture
+        self.snapshots = PageSnapshots(page)
+        self.content = content if content is not None else content_diff.ContentWatch()
+        self.profile = profile # Checked-out browser context profile, if the tracker uses one
+        self.variables: Dict[str, Any] = {} # Execution Context
+        self.timings = metrics.StepTimings()
+        # Messages of send_notification steps, queued in the outbox with the run result
+        self.notifications: List[Dict[str, str]] = []
+        # Cookies set by http_request responses, sent with the run's later requests
+        self.http_cookies = None
+        # Attaches run-wide listeners (network capture, request routing) to extra pages
+        self.page_setup: Optional[Callable[[Any], Awaitable[None]]] = None
+
+    async def new_page(self):
+        """Opens another page in the run's browser context, set up like the main one."""
+        page = await self.page.context.new_page()
+        if self.page_setup is not None:
+            await self.page_setup(page)
+        return page
+
+    def branch(self, page, label: str) -> "RunContext":
+        """Context for a parallel branch: own page and a copy of the variables, everything else shared."""
+        child = RunContext(page, _PrefixedLogger(self.logger, f"[{label}] "), self.run_info, self.network, self.content, self.profile)
+        child.variables = dict(self.variables)
+        child.timings = self.timings
+        child.notifications = self.notifications
+        child.http_cookies = self.http_cookies
+        child.page_setup = self.page_setup
+        return child
+
+
+class _PrefixedLogger:
+    def __init__(self, logger, prefix: str):
+        self.logger = logger
+        self.prefix = prefix
+
+    def info(self, message: str):
+        self.logger.info(f"{self.prefix}{message}")
+
+    def warning(self, message: str):
+        self.logger.warning(f"{self.prefix}{message}")
+
+    def error(self, message: str):
+        self.logger.error(f"{self.prefix}{message}")
+
+
+class Step:
+    action: str = ""
+    needs_browser = True
+    # Steps that only read the page keep the run's page snapshots valid
+    changes_page = True
+
+    def __init__(self, spec: Dict[str, Any]):
+        self.spec = spec
+
+    def template(self, key: str, default: Any = None) -> Template:
+        return Template(self.spec.get(key, default), key)
+
+    def number(self, key: str, default: Any = None, cast: Callable = float):
+        value = self.spec.get(key, default)
+        try:
+            return cast(value)
+        except (TypeError, ValueError):
+            raise PlanError(f"'{key}' must be a number, got {value!r}")
+
+    async def run(self, ctx: RunContext):
+        raise NotImplementedError
+
+    def children(self) -> List["Step"]:
+        """Nested steps of control-flow blocks."""
+        return []
+
+
+async def run_steps(steps: List[Step], ctx: RunContext):
+    for step in steps:
+        ctx.logger.info(f"Executing step: {step.action}")
+        start = time.perf_counter()
+        try:
+            await step.run(ctx)
+        finally:
+            ctx.timings.record(step.action, time.perf_counter() - start)
+            if step.changes_page:
+                ctx.snapshots.clear()
+
+
+def walk(steps: List[Step]):
+    """All steps including those nested in blocks, in config order."""
+    for step in steps:
+        yield step
+        yield from walk(step.children())
+
+
+ACTIONS: Dict[str, Type[Step]] = {}
+
+
+def action(name: str):
+    def register(cls: Type[Step]) -> Type[Step]:
+        cls.action = name
+        ACTIONS[name] = cls
+        return cls
+    return register
+
+
+@action("open")
+class OpenStep(Step):
+    def __init__(self, spec):
+        super().__init__(spec)
+        self.url = self.template("url")
+        self.headless = bool(spec["headless"]) if "headless" in spec else None
+        # Named browser context profile (cookies, storage, cache) the run uses
+        self.context = spec.get("context") or None
+        if self.context is not None:
+            try:
+                profiles._validate_name(self.context)
+            except profiles.ProfileError as e:
+                raise PlanError(f"'context': {e}")
+
+    async def run(self, ctx):
+        url = self.url.render(ctx.variables)
+        if url:
+            await ctx.page.goto(url)
+            ctx.logger.info(f"Opened {url}")
+
+
+@action("wait")
+class WaitStep(Step):
+    needs_browser = False
+
+    def __init__(self, spec):
+        super().__init__(spec)
+        self.seconds = self.number("seconds", 1)
+
+    async def run(self, ctx):
+        await asyncio.sleep(self.seconds)
+        ctx.logger.info(f"Waited {self.seconds}s")
+
+
+@action("screenshot")
+class ScreenshotStep(Step):
+    """
+    Captures the page, or the element matching `selector`, into the
+    screenshot store. `format` is png or jpeg (`quality` 1-100, smaller and
+    faster to encode); `full_page` captures the whole scrollable page. With
+    `path` a copy is also written there.
+    """
+    changes_page = False
+
+    def __init__(self, spec):
+        super().__init__(spec)
+        self.path = self.template("path")
+        self.selector = self.template("selector")
+        self.format = str(spec.get("format") or "png").lower().replace("jpg", "jpeg")
+        if self.format not in screenshots.FORMATS:
+            raise PlanError(f"'format' must be one of {', '.join(screenshots.FORMATS)}, got {spec.get('format')!r}")
+        self.quality = self.number("quality", 80, int) if self.format == "jpeg" else None
+        self.full_page = bool(spec.get("full_page", False))
+
+    async def run(self, ctx):
+        options = {"type": self.format}
+        if self.quality is not None:
+            options["quality"] = self.quality
+        selector = self.selector.render(ctx.variables)
+        if selector:
+            data = await ctx.page.locator(selector).screenshot(**options)
+        else:
+            data = await ctx.page.screenshot(full_page=self.full_page, **options)
+        # Hashing, the thumbnail and file writes stay off the event loop
+        shot = await asyncio.to_thread(screenshots.store.put, data, self.format)
+        ctx.run_info.setdefault("screenshots", []).append({
+            "hash": shot["hash"], "format": self.format, "size": shot["size"], "selector": selector or None,
+        })
+        path = self.path.render(ctx.variables)
+        if path:
+            await asyncio.to_thread(_write_file, path, data)
+        ctx.logger.info(f"Screenshot {shot['hash'][:12]} ({shot['size']} bytes{', unchanged' if shot['deduplicated'] else ''})"
+                        + (f" saved to {path}" if path else ""))
+
+
+def _write_file(path: str, data: bytes):
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+@action("click")
+class ClickStep(Step):
+    def __init__(self, spec):
+        super().__init__(spec)
+        self.selector = self.template("selector")
+
+    async def run(self, ctx):
+        selector = self.selector.render(ctx.variables)
+        if selector:
+            await ctx.page.click(selector)
+            ctx.logger.info(f"Clicked {selector}")
+
+
+@action("type")
+class TypeStep(Step):
+    def __init__(self, spec):
+        super().__init__(spec)
+        self.selector = self.template("selector")
+        self.text = self.template("text")
+
+    async def run(self, ctx):
+        selector = self.selector.render(ctx.variables)
+        text = self.text.render(ctx.variables)
+        if selector and text:
+            await ctx.page.fill(selector, text)
+            ctx.logger.info(f"Typed into {selector}")
+
+
+@action("press_key")
+class PressKeyStep(Step):
+    def __init__(self, spec):
+        super().__init__(spec)
+        self.key = self.template("key")
+
+    async def run(self, ctx):
+        key = self.key.render(ctx.variables)
+        if key:
+            await ctx.page.keyboard.press(key)
+            ctx.logger.info(f"Pressed key: {key}")
+
+
+@action("scroll")
+class ScrollStep(Step):
+    def __init__(self, spec):
+        super().__init__(spec)
+        self.selector = self.template("selector")
+
+    async def run(self, ctx):
+        selector = self.selector.render(ctx.variables)
+        if selector:
+            await ctx.page.locator(selector).scroll_into_view_if_needed()
+            ctx.logger.info(f"Scrolled to {selector}")
+
+
+@action("grep")
+class GrepStep(Step):
+    changes_page = False
+
+    def __init__(self, spec):
+        super().__init__(spec)
+        self.text = self.template("text")
+        self.selector = self.template("selector", "body")
+
+    async def run(self, ctx):
+        text = self.text.render(ctx.variables)
+        selector = self.selector.render(ctx.variables)
+        if text:
+            match, = await ctx.snapshots.find([text], selector)
+            if match is None:
+                raise Exception(f"Grep failed: '{text}' not found in {selector}")
+            ctx.logger.info(f"Grep success: Found '{text}'")
+            ctx.run_info["grep_matches"].append({"text": text, "found": True, **match})
+
+
+@action("grep_regex")
+class GrepRegexStep(Step):
+    changes_page = False
+
+    def __init__(self, spec):
+        super().__init__(spec)
+        self.regex = RegexTemplate(spec.get("regex"))
+        self.selector = self.template("selector", "body")
+
+    async def run(self, ctx):
+        pattern = self.regex.render(ctx.variables)
+        selector = self.selector.render(ctx.variables)
+        if pattern:
+            match = await ctx.snapshots.search(pattern, selector)
+            if match is None:
+                raise Exception(f"Grep Regex failed: '{pattern.pattern}' not found")
+            ctx.logger.info(f"Grep Regex success: Found pattern")
+            ctx.run_info["grep_matches"].append({"regex": pattern.pattern, "found": True, **match})
+
+
+@action("grep_many")
+class GrepManyStep(Step):
+    """
+    Checks several strings and regexes against one read of the page.
+    `patterns` is a list of strings or {"text": ...} / {"regex": ...};
+    `mode` 'all' (default) fails when any is missing, 'any' when none is
+    found. With `variable` the names of the found patterns are stored there.
+    """
+    changes_page = False
+
+    def __init__(self, spec):
+        super().__init__(spec)
+        patterns = spec.get("patterns")
+        if isinstance(patterns, str):
+            # From the editor: a JSON list, or one string per line
+            try:
+                patterns = json.loads(patterns)
+            except ValueError:
+                patterns = [line for line in patterns.splitlines() if line.strip()]
+        if not isinstance(patterns, list) or not patterns:
+            raise PlanError("'patterns' must be a non-empty list")
+        self.texts: List[Template] = []
+        self.regexes: List[RegexTemplate] = []
+        for index, pattern in enumerate(patterns):
+            if isinstance(pattern, str):
+                pattern = {"text": pattern}
+            if not isinstance(pattern, dict) or ("text" in pattern) == ("regex" in pattern):
+                raise PlanError(f"'patterns' item {index + 1} must be a string, {{\"text\": ...}} or {{\"regex\": ...}}")
+            if "text" in pattern:
+                self.texts.append(Template(pattern["text"], "text"))
+            else:
+                self.regexes.append(RegexTemplate(pattern["regex"], "regex"))
+        self.mode = spec.get("mode", "all")
+        if self.mode not in ("all", "any"):
+            raise PlanError(f"'mode' must be 'all' or 'any', got {self.mode!r}")
+        self.selector = self.template("selector", "body")
+        self.variable = spec.get("variable")
+
+    async def run(self, ctx):
+        selector = self.selector.render(ctx.variables) or "body"
+        texts = [text for text in (t.render(ctx.variables) for t in self.texts) if text]
+        regexes = [regex for regex in (r.render(ctx.variables) for r in self.regexes) if regex]
+        results = []
+        if texts:
+            for text, match in zip(texts, await ctx.snapshots.find(texts, selector)):
+                results.append(({"text": text}, match))
+        for regex in regexes:
+            results.append(({"regex": regex.pattern}, await ctx.snapshots.search(regex, selector)))
+
+        found = [pattern for pattern, match in results if match is not None]
+        missing = [pattern for pattern, match in results if match is None]
+        for pattern, match in results:
+            ctx.run_info["grep_matches"].append({**pattern, "found": match is not None, **(match or {})})
+        if self.variable:
+            ctx.variables[self.variable] = [pattern.get("text") or pattern.get("regex") for pattern in found]
+        if results and (missing if self.mode == "all" else not found):
+            names = ", ".join(repr(pattern.get("text") or pattern.get("regex")) for pattern in missing)
+            raise Exception(f"Grep failed: {names} not found in {selector}")
+        ctx.logger.info(f"Grep success: {len(found)} of {len(results)} patterns found")
+
+
+@action("watch_content")
+class WatchContentStep(Step):
+    """
+    Fingerprints the normalized text of `selector` and compares it with the
+    previous run. Sets the `content_changed` variable; runs where no watched
+    content changed skip notifications and don't update feeds.
+    """
+    changes_page = False
+
+    def __init__(self, spec):
+        super().__init__(spec)
+        self.selector = self.template("selector", "body")
+        self.key = self.template("key")
+        self.ignore = RegexTemplate(spec.get("ignore"), "ignore")
+
+    async def run(self, ctx):
+        selector = self.selector.render(ctx.variables) or "body"
+        key = self.key.render(ctx.variables) or selector
+        text = content_diff.normalize(await ctx.snapshots.text(selector), self.ignore.render(ctx.variables))
+        result = ctx.content.check(key, text)
+        ctx.variables["content_changed"] = ctx.content.changed
+        ctx.run_info.setdefault("content", {})[key] = {"fingerprint": result.fingerprint[:16], "changed": result.changed, "size": len(text)}
+        ctx.logger.info(f"Content of '{key}' {'changed' if result.changed else 'unchanged'} ({result.fingerprint[:12]})")
+
+
+@action("extract_text")
+class ExtractTextStep(Step):
+    changes_page = False
+
+    def __init__(self, spec):
+        super().__init__(spec)
+        self.selector = self.template("selector")
+        self.variable = spec.get("variable")
+
+    async def run(self, ctx):
+        selector = self.selector.render(ctx.variables)
+        if selector and self.variable:
+            extracted = await ctx.snapshots.text(selector)
+            ctx.variables[self.variable] = extracted
+            ctx.logger.info(f"Extracted '{extracted}' to variable '{self.variable}'")
+
+
+@action("execute_js")
+class ExecuteJsStep(Step):
+    def __init__(self, spec):
+        super().__init__(spec)
+        self.script = self.template("script")
+        self.variable = spec.get("variable")
+
+    async def run(self, ctx):
+        script = self.script.render(ctx.variables)
+        result = await ctx.page.evaluate(script)
+        ctx.logger.info(f"Executed JS. Result: {result}")
+        if self.variable:
+            ctx.variables[self.variable] = result
+
+
+@action("refresh")
+class RefreshStep(Step):
+    async def run(self, ctx):
+        await ctx.page.reload()
+        ctx.logger.info("Refreshed page")
+
+
+@action("wait_network_idle")
+class WaitNetworkIdleStep(Step):
+    async def run(self, ctx):
+        await ctx.page.wait_for_load_state("networkidle")
+        ctx.logger.info("Waited for network idle")
+
+
+@action("clear_cookies")
+class ClearCookiesStep(Step):
+    async def run(self, ctx):
+        await ctx.page.context.clear_cookies()
+        ctx.logger.info("Cleared cookies")
+
+
+class CookieSnapshotStep(Step):
+    def __init__(self, spec):
+        super().__init__(spec)
+        self.snapshot = spec.get("snapshot") or spec.get("name")
+        try:
+            profiles._validate_name(self.snapshot, "Snapshot")
+        except profiles.ProfileError as e:
+            raise PlanError(f"'snapshot': {e}")
+
+
+@action("save_cookies")
+class SaveCookiesStep(CookieSnapshotStep):
+    changes_page = False
+
+    async def run(self, ctx):
+        state = await ctx.page.context.storage_state()
+        await asyncio.to_thread(ctx.profile.save_snapshot, self.snapshot, state)
+        ctx.logger.info(f"Saved {len(state.get('cookies', []))} cookies to snapshot '{self.snapshot}'")
+
+
+@action("load_cookies")
+class LoadCookiesStep(CookieSnapshotStep):
+    async def run(self, ctx):
+        state = await asyncio.to_thread(ctx.profile.load_snapshot, self.snapshot)
+        cookies = state.get("cookies", [])
+        if cookies:
+            await ctx.page.context.add_cookies(cookies)
+        ctx.logger.info(f"Loaded {len(cookies)} cookies from snapshot '{self.snapshot}'")
+
+
+@action("set_header")
+class SetHeaderStep(Step):
+    changes_page = False
+
+    def __init__(self, spec):
+        super().__init__(spec)
+        self.key = self.template("key")
+        self.value = self.template("value")
+
+    async def run(self, ctx):
+        key = self.key.render(ctx.variables)
+        value = self.value.render(ctx.variables)
+        if key and value:
+            await ctx.page.set_extra_http_headers({key: value})
+            ctx.logger.info(f"Set header {key}")
+
+
+@action("block_resources")
+class BlockResourcesStep(Step):
+    """
+    Declares what the tracker's pages may skip loading. Applied to the page
+    before the first navigation, wherever the step appears; merged with the
+    global TRACKER_BLOCK_* policy unless "global" is false.
+    """
+    needs_browser = False
+    changes_page = False
+
+    def __init__(self, spec):
+        super().__init__(spec)
+        try:
+            self.policy = interception.InterceptionPolicy.build(
+                spec.get("types"), spec.get("patterns"), spec.get("presets"), bool(spec.get("cache_static", False)),
+            )
+        except ValueError as e:
+            raise PlanError(str(e))
+        self.use_global = bool(spec.get("global", True))
+
+    async def run(self, ctx):
+        ctx.logger.info("Resource blocking policy active")
+
+
+@action("http_request")
+class HttpRequestStep(Step):
+    needs_browser = False
+    changes_page = False
+
+    def __init__(self, spec):
+        super().__init__(spec)
+        self.method = spec.get("method") or "GET"
+        self.url = self.template("url")
+        self.body = self.template("body")
+        self.variable = spec.get("variable")
+        self.conditional = bool(spec.get("conditional", True))
+
+    async def run(self, ctx):
+        url = self.url.render(ctx.variables)
+        body = self.body.render(ctx.variables)
+        if ctx.http_cookies is None:
+            ctx.http_cookies = http_client.new_cookies()
+        response = await http_client.request(self.method, url, content=body, conditional=self.conditional,
+                                             cookies=ctx.http_cookies)
+        cached = " (not modified)" if response.from_cache else ""
+        ctx.logger.info(f"HTTP {self.method} {url} - Status: {response.status_code}{cached}")
+        if self.variable:
+            ctx.variables[self.variable] = response.text
+        ctx.variables["last_http_status"] = response.status_code
+        ctx.variables["last_http_body"] = response.text
+
+
+@action("expect_http_status")
+class ExpectHttpStatusStep(Step):
+    needs_browser = False
+    changes_page = False
+
+    def __init__(self, spec):
+        super().__init__(spec)
+        self.expected = self.number("status", cast=int)
+
+    async def run(self, ctx):
+        last_status = ctx.variables.get("last_http_status")
+        if last_status != self.expected:
+            raise Exception(f"Expected HTTP status {self.expected}, got {last_status}")
+        ctx.logger.info(f"Verified HTTP status {self.expected}")
+
+
+class NetworkMatchStep(Step):
+    def __init__(self, spec):
+        super().__init__(spec)
+        self.regex = RegexTemplate(spec.get("regex"))
+        self.retain_headers = bool(spec.get("headers", False))
+        self.variable = spec.get("variable")
+
+    def _store(self, ctx, request: network.CapturedRequest):
+        if self.variable:
+            ctx.variables[self.variable] = request.to_dict() if self.retain_headers else request.url
+
+
+@action("capture_network")
+class CaptureNetworkStep(NetworkMatchStep):
+    changes_page = False
+
+    async def run(self, ctx):
+        pattern = self.regex.render(ctx.variables)
+        if pattern is None:
+            raise Exception("Network request matching 'None' not found")
+        request = ctx.network.find(pattern)
+        if request is None:
+            raise Exception(f"Network request matching '{pattern.pattern}' not found")
+        self._store(ctx, request)
+        ctx.logger.info(f"Found network request matching '{pattern.pattern}'")
+
+
+@action("wait_for_network_match")
+class WaitForNetworkMatchStep(NetworkMatchStep):
+    def __init__(self, spec):
+        super().__init__(spec)
+        self.timeout = self.number("timeout", 30)
+
+    async def run(self, ctx):
+        pattern = self.regex.render(ctx.variables)
+        if pattern is None:
+            raise Exception("wait_for_network_match needs a regex")
+        request = await ctx.network.wait_for(pattern, self.timeout)
+        if request is None:
+            raise Exception(f"No network request matching '{pattern.pattern}' within {self.timeout}s")
+        self._store(ctx, request)
+        ctx.logger.info(f"Matched network request {request.url}")
+
+
+# Webhook of send_notification steps that don't set a url
+NOTIFY_WEBHOOK_URL = os.environ.get("TRACKER_NOTIFY_WEBHOOK_URL") or None
+
+
+@action("send_notification")
+class SendNotificationStep(Step):
+    needs_browser = False
+    changes_page = False
+
+    def __init__(self, spec):
+        super().__init__(spec)
+        self.message = self.template("message")
+        self.url = self.template("url")
+
+    async def run(self, ctx):
+        if ctx.content.results and not ctx.content.changed:
+            ctx.logger.info("Notification skipped, watched content unchanged")
+            return
+        message = self.message.render(ctx.variables)
+        url = self.url.render(ctx.variables) or NOTIFY_WEBHOOK_URL
+        if not url:
+            ctx.logger.info(f"NOTIFICATION: {message}")
+            return
+        # Delivered in the background once the run is recorded; the run never waits on the webhook
+        ctx.notifications.append({"destination": url, "message": message})
+        # The URL embeds the webhook's secret, only its host goes to the log
+        ctx.logger.info(f"Notification queued for {urlsplit(url).hostname}: {message}")
+
+
+# Branches of a parallel block run at once unless it sets max_concurrency
+PARALLEL_MAX_CONCURRENCY = 20
+
+
+@action("parallel")
+class ParallelStep(Step):
+    """
+    Runs its branches (lists of steps) concurrently. Browser branches get
+    their own page in the run's context, HTTP-only branches none. Each branch
+    starts from a copy of the variables; what a branch sets is merged back in
+    branch order once all finished. The first failing branch cancels the
+    others and fails the block.
+    """
+
+    def __init__(self, spec):
+        super().__init__(spec)
+        branches = spec.get("branches")
+        if isinstance(branches, str):
+            # The editor sends nested step lists as JSON text
+            try:
+                branches = json.loads(branches)
+            except ValueError as e:
+                raise PlanError(f"'branches' is not valid JSON: {e}")
+        if not isinstance(branches, list) or not branches:
+            raise PlanError("'branches' must be a non-empty list of step lists")
+        self.branches: List[List[Step]] = []
+        for index, branch in enumerate(branches):
+            try:
+                self.branches.append(compile_steps(branch))
+            except PlanError as e:
+                raise PlanError(f"branch {index + 1}: {e}")
+        self.max_concurrency = max(1, self.number("max_concurrency", min(len(self.branches), PARALLEL_MAX_CONCURRENCY), int))
+        self.needs_browser = any(step.needs_browser for step in walk(self.children()))
+        self._branch_needs_browser = [any(step.needs_browser for step in walk(branch)) for branch in self.branches]
+
+    def children(self) -> List[Step]:
+        return [step for branch in self.branches for step in branch]
+
+    async def _run_branch(self, ctx: RunContext, index: int, limit: asyncio.Semaphore) -> Dict[str, Any]:
+        async with limit:
+            page = await ctx.new_page() if self._branch_needs_browser[index] else None
+            branch_ctx = ctx.branch(page, f"branch {index + 1}")
+            start = dict(branch_ctx.variables)
+            try:
+                await run_steps(self.branches[index], branch_ctx)
+            finally:
+                if page is not None:
+                    try:
+                        await page.close()
+                    except Exception:
+                        pass
+            return {k: v for k, v in branch_ctx.variables.items() if k not in start or start[k] is not v}
+
+    async def run(self, ctx):
+        limit = asyncio.Semaphore(self.max_concurrency)
+        tasks = [asyncio.create_task(self._run_branch(ctx, i, limit)) for i in range(len(self.branches))]
+        try:
+            done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        except asyncio.CancelledError:
+            for task in tasks:
+                task.cancel()
+            raise
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        for index, task in enumerate(tasks):
+            if task.done() and not task.cancelled() and task.exception() is not None:
+                raise Exception(f"Parallel branch {index + 1} failed: {task.exception()}")
+        for task in tasks:
+            ctx.variables.update(task.result())
+        ctx.logger.info(f"Parallel block finished {len(tasks)} branches")
+
+
+class Plan:
+    def __init__(self, steps: List[Step]):
+        self.steps = steps
+        self.needs_browser = any(step.needs_browser for step in steps)
+        # Steps nested in blocks count for everything collected below
+        steps = list(walk(steps))
+        # Headless mode comes from the first open step that sets it (default True)
+        self.headless = next(
+            (step.headless for step in steps if isinstance(step, OpenStep) and step.headless is not None),
+            True,
+        )
+        # Likewise the browser context profile
+        self.profile = next((step.context for step in steps if isinstance(step, OpenStep) and step.context), None)
+        if self.profile is None and any(isinstance(step, CookieSnapshotStep) for step in steps):
+            raise PlanError("Cookie snapshot steps need an open step with a 'context' profile")
+        # Capture patterns known up front are matched while requests arrive
+        matchers = [step for step in steps if isinstance(step, NetworkMatchStep)]
+        self.network_patterns = [step.regex.pattern for step in matchers if step.regex.pattern is not None]
+        self.needs_request_buffer = any(step.regex.pattern is None for step in matchers)
+        self.retain_headers = any(step.retain_headers for step in matchers)
+        self.watches_content = any(isinstance(step, WatchContentStep) for step in steps)
+        # Request interception: global policy plus the tracker's block_resources steps
+        blockers = [step for step in steps if isinstance(step, BlockResourcesStep)]
+        policy = interception.GLOBAL_POLICY if all(step.use_global for step in blockers) else interception.InterceptionPolicy()
+        for step in blockers:
+            policy = policy.merged(step.policy)
+        self.interception = policy
+
+    def new_network_capture(self) -> "network.NetworkCapture":
+        return network.NetworkCapture(
+            self.network_patterns,
+            buffer_size=network.NETWORK_BUFFER_SIZE if self.needs_request_buffer else 0,
+            retain_headers=self.retain_headers,
+        )
+
+
+def compile_steps(config: Any) -> List[Step]:
+    if not isinstance(config, list):
+        raise PlanError("Tracker config must be a list of steps")
+    steps = []
+    for index, spec in enumerate(config):
+        if not isinstance(spec, dict):
+            raise PlanError(f"Step {index + 1} must be an object")
+        name = spec.get("action")
+        step_cls = ACTIONS.get(name)
+        if step_cls is None:
+            raise PlanError(f"Step {index + 1}: unknown action '{name}'")
+        try:
+            steps.append(step_cls(spec))
+        except PlanError as e:
+            raise PlanError(f"Step {index + 1} ({name}): {e}")
+    return steps
+
+
+def config_hash(config: Any) -> str:
+    return hashlib.sha256(json.dumps(config, sort_keys=True, default=str).encode()).hexdigest()
+
+
+_plans: "OrderedDict[str, Plan]" = OrderedDict()
+
+
+def compile_config(config: Any) -> Plan:
+    """Compiles a tracker config into a Plan, cached by config hash."""
+    key = config_hash(config)
+    plan = _plans.get(key)
+    if plan is not None:
+        _plans.move_to_end(key)
+        return plan
+    plan = Plan(compile_steps(config))
+    _plans[key] = plan
+    if len(_plans) > PLAN_CACHE_SIZE:
+        _plans.popitem(last=False)
+    return plan
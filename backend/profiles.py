@@ -0,0 +1,310 @@
+import asyncio
+import json
+import logging
+import os
+import re
+import shutil
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from backend import metrics
+
+try:
+    import fcntl
+except ImportError: # Windows: profiles are only locked within the process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROFILES_DIR = os.environ.get("TRACKER_PROFILES_DIR", os.path.join(BASE_DIR, "profiles"))
+# How long a run waits for a profile another run (or process) is using
+LOCK_TIMEOUT = float(os.environ.get("TRACKER_PROFILE_LOCK_TIMEOUT", "120"))
+# Warm persistent contexts are closed after this long without a run
+PERSISTENT_IDLE_SECONDS = float(os.environ.get("TRACKER_PROFILE_IDLE_SECONDS", "300"))
+
+_NAME_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+PersistentLauncher = Callable[[Any, bool, str], Awaitable[Any]]
+
+
+async def camoufox_persistent_launcher(playwright, headless: bool, user_data_dir: str):
+    from camoufox import AsyncNewBrowser
+    return await AsyncNewBrowser(playwright, headless=headless, persistent_context=True, user_data_dir=user_data_dir)
+
+
+class ProfileError(ValueError):
+    pass
+
+
+def _validate_name(name: str, kind: str = "Profile") -> str:
+    if not isinstance(name, str) or not _NAME_RE.match(name):
+        raise ProfileError(f"{kind} name must be 1-64 letters, digits, '-' or '_'")
+    return name
+
+
+def _write_json(path: str, data: Any):
+    # Write-then-rename so a crash never leaves a half-written state file
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def _read_json(path: str) -> Optional[Any]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+class Profile:
+    """
+    A named browser context profile on disk:
+
+        <name>/profile.json        settings
+        <name>/storage_state.json  cookies and localStorage, loaded into every run
+        <name>/snapshots/*.json    saved cookie snapshots
+        <name>/user_data/          persistent profiles only: full browser profile incl. HTTP cache
+    """
+
+    def __init__(self, name: str, root: str = PROFILES_DIR):
+        self.name = _validate_name(name)
+        self.path = os.path.join(root, name)
+
+    @property
+    def storage_state_path(self) -> str:
+        return os.path.join(self.path, "storage_state.json")
+
+    @property
+    def user_data_dir(self) -> str:
+        return os.path.join(self.path, "user_data")
+
+    @property
+    def snapshots_dir(self) -> str:
+        return os.path.join(self.path, "snapshots")
+
+    def exists(self) -> bool:
+        return os.path.isfile(os.path.join(self.path, "profile.json"))
+
+    @property
+    def settings(self) -> Dict[str, Any]:
+        return _read_json(os.path.join(self.path, "profile.json")) or {}
+
+    @property
+    def persistent(self) -> bool:
+        """Persistent profiles keep a whole browser profile (HTTP cache included) and a warm context."""
+        return bool(self.settings.get("persistent"))
+
+    def create(self, persistent: bool = False):
+        os.makedirs(self.snapshots_dir, exist_ok=True)
+        _write_json(os.path.join(self.path, "profile.json"), {
+            "name": self.name, "persistent": persistent, "created_at": datetime.utcnow().isoformat(),
+        })
+
+    def storage_state(self) -> Optional[Dict[str, Any]]:
+        return _read_json(self.storage_state_path)
+
+    def save_storage_state(self, state: Dict[str, Any]):
+        _write_json(self.storage_state_path, state)
+
+    def cookies(self) -> List[Dict[str, Any]]:
+        return (self.storage_state() or {}).get("cookies", [])
+
+    def set_cookies(self, cookies: List[Dict[str, Any]]):
+        state = self.storage_state() or {"cookies": [], "origins": []}
+        state["cookies"] = cookies
+        self.save_storage_state(state)
+
+    def snapshots(self) -> List[str]:
+        if not os.path.isdir(self.snapshots_dir):
+            return []
+        return sorted(f[:-5] for f in os.listdir(self.snapshots_dir) if f.endswith(".json"))
+
+    def save_snapshot(self, snapshot: str, state: Dict[str, Any]):
+        os.makedirs(self.snapshots_dir, exist_ok=True)
+        _write_json(os.path.join(self.snapshots_dir, f"{_validate_name(snapshot, 'Snapshot')}.json"), state)
+
+    def load_snapshot(self, snapshot: str) -> Dict[str, Any]:
+        state = _read_json(os.path.join(self.snapshots_dir, f"{_validate_name(snapshot, 'Snapshot')}.json"))
+        if state is None:
+            raise ProfileError(f"Profile '{self.name}' has no snapshot '{snapshot}'")
+        return state
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "persistent": self.persistent,
+            "cookies": len(self.cookies()),
+            "snapshots": self.snapshots(),
+            "created_at": self.settings.get("created_at"),
+        }
+
+
+class _FileLock:
+    """flock on <profile>/.lock so worker processes sharing the directory never use one profile at once."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd: Optional[int] = None
+
+    def _try_acquire(self) -> bool:
+        if fcntl is None:
+            return True
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self._fd = fd
+        return True
+
+    async def acquire(self, timeout: float):
+        deadline = time.monotonic() + timeout
+        while not self._try_acquire():
+            if time.monotonic() >= deadline:
+                raise ProfileError(f"Profile is locked by another process ({self.path})")
+            await asyncio.sleep(0.2)
+
+    def release(self):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+
+class _Entry:
+    def __init__(self, profile: Profile):
+        self.lock = asyncio.Lock()
+        self.file_lock = _FileLock(os.path.join(profile.path, ".lock"))
+        self.file_locked = False
+        self.context = None # Warm persistent context, if any
+        self.context_headless: Optional[bool] = None
+        self.last_used = time.monotonic()
+        self.runs = 0
+
+
+class ProfileManager:
+    """
+    Hands out profiles to runs, one run per profile at a time (asyncio lock
+    within the process, file lock across processes). Persistent profiles
+    keep their browser context open between runs; the process keeps the
+    file lock while it holds such a warm context.
+    """
+
+    def __init__(self, root: str = PROFILES_DIR, launcher: PersistentLauncher = camoufox_persistent_launcher,
+                 idle_seconds: float = PERSISTENT_IDLE_SECONDS):
+        self.root = root
+        self.launcher = launcher
+        self.idle_seconds = idle_seconds
+        self._entries: Dict[str, _Entry] = {}
+
+    def get(self, name: str) -> Profile:
+        return Profile(name, self.root)
+
+    def list(self) -> List[Profile]:
+        if not os.path.isdir(self.root):
+            return []
+        profiles = (Profile(name, self.root) for name in sorted(os.listdir(self.root)) if _NAME_RE.match(name))
+        return [profile for profile in profiles if profile.exists()]
+
+    def _entry(self, profile: Profile) -> _Entry:
+        entry = self._entries.get(profile.name)
+        if entry is None:
+            entry = self._entries[profile.name] = _Entry(profile)
+        return entry
+
+    @asynccontextmanager
+    async def checkout(self, name: str, timeout: float = LOCK_TIMEOUT):
+        """Exclusive use of a profile; profiles that don't exist yet are created (non-persistent)."""
+        profile = self.get(name)
+        await self.close_idle()
+        entry = self._entry(profile)
+        try:
+            await asyncio.wait_for(entry.lock.acquire(), timeout)
+        except asyncio.TimeoutError:
+            raise ProfileError(f"Profile '{name}' is busy")
+        try:
+            if not entry.file_locked:
+                os.makedirs(profile.path, exist_ok=True)
+                await entry.file_lock.acquire(timeout)
+                entry.file_locked = True
+            if not profile.exists():
+                profile.create()
+            entry.runs += 1
+            yield profile
+        finally:
+            entry.last_used = time.monotonic()
+            if entry.context is None and entry.file_locked:
+                entry.file_lock.release()
+                entry.file_locked = False
+            entry.lock.release()
+
+    async def persistent_context(self, profile: Profile, playwright, headless: bool):
+        """Warm context of a checked-out persistent profile, launched on first use."""
+        entry = self._entry(profile)
+        if entry.context is not None and entry.context_headless != headless:
+            await self._close_context(entry)
+        if entry.context is None:
+            started = time.perf_counter()
+            entry.context = await self.launcher(playwright, headless, profile.user_data_dir)
+            metrics.BROWSER_LAUNCH_SECONDS.observe(time.perf_counter() - started, "persistent")
+            entry.context_headless = headless
+            # Cookies set through the API land in storage_state.json
+            cookies = profile.cookies()
+            if cookies:
+                await entry.context.add_cookies(cookies)
+            logger.info(f"Launched persistent context for profile '{profile.name}'")
+        return entry.context
+
+    async def discard_context(self, profile: Profile):
+        """Drops a warm context that failed, the next run launches a fresh one."""
+        await self._close_context(self._entry(profile))
+
+    async def _close_context(self, entry: _Entry):
+        context, entry.context = entry.context, None
+        if context is not None:
+            try:
+                await context.close()
+            except Exception as e:
+                logger.warning(f"Failed to close persistent context: {e}")
+
+    async def close_idle(self):
+        now = time.monotonic()
+        for name, entry in list(self._entries.items()):
+            if entry.context is not None and not entry.lock.locked() and now - entry.last_used > self.idle_seconds:
+                await self._close_context(entry)
+                if entry.file_locked and not entry.lock.locked():
+                    entry.file_lock.release()
+                    entry.file_locked = False
+                logger.info(f"Closed idle persistent context for profile '{name}'")
+
+    async def delete(self, name: str):
+        async with self.checkout(name) as profile:
+            entry = self._entry(profile)
+            await self._close_context(entry)
+            shutil.rmtree(profile.path, ignore_errors=True)
+        self._entries.pop(name, None)
+
+    async def close(self):
+        for entry in self._entries.values():
+            await self._close_context(entry)
+            if entry.file_locked:
+                entry.file_lock.release()
+                entry.file_locked = False
+        self._entries.clear()
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [
+            {"name": name, "busy": entry.lock.locked(), "warm": entry.context is not None, "runs": entry.runs}
+            for name, entry in self._entries.items()
+        ]
+
+
+manager = ProfileManager()
+
+metrics.Gauge("tracker_persistent_contexts_open", "Warm persistent profile contexts.",
+              lambda: sum(1 for entry in manager._entries.values() if entry.context is not None))
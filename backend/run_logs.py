@@ -0,0 +1,113 @@
+import asyncio
+import json
+import logging
+import os
+import time
+import zlib
+from collections import deque
+from typing import Any, Dict, List, Optional, Set
+
+# Per-run bounds; once exceeded the oldest records are dropped
+MAX_RECORDS = int(os.environ.get("TRACKER_RUN_LOG_MAX_RECORDS", "2000"))
+MAX_BYTES = int(os.environ.get("TRACKER_RUN_LOG_MAX_BYTES", str(256 * 1024)))
+CHUNK_RECORDS = 200
+
+# Also forwarded to the process log
+exec_logger = logging.getLogger("tracker_exec")
+
+
+class RunLog:
+    """
+    Structured, bounded log of a single run. Steps log through it like a
+    logging.Logger; live subscribers (SSE tails) receive every record as it
+    is written.
+    """
+
+    def __init__(self, run_id: Optional[int] = None, max_records: int = MAX_RECORDS, max_bytes: int = MAX_BYTES):
+        self.run_id = run_id
+        self.max_bytes = max_bytes
+        self.records: deque = deque(maxlen=max_records)
+        self.size = 0
+        self.dropped = 0
+        self.finished = False
+        self._seq = 0
+        self._subscribers: Set[asyncio.Queue] = set()
+
+    def log(self, level: int, message: str):
+        exec_logger.log(level, message)
+        self._seq += 1
+        record = {"seq": self._seq, "ts": time.time(), "level": logging.getLevelName(level), "message": str(message)}
+        if len(self.records) == self.records.maxlen:
+            self._drop_oldest()
+        self.records.append(record)
+        self.size += len(record["message"])
+        while self.size > self.max_bytes and len(self.records) > 1:
+            self._drop_oldest()
+        for queue in self._subscribers:
+            queue.put_nowait(record)
+
+    def _drop_oldest(self):
+        self.size -= len(self.records.popleft()["message"])
+        self.dropped += 1
+
+    def info(self, message: str):
+        self.log(logging.INFO, message)
+
+    def warning(self, message: str):
+        self.log(logging.WARNING, message)
+
+    def error(self, message: str):
+        self.log(logging.ERROR, message)
+
+    def text(self) -> str:
+        lines = [f"{r['level']}: {r['message']}" for r in self.records]
+        if self.dropped:
+            lines.insert(0, f"WARNING: {self.dropped} earlier log lines dropped")
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def chunks(self, chunk_records: int = CHUNK_RECORDS) -> List[bytes]:
+        """Records as zlib-compressed JSON-lines chunks, ready to persist."""
+        records = list(self.records)
+        return [
+            zlib.compress("\n".join(json.dumps(r) for r in records[i:i + chunk_records]).encode())
+            for i in range(0, len(records), chunk_records)
+        ]
+
+    def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.add(queue)
+        if self.finished:
+            queue.put_nowait(None)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+
+    def finish(self):
+        self.finished = True
+        for queue in self._subscribers:
+            queue.put_nowait(None)
+
+
+def decode_chunk(data: bytes) -> List[Dict[str, Any]]:
+    return [json.loads(line) for line in zlib.decompress(data).decode().splitlines() if line]
+
+
+# Logs of runs in progress, by run id
+_live: Dict[int, RunLog] = {}
+
+
+def start(run_id: int) -> RunLog:
+    run_log = RunLog(run_id)
+    _live[run_id] = run_log
+    return run_log
+
+
+def get_live(run_id: int) -> Optional[RunLog]:
+    return _live.get(run_id)
+
+
+def finish(run_id: int):
+    run_log = _live.pop(run_id, None)
+    if run_log:
+        run_log.finish()
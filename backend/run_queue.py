@@ -0,0 +1,200 @@
+import asyncio
+import itertools
+import logging
+import os
+import time
+from collections import deque
+from datetime import datetime
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+from backend import jobs, metrics, runner
+
+logger = logging.getLogger(__name__)
+
+# Lower value runs first
+PRIORITY_MANUAL = 0
+PRIORITY_SCHEDULED = 10
+
+MAX_CONCURRENT_RUNS = int(os.environ.get("TRACKER_MAX_CONCURRENT_RUNS", "4"))
+
+RunFunc = Callable[[int, bool], Awaitable[Any]]
+
+
+@dataclass(order=True)
+class _Entry:
+    priority: int
+    seq: int
+    tracker_id: int = field(compare=False)
+    enqueued_at: float = field(compare=False)
+    require_active: bool = field(compare=False)
+    cancelled: bool = field(default=False, compare=False)
+
+
+class RunQueue:
+    """
+    Central work queue for tracker runs. At most `concurrency` runs execute at
+    once, a tracker is never queued or running twice, and manual runs jump
+    ahead of scheduled ones.
+    """
+
+    def __init__(self, run_func: RunFunc, concurrency: int = MAX_CONCURRENT_RUNS):
+        self.run_func = run_func
+        self.concurrency = max(1, concurrency)
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._queued: Dict[int, _Entry] = {}
+        self._running: Set[int] = set()
+        # Trackers to run again once their current run finishes (overrun policy 'queue')
+        self._deferred: Dict[int, _Entry] = {}
+        self._workers: List[asyncio.Task] = []
+        self._seq = itertools.count()
+        # Metrics
+        self._wait_times = deque(maxlen=1000)
+        self.submitted = 0
+        self.coalesced = 0
+        self.skipped = 0
+        self.completed = 0
+        self.failed = 0
+        self.max_depth = 0
+
+    async def start(self):
+        if self._workers:
+            return
+        self._queue = asyncio.PriorityQueue()
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+        logger.info(f"Run queue started with concurrency {self.concurrency}")
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def submit(self, tracker_id: int, priority: int = PRIORITY_SCHEDULED, require_active: bool = True,
+               if_running: str = "skip") -> str:
+        """
+        Queues a run and returns 'queued', 'coalesced' (merged into an already
+        queued run), 'running' (skipped, a run is in progress) or, with
+        if_running='queue', 'deferred' (runs once the current run finishes).
+        """
+        if self._queue is None:
+            raise Exception("Run queue is not started")
+        self.submitted += 1
+
+        if tracker_id in self._running:
+            if if_running == "queue":
+                deferred = self._deferred.get(tracker_id)
+                if deferred is not None:
+                    self.coalesced += 1
+                    deferred.priority = min(deferred.priority, priority)
+                    return "coalesced"
+                self._deferred[tracker_id] = _Entry(priority, 0, tracker_id, time.monotonic(), require_active)
+                return "deferred"
+            self.skipped += 1
+            logger.info(f"Tracker {tracker_id} is already running, skipping run")
+            return "running"
+
+        existing = self._queued.get(tracker_id)
+        if existing:
+            self.coalesced += 1
+            if priority < existing.priority:
+                # Re-queue with the higher priority but keep the original wait start
+                existing.cancelled = True
+                self._put(tracker_id, priority, require_active, existing.enqueued_at)
+            return "coalesced"
+
+        self._put(tracker_id, priority, require_active, time.monotonic())
+        return "queued"
+
+    def _put(self, tracker_id: int, priority: int, require_active: bool, enqueued_at: float):
+        entry = _Entry(priority, next(self._seq), tracker_id, enqueued_at, require_active)
+        self._queued[tracker_id] = entry
+        self._queue.put_nowait(entry)
+        self.max_depth = max(self.max_depth, len(self._queued))
+
+    async def _worker(self):
+        while True:
+            entry = await self._queue.get()
+            if entry.cancelled:
+                continue
+            del self._queued[entry.tracker_id]
+            self._running.add(entry.tracker_id)
+            wait = time.monotonic() - entry.enqueued_at
+            self._wait_times.append(wait)
+            metrics.QUEUE_WAIT_SECONDS.observe(wait)
+            try:
+                await self.run_func(entry.tracker_id, entry.require_active)
+                self.completed += 1
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Queued run for tracker {entry.tracker_id} crashed: {e}")
+            finally:
+                self._running.discard(entry.tracker_id)
+                deferred = self._deferred.pop(entry.tracker_id, None)
+                if deferred is not None:
+                    self._put(deferred.tracker_id, deferred.priority, deferred.require_active, deferred.enqueued_at)
+
+    def stats(self) -> Dict[str, Any]:
+        waits = sorted(self._wait_times)
+        return {
+            "concurrency": self.concurrency,
+            "depth": len(self._queued),
+            "deferred": len(self._deferred),
+            "max_depth": self.max_depth,
+            "running": len(self._running),
+            "submitted": self.submitted,
+            "coalesced": self.coalesced,
+            "skipped": self.skipped,
+            "completed": self.completed,
+            "failed": self.failed,
+            "wait_seconds_avg": sum(waits) / len(waits) if waits else 0.0,
+            "wait_seconds_p95": waits[int(len(waits) * 0.95)] if waits else 0.0,
+            "wait_seconds_max": waits[-1] if waits else 0.0,
+        }
+
+
+queue = RunQueue(runner.run_tracker)
+
+metrics.Gauge("tracker_queue_depth", "Runs waiting in the local run queue.", lambda: len(queue._queued))
+
+
+async def submit(tracker_id: int, priority: int = PRIORITY_SCHEDULED, require_active: bool = True,
+                 if_running: str = "skip", scheduled_for: Optional[datetime] = None) -> str:
+    """
+    Routes a run to the local queue, or in distributed mode to the job table
+    where worker processes pick it up. Scheduled runs pass their cron slot,
+    so schedulers in several processes enqueue each slot once.
+    """
+    if not jobs.is_distributed():
+        result = queue.submit(tracker_id, priority, require_active, if_running)
+    else:
+        if scheduled_for is None:
+            scheduled_for = jobs.slot_time() if priority == PRIORITY_SCHEDULED else datetime.utcnow()
+        result = await jobs.call(lambda db: jobs.enqueue(db, tracker_id, scheduled_for, priority, require_active, if_running=if_running))
+    metrics.SUBMISSIONS.inc(result)
+    return result
+
+
+async def submit_many(tracker_ids: List[int], priority: int = PRIORITY_MANUAL, require_active: bool = False,
+                      if_running: str = "skip", chunk_size: int = 500) -> Dict[str, int]:
+    """Submits many runs at once; in distributed mode one job-table transaction per chunk. Returns counts by outcome."""
+    results: Dict[str, int] = {}
+    if not jobs.is_distributed():
+        outcomes = [queue.submit(tracker_id, priority, require_active, if_running) for tracker_id in tracker_ids]
+    else:
+        def enqueue_chunk(db, chunk):
+            now = datetime.utcnow()
+            chunk_results = [
+                jobs.enqueue(db, tracker_id, now, priority, require_active, commit=False, if_running=if_running)
+                for tracker_id in chunk
+            ]
+            db.commit()
+            return chunk_results
+
+        outcomes = []
+        for start in range(0, len(tracker_ids), chunk_size):
+            chunk = tracker_ids[start:start + chunk_size]
+            outcomes.extend(await jobs.call(lambda db: enqueue_chunk(db, chunk)))
+    for outcome in outcomes:
+        results[outcome] = results.get(outcome, 0) + 1
+        metrics.SUBMISSIONS.inc(outcome)
+    return results
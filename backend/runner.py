@@ -0,0 +1,52 @@
+from backend import async_db, content_diff, metrics, notifications, plan, run_logs
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+async def run_tracker(tracker_id: int, require_active: bool = False):
+    """Executes a tracker once and records the outcome on the tracker row."""
+    # DB access goes through worker threads so the event loop never blocks on SQLite
+    tracker = await async_db.get_tracker(tracker_id)
+    if not tracker:
+        logger.error(f"Tracker {tracker_id} not found during execution")
+        return
+    if require_active and not tracker.is_active:
+        logger.info(f"Tracker {tracker_id} is inactive, skipping.")
+        return
+
+    try:
+        watching = plan.compile_config(tracker.config).watches_content
+    except plan.PlanError:
+        watching = False # execute_tracker reports it as a failed run
+    # Watching trackers only touch their status when content or outcome changes
+    content = content_diff.ContentWatch(await async_db.get_content_fingerprints(tracker_id)) if watching else None
+
+    run_id = await async_db.start_run(tracker_id, mark_running=not watching)
+    run_log = run_logs.start(run_id)
+
+    # Only processes that execute runs load the engine and what it pulls in
+    from backend.engine import TrackerEngine
+    engine = TrackerEngine()
+    status, run_info = "failure", None
+    started = time.perf_counter()
+    metrics.RUNS_IN_FLIGHT.inc()
+    try:
+        _, run_info = await engine.execute_tracker(tracker.config, run_log, content)
+        status = "success"
+    except Exception as e:
+        logger.error(f"Tracker {tracker_id} failed: {e}")
+    finally:
+        metrics.RUNS_IN_FLIGHT.dec()
+        metrics.RUNS.inc(status)
+        metrics.RUN_SECONDS.observe(time.perf_counter() - started)
+        # Logs are kept on failure too; stored before the live log goes away so tails don't miss the end
+        try:
+            # Messages queued by steps before a failure are still sent
+            queued = await async_db.finish_run(tracker_id, run_id, status, run_log.text(), run_info, run_log.chunks(), content,
+                                               engine.notifications)
+            if queued:
+                notifications.dispatcher.wake()
+        finally:
+            run_logs.finish(run_id)
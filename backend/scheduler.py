@@ -1,67 +1,251 @@
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.date import DateTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 from sqlalchemy.orm import Session
-from backend import models, crud, database
-from backend.engine import TrackerEngine
+from backend import models, crud, database, jobs, run_queue, async_db
+from datetime import datetime, timedelta, timezone
+import asyncio
+import functools
+import hashlib
 import logging
+import os
 
 logger = logging.getLogger(__name__)
 
-scheduler = AsyncIOScheduler()
+# Workers don't see API edits directly; they reload cron schedules from the DB this often
+SYNC_INTERVAL = float(os.environ.get("TRACKER_SCHEDULE_SYNC_SECONDS", "30"))
+# Upper bound of the per-tracker phase offset that spreads trackers sharing a cron
+# expression over their interval (never more than the interval itself); 0 disables it
+JITTER_MAX = float(os.environ.get("TRACKER_SCHEDULE_JITTER", "300"))
+COALESCE = os.environ.get("TRACKER_SCHEDULE_COALESCE", "1") == "1"
+MAX_INSTANCES = int(os.environ.get("TRACKER_SCHEDULE_MAX_INSTANCES", "1"))
+# Seconds a firing may be late (busy event loop) and still run
+MISFIRE_GRACE = int(os.environ.get("TRACKER_SCHEDULE_MISFIRE_GRACE", "60"))
+# A firing while the previous run is still going: 'skip' it or 'queue' one run after it
+OVERRUN = os.environ.get("TRACKER_SCHEDULE_OVERRUN", "skip")
+# Runs missed while no scheduler was up: 'once' runs a single catch-up at startup, 'skip' doesn't
+CATCHUP = os.environ.get("TRACKER_SCHEDULE_CATCHUP", "once")
+# After this many consecutive failures scheduled runs back off exponentially; 0 disables it
+BACKOFF_AFTER = int(os.environ.get("TRACKER_SCHEDULE_BACKOFF_AFTER", "3"))
+BACKOFF_MAX_FACTOR = int(os.environ.get("TRACKER_SCHEDULE_BACKOFF_MAX_FACTOR", "16"))
 
-async def run_tracker_job(tracker_id: int):
+scheduler = AsyncIOScheduler(job_defaults={
+    "coalesce": COALESCE,
+    "max_instances": MAX_INSTANCES,
+    "misfire_grace_time": MISFIRE_GRACE,
+})
+# tracker id -> cron expression currently scheduled
+_crons = {}
+
+
+class SpreadCronTrigger(CronTrigger):
+    """
+    Cron trigger firing a fixed offset after each cron time, so trackers with
+    the same expression don't all start in the same second. The offset is
+    derived from the tracker id: every process computes the same fire times,
+    and (fire time - offset) is the cron slot the run belongs to.
+    """
+
+    def __init__(self, *args, offset: timedelta = timedelta(0), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.offset = offset
+        # Shortest gap between two fire times, used to size the offset and the backoff
+        self.interval = 0.0
+
+    def get_next_fire_time(self, previous_fire_time, now):
+        if previous_fire_time is not None:
+            previous_fire_time = previous_fire_time - self.offset
+        fire_time = super().get_next_fire_time(previous_fire_time, now - self.offset)
+        return fire_time + self.offset if fire_time is not None else None
+
+    def previous_fire_time(self, before: datetime):
+        """Latest fire time earlier than `before`, None if there's none within years."""
+        span = timedelta(seconds=max(self.interval, 60))
+        for _ in range(24):
+            fire_time, found = self.get_next_fire_time(None, before - span), None
+            while fire_time is not None and fire_time < before:
+                found = fire_time
+                fire_time = self.get_next_fire_time(fire_time, fire_time)
+            if found is not None:
+                return found
+            span *= 2
+        return None
+
+    def slot(self, fire_time: datetime) -> datetime:
+        return jobs.slot_time((fire_time - self.offset).astimezone(timezone.utc).replace(tzinfo=None))
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        state["offset"] = self.offset
+        state["interval"] = self.interval
+        return state
+
+    def __setstate__(self, state):
+        super().__setstate__(state)
+        self.offset = state.get("offset", timedelta(0))
+        self.interval = state.get("interval", 0.0)
+
+    def __repr__(self):
+        return f"{super().__repr__()[:-1]}, offset={self.offset.total_seconds():g}s>"
+
+
+def _min_gap(trigger: CronTrigger, samples: int = 6) -> float:
+    fire_time = trigger.get_next_fire_time(None, datetime.now(trigger.timezone))
+    gap = None
+    for _ in range(samples):
+        next_time = trigger.get_next_fire_time(fire_time, fire_time) if fire_time else None
+        if next_time is None:
+            break
+        seconds = (next_time - fire_time).total_seconds()
+        gap = seconds if gap is None else min(gap, seconds)
+        fire_time = next_time
+    return gap or 0.0
+
+
+@functools.lru_cache(maxsize=1024)
+def _cron_interval(cron_expression: str) -> float:
+    # Thousands of trackers share a handful of expressions; keeps startup linear and cheap
+    return _min_gap(CronTrigger.from_crontab(cron_expression))
+
+
+def spread_trigger(tracker_id: int, cron_expression: str, jitter_max: float = JITTER_MAX) -> SpreadCronTrigger:
+    trigger = SpreadCronTrigger.from_crontab(cron_expression)
+    trigger.interval = _cron_interval(cron_expression)
+    fraction = int(hashlib.sha256(str(tracker_id).encode()).hexdigest()[:8], 16) / 2**32
+    # Whole seconds keep (fire time - offset) on the cron minute
+    trigger.offset = timedelta(seconds=int(fraction * min(trigger.interval, jitter_max)))
+    return trigger
+
+
+def backoff_delay(streak: int, interval: float) -> float:
+    """Minimum seconds between scheduled runs of a tracker that failed `streak` times in a row."""
+    if BACKOFF_AFTER <= 0 or streak < BACKOFF_AFTER:
+        return interval
+    return interval * min(2 ** (streak - BACKOFF_AFTER + 1), BACKOFF_MAX_FACTOR)
+
+
+async def _backing_off(tracker_id: int, interval: float) -> bool:
+    if BACKOFF_AFTER <= 0 or interval <= 0:
+        return False
+    streak, last_started_at = await async_db.read(lambda db: crud.get_failure_streak(db, tracker_id))
+    if streak < BACKOFF_AFTER or last_started_at is None:
+        return False
+    delay = backoff_delay(streak, interval)
+    # Firings come every `interval`, so allow half of one for timing noise
+    if (datetime.utcnow() - last_started_at).total_seconds() < delay - interval / 2:
+        logger.info(f"Tracker {tracker_id} failed {streak} times in a row, backing off to one run per {delay:.0f}s")
+        return True
+    return False
+
+
+async def run_tracker_job(tracker_id: int, slot: datetime = None):
+    job = scheduler.get_job(str(tracker_id))
+    trigger = job.trigger if job is not None and isinstance(job.trigger, SpreadCronTrigger) else None
+    if slot is None and trigger is not None and job.next_run_time is not None:
+        # The scheduler has already moved next_run_time on, so the firing being run is the one
+        # before it. A late start (misfire grace, busy loop) still maps to the slot of its cron tick.
+        fire_time = trigger.previous_fire_time(job.next_run_time)
+        if fire_time is not None:
+            slot = trigger.slot(fire_time)
+    if trigger is not None and await _backing_off(tracker_id, trigger.interval):
+        return
+    if slot is None:
+        offset = trigger.offset if trigger is not None else timedelta(0)
+        slot = jobs.slot_time(datetime.utcnow() - offset)
     logger.info(f"Running scheduled job for tracker {tracker_id}")
-    # We need to manually handle the DB session here
-    db = database.SessionLocal()
+    result = await run_queue.submit(
+        tracker_id, run_queue.PRIORITY_SCHEDULED, require_active=True, if_running=OVERRUN, scheduled_for=slot,
+    )
+    logger.info(f"Scheduled run for tracker {tracker_id}: {result}")
+
+async def compact_history_job():
+    result = await async_db.compact_history()
+    logger.info(f"Compacted run history: {result}")
+    removed = await async_db.collect_screenshots()
+    if removed:
+        logger.info(f"Removed {removed} unreferenced screenshot files")
+
+def _load_schedules():
+    """tracker id -> (cron expression, last run time) of active scheduled trackers."""
+    db = database.ReadSessionLocal()
     try:
-        tracker = crud.get_tracker(db, tracker_id)
-        if not tracker or not tracker.is_active:
-            logger.info(f"Tracker {tracker_id} is inactive or deleted, skipping.")
-            return
-
-        crud.update_tracker_status(db, tracker_id, "running")
-        
-        engine = TrackerEngine()
-        try:
-            logs, run_info = await engine.execute_tracker(tracker.config)
-            crud.update_tracker_status(db, tracker_id, "success", logs, run_info)
-        except Exception as e:
-            logger.error(f"Tracker {tracker_id} failed: {e}")
-            crud.update_tracker_status(db, tracker_id, "failure", str(e))
+        return {tracker_id: (cron, last_run_at) for tracker_id, cron, last_run_at in crud.iter_schedules(db)}
     finally:
         db.close()
 
-def start_scheduler():
+def _schedule_catchup(tracker_id: int, last_run_at: datetime):
+    job = scheduler.get_job(str(tracker_id))
+    if job is None or last_run_at is None:
+        return
+    trigger = job.trigger
+    if last_run_at.tzinfo is None:
+        last_run_at = last_run_at.replace(tzinfo=timezone.utc)
+    missed = trigger.get_next_fire_time(None, last_run_at)
+    now = datetime.now(timezone.utc)
+    if missed is None or missed >= now:
+        return
+    # At the tracker's own offset from now, so a restart doesn't start every missed run at once
+    scheduler.add_job(
+        run_tracker_job,
+        DateTrigger(run_date=now + trigger.offset),
+        id=f"catchup-{tracker_id}",
+        replace_existing=True,
+        args=[tracker_id, trigger.slot(missed)],
+    )
+    logger.info(f"Tracker {tracker_id} missed its run at {missed}, catching up once")
+
+def start_scheduler(sync: bool = False):
+    """
+    With sync=True (worker processes) schedules are periodically reloaded from
+    the DB instead of being updated by the API endpoints.
+    """
     scheduler.start()
     logger.info("Scheduler started")
+    scheduler.add_job(compact_history_job, IntervalTrigger(hours=1), id="compact_history", replace_existing=True)
     # Load existing schedules
-    db = database.SessionLocal()
-    try:
-        trackers = crud.get_trackers(db, limit=1000)
-        for tracker in trackers:
-            if tracker.schedule_cron and tracker.is_active:
-                add_job(tracker.id, tracker.schedule_cron)
-    finally:
-        db.close()
+    for tracker_id, (cron, last_run_at) in _load_schedules().items():
+        add_job(tracker_id, cron)
+        if CATCHUP == "once":
+            _schedule_catchup(tracker_id, last_run_at)
+    if sync:
+        scheduler.add_job(sync_jobs, IntervalTrigger(seconds=SYNC_INTERVAL), id="sync_schedules", replace_existing=True)
+
+async def sync_jobs():
+    schedules = await asyncio.to_thread(_load_schedules)
+    for tracker_id in set(_crons) - set(schedules):
+        remove_job(tracker_id)
+    for tracker_id, (cron, _) in schedules.items():
+        if _crons.get(tracker_id) != cron:
+            add_job(tracker_id, cron)
 
 def add_job(tracker_id: int, cron_expression: str):
     # cron_expression expected in standard 5-part format: "min hour day month day_of_week"
     # APScheduler CronTrigger is flexible.
+    if not scheduler.running:
+        return # Distributed mode API process: workers pick the change up on their next sync
     try:
+        trigger = spread_trigger(tracker_id, cron_expression)
         scheduler.add_job(
             run_tracker_job,
-            CronTrigger.from_crontab(cron_expression),
+            trigger,
             id=str(tracker_id),
             replace_existing=True,
             args=[tracker_id]
         )
-        logger.info(f"Added job for tracker {tracker_id} with cron: {cron_expression}")
+        _crons[tracker_id] = cron_expression
+        logger.info(f"Added job for tracker {tracker_id} with cron: {cron_expression} (offset {trigger.offset.total_seconds():.0f}s)")
     except Exception as e:
         logger.error(f"Failed to add job for tracker {tracker_id}: {e}")
 
 def remove_job(tracker_id: int):
     try:
+        _crons.pop(tracker_id, None)
         scheduler.remove_job(str(tracker_id))
         logger.info(f"Removed job for tracker {tracker_id}")
     except Exception:
         pass # Job might not exist
+    try:
+        scheduler.remove_job(f"catchup-{tracker_id}")
+    except Exception:
+        pass
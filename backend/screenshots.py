@@ -0,0 +1,120 @@
+"""
+Content-addressed screenshot store:
+
+    <root>/<ab>/<sha256>.<png|jpeg>   a captured image, stored once however often it's taken
+    <root>/<ab>/<sha256>.thumb.jpeg   small preview for dashboard cards (only with Pillow installed)
+
+Runs record the images they took in tracker_screenshots; only the newest
+KEEP per tracker are kept, and collect_garbage removes the files nothing
+references any more.
+"""
+import hashlib
+import io
+import logging
+import os
+import re
+import time
+from typing import Any, Dict, Optional, Set, Tuple
+
+try:
+    from PIL import Image
+except ImportError: # Optional, without it there are no thumbnails
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SCREENSHOTS_DIR = os.environ.get("TRACKER_SCREENSHOTS_DIR", os.path.join(BASE_DIR, "screenshots"))
+# Screenshots kept per tracker
+KEEP = int(os.environ.get("TRACKER_SCREENSHOTS_KEEP", "20"))
+THUMBNAIL_SIZE = (320, 320)
+# Unreferenced files younger than this survive garbage collection, a run may
+# have stored an image it hasn't recorded yet
+GC_GRACE_SECONDS = 3600
+
+FORMATS = {"png": "image/png", "jpeg": "image/jpeg"}
+_HASH_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+def valid_hash(digest: str) -> bool:
+    return bool(_HASH_RE.match(digest))
+
+
+def _write(path: str, data: bytes):
+    # Write-then-rename, a concurrent reader never sees half a file
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class ScreenshotStore:
+    def __init__(self, root: str = SCREENSHOTS_DIR):
+        self.root = root
+
+    def path(self, digest: str, image_format: str) -> str:
+        return os.path.join(self.root, digest[:2], f"{digest}.{image_format}")
+
+    def thumbnail_path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], f"{digest}.thumb.jpeg")
+
+    def put(self, data: bytes, image_format: str) -> Dict[str, Any]:
+        """Stores an image unless an identical one exists. Blocking, call it in a thread."""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path(digest, image_format)
+        deduplicated = os.path.exists(path)
+        if deduplicated:
+            # Restarts the garbage collection grace period
+            os.utime(path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            _write(path, data)
+        if Image is not None and not os.path.exists(self.thumbnail_path(digest)):
+            try:
+                self._make_thumbnail(data, digest)
+            except Exception as e:
+                logger.warning(f"Thumbnail of screenshot {digest} failed: {e}")
+        return {"hash": digest, "format": image_format, "size": len(data), "deduplicated": deduplicated}
+
+    def _make_thumbnail(self, data: bytes, digest: str):
+        with Image.open(io.BytesIO(data)) as image:
+            image.thumbnail(THUMBNAIL_SIZE)
+            out = io.BytesIO()
+            image.convert("RGB").save(out, "JPEG", quality=70, optimize=True)
+        _write(self.thumbnail_path(digest), out.getvalue())
+
+    def find(self, digest: str, thumbnail: bool = False) -> Optional[Tuple[str, str]]:
+        """(file path, media type) of a stored image or its thumbnail, None if there's none."""
+        if not valid_hash(digest):
+            return None
+        if thumbnail and os.path.exists(self.thumbnail_path(digest)):
+            return self.thumbnail_path(digest), "image/jpeg"
+        for image_format, media_type in FORMATS.items():
+            path = self.path(digest, image_format)
+            if os.path.exists(path):
+                return path, media_type
+        return None
+
+    def collect_garbage(self, referenced: Set[str], grace: float = GC_GRACE_SECONDS) -> int:
+        """Deletes files of images not in `referenced`. Blocking, call it in a thread."""
+        if not os.path.isdir(self.root):
+            return 0
+        cutoff = time.time() - grace
+        removed = 0
+        for entry in os.scandir(self.root):
+            if not entry.is_dir():
+                continue
+            for file in os.scandir(entry.path):
+                digest = file.name.split(".", 1)[0]
+                if digest in referenced:
+                    continue
+                try:
+                    if file.stat().st_mtime < cutoff:
+                        os.remove(file.path)
+                        removed += 1
+                except FileNotFoundError:
+                    pass
+        return removed
+
+
+store = ScreenshotStore()
@@ -0,0 +1,7 @@
+import os
+import tempfile
+
+# A throwaway database, set before backend modules read the environment
+_tmpdir = tempfile.mkdtemp(prefix="tracker-test-")
+os.environ["TRACKER_DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir, 'test.db')}"
+os.environ["TRACKER_EXECUTION_MODE"] = "local"
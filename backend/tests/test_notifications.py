@@ -0,0 +1,218 @@
+"""
+Dispatcher delivery against a local webhook stand-in, and the outbox's
+deduplication of repeated messages.
+"""
+import asyncio
+import json
+import time
+from datetime import datetime
+
+import pytest
+
+from backend import async_db, content_diff, crud, database, http_client, models, notifications
+from backend.benchmarks.fixture_server import FixtureServer
+
+N = models.NotificationModel
+
+
+class Webhook:
+    """ASGI webhook stand-in: answers with the scripted (status, headers) in order, then 204."""
+
+    def __init__(self):
+        self.script = []
+        self.payloads = [] # Every request's JSON body, accepted or not
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+        self.payloads.append(json.loads(body))
+        status, headers = self.script.pop(0) if self.script else (204, {})
+        await send({"type": "http.response.start", "status": status,
+                    "headers": [(name.encode(), value.encode()) for name, value in headers.items()]})
+        await send({"type": "http.response.body", "body": b""})
+
+    def delivered(self) -> list:
+        return [item["message"] for payload in self.payloads for item in payload["notifications"]]
+
+
+@pytest.fixture(scope="module")
+def server():
+    database.init_db()
+    async_db.writer.start()
+    apps = {}
+
+    async def app(scope, receive, send):
+        await apps["webhook"](scope, receive, send)
+
+    server = FixtureServer(asgi_app=app).start()
+    server.apps = apps
+    yield server
+    server.stop()
+    async_db.writer.stop()
+
+
+@pytest.fixture
+def webhook(server):
+    server.apps["webhook"] = Webhook()
+    db = database.SessionLocal()
+    try:
+        db.query(N).delete()
+        db.commit()
+    finally:
+        db.close()
+    return server.apps["webhook"]
+
+
+@pytest.fixture
+def url(server, request):
+    return f"{server.url}/hook/{request.node.name}"
+
+
+def run(coro):
+    async def main():
+        try:
+            return await coro
+        finally:
+            # The shared client belongs to this event loop
+            await http_client.close_client()
+    return asyncio.run(main())
+
+
+def queue(url: str, *messages: str, tracker_id: int = 1):
+    db = database.SessionLocal()
+    try:
+        return crud.enqueue_notifications(db, tracker_id, None, [{"destination": url, "message": m} for m in messages])
+    finally:
+        db.close()
+
+
+def rows() -> list:
+    db = database.SessionLocal()
+    try:
+        return db.query(N).order_by(N.id).all()
+    finally:
+        db.close()
+
+
+def seconds_until(moment: datetime) -> float:
+    return (moment - datetime.utcnow()).total_seconds()
+
+
+def test_failed_delivery_is_retried_with_backoff(webhook, url, monkeypatch):
+    monkeypatch.setattr(notifications, "RETRY_BASE_SECONDS", 0.5)
+    webhook.script = [(500, {}), (503, {})]
+    queue(url, "down")
+    dispatcher = notifications.Dispatcher(digest_window=0)
+
+    assert run(dispatcher.dispatch_due()) == 1
+    [row] = rows()
+    assert (row.status, row.attempts, row.last_error) == ("pending", 1, "HTTP 500")
+    assert 0.3 < seconds_until(row.next_attempt_at) <= 0.6
+    assert run(dispatcher.dispatch_due()) == 0 # Not due yet
+
+    time.sleep(0.6)
+    run(dispatcher.dispatch_due())
+    [row] = rows()
+    # The delay doubles with every attempt
+    assert (row.status, row.attempts, row.last_error) == ("pending", 2, "HTTP 503")
+    assert 0.7 < seconds_until(row.next_attempt_at) <= 1.2
+
+    time.sleep(1.2)
+    run(dispatcher.dispatch_due())
+    [row] = rows()
+    assert (row.status, row.attempts, row.last_error) == ("sent", 3, None)
+    assert webhook.delivered() == ["down"] * 3
+
+
+def test_gives_up_after_max_attempts(webhook, url, monkeypatch):
+    monkeypatch.setattr(notifications, "RETRY_BASE_SECONDS", 0)
+    monkeypatch.setattr(notifications, "MAX_ATTEMPTS", 2)
+    webhook.script = [(500, {}), (500, {}), (404, {})]
+    queue(url, "flaky")
+    dispatcher = notifications.Dispatcher(digest_window=0)
+    run(dispatcher.dispatch_due())
+    run(dispatcher.dispatch_due())
+    [row] = rows()
+    assert (row.status, row.attempts) == ("failed", 2)
+
+    # A client error other than 408 / 429 is not retried at all
+    queue(url, "gone")
+    run(dispatcher.dispatch_due())
+    assert [(row.message, row.status, row.attempts) for row in rows()][1] == ("gone", "failed", 1)
+
+
+def test_429_waits_for_retry_after(webhook, url, monkeypatch):
+    monkeypatch.setattr(notifications, "RETRY_BASE_SECONDS", 0.1)
+    webhook.script = [(429, {"retry-after": "2"})]
+    queue(url, "first", "second")
+    # Below digest_min, so one request per message
+    dispatcher = notifications.Dispatcher(digest_window=0, digest_min=10)
+
+    run(dispatcher.dispatch_due())
+    first, second = rows()
+    assert (first.status, first.attempts, first.last_error) == ("pending", 1, "HTTP 429")
+    assert 1.5 < seconds_until(first.next_attempt_at) <= 2.1
+    # The message behind it was not tried: held back as long, without spending an attempt
+    assert (second.status, second.attempts) == ("pending", 0)
+    assert 1.5 < seconds_until(second.next_attempt_at) <= 2.1
+    assert len(webhook.payloads) == 1
+    assert dispatcher._limiter(url).blocked_until - time.monotonic() > 1.5
+
+    time.sleep(2.1)
+    run(dispatcher.dispatch_due())
+    assert [row.status for row in rows()] == ["sent", "sent"]
+    assert webhook.delivered() == ["first", "first", "second"]
+
+
+def test_digests_split_at_the_platform_limit(webhook, url, monkeypatch):
+    max_length = 300
+    monkeypatch.setitem(notifications.PLATFORMS, "generic", (1000, 1.0, max_length))
+    messages = [f"Tracker {i} changed: " + "x" * 60 for i in range(10)]
+    queue(url, *messages)
+    dispatcher = notifications.Dispatcher(digest_window=0, digest_min=3)
+
+    assert run(dispatcher.dispatch_due()) == 10
+    assert 1 < len(webhook.payloads) < 10
+    for payload in webhook.payloads:
+        assert len(payload["text"]) <= max_length
+        assert payload["text"].startswith(f"{len(payload['notifications'])} tracker updates:")
+    assert webhook.delivered() == messages
+    assert dispatcher.digests == sum(len(payload["notifications"]) > 1 for payload in webhook.payloads)
+    assert all(row.status == "sent" for row in rows())
+
+
+def test_repeated_message_is_sent_once_per_change(webhook, url):
+    db = database.SessionLocal()
+    try:
+        tracker = crud.create_tracker(db, models.TrackerCreate(name="dedup", config=[]))
+    finally:
+        db.close()
+
+    def finish(status, content=None):
+        async def go():
+            run_id = await async_db.start_run(tracker.id)
+            return await async_db.finish_run(tracker.id, run_id, status, content=content,
+                                             outbox=[{"destination": url, "message": "in stock"}])
+        return run(go())
+
+    def watch(text):
+        content = content_diff.ContentWatch(previous=run(async_db.read(lambda db: crud.get_content_fingerprints(db, tracker.id))))
+        content.check("price", text)
+        return content
+
+    assert finish("success") == 1
+    assert finish("success") == 0 # Same message, nothing changed
+    assert finish("success", watch("10 EUR")) == 1 # Content changed
+    assert finish("success", watch("10 EUR")) == 0
+    assert finish("failure") == 1 # Status changed
+    assert finish("failure") == 0
+
+    dispatcher = notifications.Dispatcher(digest_window=0, digest_min=10)
+    run(dispatcher.dispatch_due())
+    assert webhook.delivered() == ["in stock"] * 3
@@ -0,0 +1,178 @@
+"""
+Worker process for distributed execution (TRACKER_EXECUTION_MODE=distributed).
+Claims due runs from the tracker_jobs lease table, keeps its leases alive
+while the runs execute and also fires cron schedules into the table. Start
+as many as needed, on one machine or several sharing the database:
+
+    TRACKER_EXECUTION_MODE=distributed python -m backend.worker
+"""
+import sys
+import os
+import asyncio
+
+if sys.platform == 'win32':
+    asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
+
+if __name__ == "__main__":
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import logging
+import signal
+import socket
+import uuid
+from typing import Dict, Optional
+from backend import jobs
+
+logger = logging.getLogger(__name__)
+
+WORKER_CONCURRENCY = int(os.environ.get("TRACKER_WORKER_CONCURRENCY", os.environ.get("TRACKER_MAX_CONCURRENT_RUNS", "4")))
+POLL_INTERVAL = float(os.environ.get("TRACKER_WORKER_POLL_SECONDS", "1"))
+# Serves GET /metrics on this port when set; workers have no API of their own
+METRICS_PORT = int(os.environ.get("TRACKER_WORKER_METRICS_PORT", "0"))
+MAINTENANCE_INTERVAL = 60
+
+
+def default_owner() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+class Worker:
+    """
+    Runs leased jobs with at most `concurrency` in flight. Leases are renewed
+    every lease_seconds / 3; if the process dies they expire and another
+    worker picks the jobs up again.
+    """
+
+    def __init__(self, run_func=None, owner: Optional[str] = None, concurrency: int = WORKER_CONCURRENCY,
+                 lease_seconds: float = jobs.LEASE_SECONDS, poll_interval: float = POLL_INTERVAL):
+        if run_func is None:
+            from backend import runner
+            run_func = runner.run_tracker
+        self.run_func = run_func
+        self.owner = owner or default_owner()
+        self.concurrency = max(1, concurrency)
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self._active: Dict[int, asyncio.Task] = {}
+        self._wake = asyncio.Event()
+        self._stopping = False
+        self.completed = 0
+        self.failed = 0
+
+    async def run(self):
+        logger.info(f"Worker {self.owner} started (concurrency {self.concurrency})")
+        heartbeat = asyncio.create_task(self._heartbeat())
+        maintenance = asyncio.create_task(self._maintenance())
+        try:
+            while not self._stopping:
+                free = self.concurrency - len(self._active)
+                claimed = []
+                if free > 0:
+                    try:
+                        claimed = await jobs.call(lambda db: jobs.claim(db, self.owner, free, self.lease_seconds))
+                    except Exception as e:
+                        logger.error(f"Claiming jobs failed: {e}")
+                for job_id, tracker_id, require_active in claimed:
+                    self._active[job_id] = asyncio.create_task(self._execute(job_id, tracker_id, require_active))
+                if claimed and len(self._active) < self.concurrency:
+                    continue
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+            # Let runs in flight finish; their leases stay alive meanwhile
+            if self._active:
+                await asyncio.gather(*self._active.values(), return_exceptions=True)
+        finally:
+            heartbeat.cancel()
+            maintenance.cancel()
+            await asyncio.gather(heartbeat, maintenance, return_exceptions=True)
+            logger.info(f"Worker {self.owner} stopped")
+
+    def stop(self):
+        self._stopping = True
+        self._wake.set()
+
+    async def _execute(self, job_id: int, tracker_id: int, require_active: bool):
+        status = "done"
+        try:
+            await self.run_func(tracker_id, require_active)
+            self.completed += 1
+        except Exception as e:
+            status = "failed"
+            self.failed += 1
+            logger.error(f"Job {job_id} for tracker {tracker_id} crashed: {e}")
+        finally:
+            try:
+                await jobs.call(lambda db: jobs.complete(db, job_id, self.owner, status))
+            except Exception as e:
+                # The lease expires and the job is retried elsewhere
+                logger.error(f"Could not complete job {job_id}: {e}")
+            self._active.pop(job_id, None)
+            self._wake.set()
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            job_ids = list(self._active)
+            if not job_ids:
+                continue
+            try:
+                await jobs.call(lambda db: jobs.heartbeat(db, self.owner, job_ids, self.lease_seconds))
+            except Exception as e:
+                logger.error(f"Lease heartbeat failed: {e}")
+
+    async def _maintenance(self):
+        while True:
+            await asyncio.sleep(MAINTENANCE_INTERVAL)
+            try:
+                failed = await jobs.call(jobs.fail_exhausted)
+                if failed:
+                    logger.warning(f"Gave up on {failed} jobs after {jobs.MAX_ATTEMPTS} attempts")
+                await jobs.call(jobs.purge)
+            except Exception as e:
+                logger.error(f"Job maintenance failed: {e}")
+
+    def stats(self):
+        return {"owner": self.owner, "active": len(self._active), "completed": self.completed, "failed": self.failed}
+
+
+async def main():
+    from backend import async_db, browser_pool, database, http_client, metrics, notifications, profiles, scheduler
+
+    # Runs fired by this process' scheduler go to the job table, never to a local queue
+    jobs.EXECUTION_MODE = "distributed"
+    database.init_db()
+    await browser_pool.start()
+    async_db.writer.start()
+    notifications.dispatcher.start()
+    # Every worker fires the cron schedules; the job table keeps one run per slot
+    scheduler.start_scheduler(sync=True)
+
+    metrics_server = await metrics.serve(METRICS_PORT) if METRICS_PORT else None
+    worker = Worker()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, worker.stop)
+        except NotImplementedError:
+            pass # Windows
+    try:
+        await worker.run()
+    finally:
+        scheduler.scheduler.shutdown(wait=False)
+        if metrics_server is not None:
+            metrics_server.close()
+        await notifications.dispatcher.stop()
+        await profiles.manager.close()
+        await browser_pool.stop()
+        await http_client.close_client()
+        async_db.writer.stop()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    if not jobs.is_distributed():
+        logger.warning("TRACKER_EXECUTION_MODE is not 'distributed'; make sure the API runs with it too or it executes runs itself")
+    asyncio.run(main())
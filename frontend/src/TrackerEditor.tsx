@@ -21,8 +21,9 @@ const AVAILABLE_ACTIONS = [
   { value: 'click', label: 'Click Element', fields: [{ name: 'selector', type: 'text', placeholder: 'CSS Selector' }] },
   { value: 'type', label: 'Type Text', fields: [{ name: 'selector', type: 'text', placeholder: 'CSS Selector' }, { name: 'text', type: 'text', placeholder: 'Text to type' }] },
   { value: 'grep', label: 'Grep (Check Text)', fields: [{ name: 'text', type: 'text', placeholder: 'Text to find' }, { name: 'selector', type: 'text', placeholder: 'Selector (optional, default body)' }] },
+  { value: 'grep_many', label: 'Grep (Many)', fields: [{ name: 'patterns', type: 'text', placeholder: 'JSON list: ["text", {"regex": "..."}]' }, { name: 'mode', type: 'text', placeholder: 'all or any (default all)' }, { name: 'selector', type: 'text', placeholder: 'Selector (optional, default body)' }] },
   { value: 'extract_text', label: 'Extract Text to Variable', fields: [{ name: 'selector', type: 'text', placeholder: 'CSS Selector' }, { name: 'variable', type: 'text', placeholder: 'Variable Name (e.g. price)' }] },
-  { value: 'screenshot', label: 'Take Screenshot', fields: [{ name: 'path', type: 'text', placeholder: 'Path (e.g. screenshot.png)' }] },
+  { value: 'screenshot', label: 'Take Screenshot', fields: [{ name: 'selector', type: 'text', placeholder: 'CSS Selector (Optional, whole page if empty)' }, { name: 'format', type: 'text', placeholder: 'png or jpeg (Optional)' }, { name: 'path', type: 'text', placeholder: 'Also save to path (Optional)' }] },
 ];
 
 export const TrackerEditor = ({ onSave, onCancel }: TrackerEditorProps) => {
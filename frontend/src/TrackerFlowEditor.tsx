@@ -28,7 +28,8 @@ const AVAILABLE_ACTIONS = [
     label: 'Open URL', 
     fields: [
         { name: 'url', type: 'text', placeholder: 'https://example.com' },
-        { name: 'headless', type: 'boolean', placeholder: 'Headless mode' }
+        { name: 'headless', type: 'boolean', placeholder: 'Headless mode' },
+        { name: 'context', type: 'text', placeholder: 'Context profile (optional)' }
     ] 
   },
   { value: 'wait', label: 'Wait', fields: [{ name: 'seconds', type: 'number', placeholder: 'Seconds' }] },
@@ -36,19 +37,26 @@ const AVAILABLE_ACTIONS = [
   { value: 'type', label: 'Type Text', fields: [{ name: 'selector', type: 'text', placeholder: 'CSS Selector' }, { name: 'text', type: 'text', placeholder: 'Text to type' }] },
   { value: 'press_key', label: 'Press Key', fields: [{ name: 'key', type: 'text', placeholder: 'Key (Enter, Escape, etc.)' }] },
   { value: 'scroll', label: 'Scroll To', fields: [{ name: 'selector', type: 'text', placeholder: 'CSS Selector' }] },
+  { value: 'block_resources', label: 'Block Resources', fields: [{ name: 'types', type: 'text', placeholder: 'Types (e.g. image, font, media)' }, { name: 'presets', type: 'text', placeholder: 'Presets (analytics, ads)' }, { name: 'patterns', type: 'text', placeholder: 'URL Regexes (space separated)' }, { name: 'cache_static', type: 'boolean', placeholder: 'Cache static assets' }] },
   { value: 'refresh', label: 'Refresh Page', fields: [] },
   { value: 'wait_network_idle', label: 'Wait Network Idle', fields: [] },
   { value: 'clear_cookies', label: 'Clear Cookies', fields: [] },
+  { value: 'save_cookies', label: 'Save Cookies', fields: [{ name: 'snapshot', type: 'text', placeholder: 'Snapshot Name' }] },
+  { value: 'load_cookies', label: 'Load Cookies', fields: [{ name: 'snapshot', type: 'text', placeholder: 'Snapshot Name' }] },
   { value: 'set_header', label: 'Set Header', fields: [{ name: 'key', type: 'text', placeholder: 'Header Name' }, { name: 'value', type: 'text', placeholder: 'Header Value' }] },
   { value: 'grep', label: 'Grep (Check Text)', fields: [{ name: 'text', type: 'text', placeholder: 'Text to find' }, { name: 'selector', type: 'text', placeholder: 'Selector (optional, default body)' }] },
   { value: 'grep_regex', label: 'Grep (Regex)', fields: [{ name: 'regex', type: 'text', placeholder: 'Regex Pattern' }, { name: 'selector', type: 'text', placeholder: 'Selector (optional, default body)' }] },
+  { value: 'grep_many', label: 'Grep (Many)', fields: [{ name: 'patterns', type: 'text', placeholder: 'JSON list: ["text", {"regex": "..."}]' }, { name: 'mode', type: 'text', placeholder: 'all or any (default all)' }, { name: 'selector', type: 'text', placeholder: 'Selector (optional, default body)' }] },
+  { value: 'watch_content', label: 'Watch For Change', fields: [{ name: 'selector', type: 'text', placeholder: 'Selector (optional, default body)' }, { name: 'key', type: 'text', placeholder: 'Name (optional, default selector)' }, { name: 'ignore', type: 'text', placeholder: 'Ignore Regex (Optional, e.g. timestamps)' }] },
   { value: 'extract_text', label: 'Extract Text', fields: [{ name: 'selector', type: 'text', placeholder: 'CSS Selector' }, { name: 'variable', type: 'text', placeholder: 'Variable Name' }] },
   { value: 'execute_js', label: 'Execute JS', fields: [{ name: 'script', type: 'text', placeholder: 'return document.title;' }, { name: 'variable', type: 'text', placeholder: 'Result Variable (Optional)' }] },
   { value: 'capture_network', label: 'Capture Network', fields: [{ name: 'regex', type: 'text', placeholder: 'URL Regex Pattern' }] },
+  { value: 'wait_for_network_match', label: 'Wait For Network Request', fields: [{ name: 'regex', type: 'text', placeholder: 'URL Regex Pattern' }, { name: 'timeout', type: 'number', placeholder: 'Timeout (seconds, default 30)' }, { name: 'variable', type: 'text', placeholder: 'URL Variable (Optional)' }] },
   { value: 'http_request', label: 'HTTP Request', fields: [{ name: 'method', type: 'text', placeholder: 'GET/POST' }, { name: 'url', type: 'text', placeholder: 'URL' }, { name: 'body', type: 'text', placeholder: 'JSON Body (Optional)' }, { name: 'variable', type: 'text', placeholder: 'Response Variable' }] },
   { value: 'expect_http_status', label: 'Expect HTTP Status', fields: [{ name: 'status', type: 'number', placeholder: 'Status Code (e.g. 200)' }] },
-  { value: 'send_notification', label: 'Send Notification', fields: [{ name: 'message', type: 'text', placeholder: 'Message' }] },
-  { value: 'screenshot', label: 'Screenshot', fields: [{ name: 'path', type: 'text', placeholder: 'Path' }] },
+  { value: 'parallel', label: 'Parallel Block', fields: [{ name: 'branches', type: 'text', placeholder: 'Branches as JSON: [[{"action": ...}], [...]]' }, { name: 'max_concurrency', type: 'number', placeholder: 'Max Concurrency (Optional)' }] },
+  { value: 'send_notification', label: 'Send Notification', fields: [{ name: 'message', type: 'text', placeholder: 'Message' }, { name: 'url', type: 'text', placeholder: 'Webhook URL (Optional)' }] },
+  { value: 'screenshot', label: 'Screenshot', fields: [{ name: 'selector', type: 'text', placeholder: 'CSS Selector (Optional)' }, { name: 'format', type: 'text', placeholder: 'png or jpeg (Optional)' }, { name: 'path', type: 'text', placeholder: 'Also save to path (Optional)' }] },
 ];
 
 interface TrackerFlowEditorProps {
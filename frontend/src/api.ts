@@ -14,6 +14,26 @@ export interface Tracker {
   created_at: string;
 }
 
+// Tracker without config and logs, as returned by /trackers/summary
+export type TrackerSummary = Omit<Tracker, 'config' | 'last_run_logs'>;
+
+// Thumbnails fall back to the full image when the server has no Pillow
+export const screenshotUrl = (hash: string, thumbnail = false): string =>
+  `${API_URL}/screenshots/${hash}${thumbnail ? '/thumbnail' : ''}`;
+
+export interface StatusEvent {
+  type: 'status';
+  tracker_id: number;
+  status: string;
+  last_run_at?: string;
+}
+
+export interface TrackerEvent {
+  type: 'tracker';
+  tracker_id: number;
+  change: 'created' | 'updated' | 'deleted';
+}
+
 export interface TrackerCreate {
   name: string;
   description?: string;
@@ -30,6 +50,37 @@ export const getTrackers = async (): Promise<Tracker[]> => {
   return response.json();
 };
 
+export const getTrackerSummaries = async (): Promise<TrackerSummary[]> => {
+  const response = await fetch(`${API_URL}/trackers/summary`);
+  if (!response.ok) {
+    throw new Error("Failed to fetch trackers");
+  }
+  return response.json();
+};
+
+export const getTrackerSummary = async (id: number): Promise<TrackerSummary> => {
+  const response = await fetch(`${API_URL}/trackers/${id}/summary`);
+  if (!response.ok) {
+    throw new Error("Failed to fetch tracker");
+  }
+  return response.json();
+};
+
+// Subscribes to pushed status changes. EventSource reconnects on its own and
+// resumes from the last event id; onResync fires when the server can't replay
+// the gap and the caller should refetch.
+export const subscribeToEvents = (
+  onEvent: (event: StatusEvent | TrackerEvent) => void,
+  onResync: () => void,
+): (() => void) => {
+  const source = new EventSource(`${API_URL}/events`);
+  const handle = (message: MessageEvent) => onEvent(JSON.parse(message.data));
+  source.addEventListener('status', handle);
+  source.addEventListener('tracker', handle);
+  source.addEventListener('resync', onResync);
+  return () => source.close();
+};
+
 export const createTracker = async (tracker: TrackerCreate, adminKey: string): Promise<Tracker> => {
   const response = await fetch(`${API_URL}/trackers/`, {
     method: "POST",
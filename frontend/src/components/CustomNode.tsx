@@ -6,7 +6,7 @@ import { Button } from './ui/button';
 import { cn } from '../lib/utils';
 import { 
     Globe, Clock, MousePointer, Type, Search, FileText, Camera, Trash2,
-    Code, Send, RefreshCcw, Cookie, AlignJustify, Zap, Network, Keyboard, AlertOctagon
+    Code, Send, RefreshCcw, Cookie, AlignJustify, Zap, Network, Keyboard, AlertOctagon, Eye, Ban, GitFork
 } from 'lucide-react';
 
 const icons: Record<string, any> = {
@@ -16,6 +16,7 @@ const icons: Record<string, any> = {
   type: Type,
   grep: Search,
   grep_regex: Search,
+  grep_many: Search,
   extract_text: FileText,
   screenshot: Camera,
   execute_js: Code,
@@ -26,9 +27,15 @@ const icons: Record<string, any> = {
   refresh: RefreshCcw,
   wait_network_idle: Clock,
   clear_cookies: Cookie,
+  save_cookies: Cookie,
+  load_cookies: Cookie,
   set_header: Code,
   expect_http_status: AlertOctagon,
-  capture_network: Network
+  capture_network: Network,
+  wait_for_network_match: Network,
+  watch_content: Eye,
+  block_resources: Ban,
+  parallel: GitFork
 };
 
 export const CustomNode = ({ data, selected, id }: any) => {
@@ -1,12 +1,13 @@
 import { useState } from 'react';
-import type { Tracker } from '../api';
+import { screenshotUrl } from '../api';
+import type { Tracker, TrackerSummary } from '../api';
 import { Card, CardHeader, CardTitle, CardContent, CardFooter } from './ui/card';
 import { Button } from './ui/button';
 import { Play, Clock, CheckCircle, XCircle, AlertCircle, Loader2, FileText, X } from 'lucide-react';
 import { cn } from '../lib/utils';
 
 interface TrackerCardProps {
-  tracker: Tracker;
+  tracker: TrackerSummary & { last_run_logs?: string };
   onRun?: (id: number) => void;
   onEdit?: (tracker: Tracker) => void;
   isAdmin?: boolean;
@@ -16,6 +17,7 @@ export const TrackerCard = ({ tracker, onRun, onEdit, isAdmin }: TrackerCardProp
   const [showLogs, setShowLogs] = useState(false);
   const [showInfo, setShowInfo] = useState(false);
   const status = tracker.last_run_status || 'pending';
+  const screenshot = tracker.last_run_info?.screenshots?.at(-1);
 
   const StatusIcon = () => {
     switch (status) {
@@ -37,6 +39,16 @@ export const TrackerCard = ({ tracker, onRun, onEdit, isAdmin }: TrackerCardProp
         </CardHeader>
         
         <CardContent className="flex-grow pt-4">
+          {screenshot && (
+            <a href={screenshotUrl(screenshot.hash)} target="_blank" rel="noreferrer">
+              <img
+                src={screenshotUrl(screenshot.hash, true)}
+                alt={`Last screenshot of ${tracker.name}`}
+                loading="lazy"
+                className="mb-3 w-full max-h-40 object-cover object-top rounded border"
+              />
+            </a>
+          )}
           <p className="text-sm text-muted-foreground line-clamp-3">
             {tracker.description || "No description provided."}
           </p>
@@ -79,7 +91,7 @@ export const TrackerCard = ({ tracker, onRun, onEdit, isAdmin }: TrackerCardProp
                             variant="secondary" 
                             size="sm" 
                             className="flex-1"
-                            onClick={() => onEdit(tracker)}
+                            onClick={() => onEdit(tracker as Tracker)}
                         >
                             Edit
                         </Button>
@@ -1,19 +1,19 @@
 import { useEffect, useState } from 'react';
-import { getTrackers } from '../api';
-import type { Tracker } from '../api';
+import { getTrackerSummaries, getTrackerSummary, subscribeToEvents } from '../api';
+import type { TrackerSummary } from '../api';
 import { TrackerCard } from '../components/TrackerCard';
 import { Link } from 'react-router-dom';
 import { Button } from '../components/ui/button';
 import { Settings } from 'lucide-react';
 
 export const Dashboard = () => {
-  const [trackers, setTrackers] = useState<Tracker[]>([]);
+  const [trackers, setTrackers] = useState<TrackerSummary[]>([]);
   const [loading, setLoading] = useState(false);
 
   const fetchTrackers = async () => {
     try {
       setLoading(true);
-      const data = await getTrackers();
+      const data = await getTrackerSummaries();
       setTrackers(data);
     } catch (error) {
       console.error(error);
@@ -22,10 +22,37 @@ export const Dashboard = () => {
     }
   };
 
+  const fetchTracker = async (id: number) => {
+    try {
+      const summary = await getTrackerSummary(id);
+      setTrackers((current) => current.map((tracker) => (tracker.id === id ? summary : tracker)));
+    } catch (error) {
+      console.error(error);
+    }
+  };
+
   useEffect(() => {
     fetchTrackers();
-    const interval = setInterval(fetchTrackers, 5000);
-    return () => clearInterval(interval);
+    // Status changes are pushed; only structural changes trigger a refetch
+    return subscribeToEvents((event) => {
+      if (event.type === 'tracker') {
+        fetchTrackers();
+        return;
+      }
+      setTrackers((current) => current.map((tracker) =>
+        tracker.id === event.tracker_id
+          ? {
+              ...tracker,
+              last_run_status: event.status,
+              last_run_at: event.last_run_at ?? tracker.last_run_at,
+            }
+          : tracker
+      ));
+      // Events carry no run details, the finished run's are fetched for its card
+      if (event.status !== 'running') {
+        fetchTracker(event.tracker_id);
+      }
+    }, fetchTrackers);
   }, []);
 
   return (